@@ -12,7 +12,9 @@ Example:
 import sys
 import os
 from models import db, User
-from app import app
+from app import create_cli_app
+
+app = create_cli_app()
 
 def make_admin(email):
     """Make a user an admin"""
@@ -23,7 +25,8 @@ def make_admin(email):
             print(f"❌ Error: User with email '{email}' not found")
             return False
         
-        # Set user type to admin
+        # Set user type to admin (committing also drops the user's cached
+        # profile from the shared tier, see utils.profile_cache)
         user.type_of_product = 'admin'
         db.session.commit()
         
@@ -0,0 +1,17 @@
+"""
+Optional ASGI serving mode.
+
+The sync Flask app blocks a worker thread for every Postgres, Redis and
+Google round trip. In ASGI mode the read-heavy GET endpoints - the
+storefront index, product list/detail/categories, a customer's orders and
+/api/auth/me - run as async handlers on an asyncpg engine and
+redis.asyncio, so one process keeps many of them in flight at once; every
+other route is served by the Flask app as before. Models, config,
+serializers and the catalog/profile caches are shared with the sync path.
+
+    pip install uvicorn a2wsgi asyncpg "sqlalchemy[asyncio]" "limits[async-redis]"
+    uvicorn asgi:application --workers 4
+
+The sync mode (python app.py, or any WSGI server on app:app) is unchanged.
+"""
+from aio.app import create_asgi_app
@@ -0,0 +1,181 @@
+"""
+The ASGI application: async handlers in front of the Flask app.
+
+GET requests for a path in aio.handlers.ROUTES are answered on the event
+loop. Everything else - writes, admin, OAuth, preflights, and any request a
+handler declines - goes to the unchanged Flask app through a2wsgi's thread
+pool, so both modes serve the same API.
+"""
+import re
+from urllib.parse import parse_qsl
+
+from a2wsgi import WSGIMiddleware
+from flask_jwt_extended import decode_token
+from werkzeug.datastructures import Headers, MultiDict
+
+from aio.cache import async_catalog_cache, async_profile_cache, is_token_revoked
+from aio.db import async_db
+from aio.handlers import ROUTES
+from aio.limits import async_limiter
+from utils import db_pool, http_cache
+from utils.cache import catalog_cache
+
+
+class AsyncRequest:
+    """The parts of an ASGI HTTP scope the handlers use."""
+
+    def __init__(self, scope, path_params):
+        self.path_params = path_params
+        self.query_items = parse_qsl(scope['query_string'].decode('latin-1'), keep_blank_values=True)
+        self.args = MultiDict(self.query_items)
+        self.headers = Headers([(k.decode('latin-1'), v.decode('latin-1')) for k, v in scope['headers']])
+        self.remote_addr = scope['client'][0] if scope.get('client') else '127.0.0.1'
+        self.claims = None
+        self.user_id = None
+
+    def int_arg(self, name, default):
+        return self.args.get(name, default, type=int)
+
+
+class Route:
+    def __init__(self, pattern, endpoint, handler, budget, cached, auth):
+        self.regex = re.compile(pattern + r'\Z')
+        self.endpoint = endpoint
+        self.handler = handler
+        self.budget = budget
+        self.cached = cached
+        self.auth = auth
+
+    def match(self, path):
+        match = self.regex.match(path)
+        if match is None:
+            return None
+        return {name: int(value) for name, value in match.groupdict().items()}
+
+
+class AsyncApp:
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self.wsgi = WSGIMiddleware(flask_app, workers=db_pool.wsgi_threads(flask_app.config))
+        self.routes = [Route(*route) for route in ROUTES]
+        self.cors_origins = set(flask_app.config.get('CORS_ORIGINS', ()))
+        self.encode = flask_app.json.encode
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self._lifespan(receive, send)
+        if scope['type'] == 'http' and scope['method'] == 'GET':
+            for route in self.routes:
+                path_params = route.match(scope['path'])
+                if path_params is not None:
+                    request = AsyncRequest(scope, path_params)
+                    result = await self._serve(route, request)
+                    if result is not None:
+                        return await self._send(send, request, *result)
+                    break
+        await self.wsgi(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await async_db.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    # -- request handling ------------------------------------------------
+
+    def _bearer_claims(self, request):
+        """Decoded access token from the Authorization header, or None."""
+        auth = request.headers.get('Authorization', '')
+        if not auth.startswith('Bearer '):
+            return None
+        try:
+            with self.flask_app.app_context():
+                claims = decode_token(auth[7:])
+        except Exception:
+            return None
+        return claims if claims.get('type') == 'access' else None
+
+    async def _serve(self, route, request):
+        """(status, body, headers) for the request, or None to defer to Flask."""
+        request.claims = self._bearer_claims(request)
+        if route.auth:
+            # Missing, invalid, expired and revoked tokens get Flask's own 401s
+            if request.claims is None or await is_token_revoked(self.flask_app, request.claims):
+                return None
+            request.user_id = int(request.claims['sub'])
+
+        key = f"user:{request.claims['sub']}" if request.claims else request.remote_addr
+        allowed, limit_headers = await async_limiter.hit(route.budget, key)
+        if not allowed:
+            body = self.encode({'success': False, 'error': '429 Too Many Requests'}) + b'\n'
+            return 429, body, {'Content-Type': 'application/json', **limit_headers}
+
+        async with async_db.session() as session:
+            if route.cached and catalog_cache.enabled:
+                result = await self._serve_cached(route, request, session)
+            else:
+                result = await route.handler(request, session)
+                if result is not None:
+                    payload, status = result
+                    result = status, self.encode(payload) + b'\n', {'Content-Type': 'application/json'}
+        if result is not None:
+            result[2].update(limit_headers)
+        return result
+
+    async def _serve_cached(self, route, request, session):
+        """cached_catalog_view for async handlers, sharing its entries."""
+        version = await async_catalog_cache.version()
+        key = catalog_cache.make_key(route.endpoint, request.path_params, request.query_items, version)
+        entry = await async_catalog_cache.get(key)
+        if entry is None:
+            result = await route.handler(request, session)
+            if result is None:
+                return None
+            payload, status = result
+            body = self.encode(payload) + b'\n'
+            if status != 200:
+                return status, body, {'Content-Type': 'application/json', 'X-Cache': 'MISS'}
+            entry = http_cache.make_entry(body, await async_catalog_cache.last_modified(session))
+            await async_catalog_cache.set(key, entry)
+            cache_status = 'MISS'
+        else:
+            cache_status = 'HIT'
+
+        status, body, headers = http_cache.negotiate(request.headers, entry, catalog_cache.cache_control)
+        if status == 200:
+            headers['Content-Type'] = 'application/json'
+        headers['X-Cache'] = cache_status
+        return status, body, headers
+
+    async def _send(self, send, request, status, body, headers):
+        origin = request.headers.get('Origin')
+        if origin in self.cors_origins:
+            # What flask-cors sends for CORS_ORIGINS with supports_credentials
+            headers['Access-Control-Allow-Origin'] = origin
+            headers['Access-Control-Allow-Credentials'] = 'true'
+            headers['Vary'] = f"{headers['Vary']}, Origin" if 'Vary' in headers else 'Origin'
+        if status != 304:
+            headers['Content-Length'] = str(len(body))
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(name.encode('latin-1'), value.encode('latin-1')) for name, value in headers.items()],
+        })
+        await send({'type': 'http.response.body', 'body': body})
+
+
+def create_asgi_app(flask_app):
+    """Wrap a Flask app created with ASGI_MODE on in the ASGI front end."""
+    if not flask_app.config.get('ASGI_MODE'):
+        # Its sync pool was sized for the whole connection share
+        raise RuntimeError('create the Flask app with ASGI_MODE = True (see asgi.py)')
+    async_db.init_app(flask_app)
+    async_catalog_cache.init_app(flask_app)
+    async_profile_cache.init_app(flask_app)
+    async_limiter.init_app(flask_app)
+    flask_app.extensions['async_db'] = async_db
+    return AsyncApp(flask_app)
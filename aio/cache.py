@@ -0,0 +1,159 @@
+"""
+Async access to the shared caches.
+
+The in-process tiers (LRUs, catalog version, token verdicts) are the very
+objects the Flask views use - reading them never blocks. Only the Redis and
+database round trips are re-done here with redis.asyncio and the async
+engine, against the same keys, so entries filled by either mode are served
+by both.
+"""
+import asyncio
+import json
+import logging
+
+import redis.asyncio as aioredis
+from sqlalchemy import func, select
+
+from models import Product, User
+from utils.cache import catalog_cache
+from utils.profile_cache import profile_cache
+from utils.serializers import USER_PROFILE
+from utils.token_blocklist import token_blocklist
+
+logger = logging.getLogger('sleepcraft.aio')
+
+_MISSING = object()
+
+
+class AsyncCatalogCache:
+    """Async Redis tier for utils.cache.catalog_cache."""
+
+    def __init__(self):
+        self.redis = None
+
+    def init_app(self, app):
+        redis_url = app.config.get('CATALOG_CACHE_REDIS_URL')
+        if redis_url:
+            self.redis = aioredis.Redis.from_url(redis_url, socket_timeout=0.2, socket_connect_timeout=0.2)
+
+    async def version(self):
+        if self.redis is not None and catalog_cache.version_check_due():
+            try:
+                catalog_cache.merge_shared_version(
+                    *await self.redis.mget(catalog_cache.VERSION_KEY, catalog_cache.MODIFIED_KEY)
+                )
+            except Exception as e:
+                catalog_cache.redis_errors += 1
+                logger.warning("Error reading catalog version from Redis: %s", e)
+        return catalog_cache.local_version()
+
+    async def last_modified(self, session):
+        modified_at = catalog_cache.known_last_modified()
+        if modified_at is None:
+            try:
+                newest = await session.scalar(select(func.max(Product.updated_at)))
+            except Exception as e:
+                logger.warning("Error reading catalog modification time: %s", e)
+                newest = None
+            catalog_cache.seed_last_modified(newest)
+            modified_at = catalog_cache.known_last_modified()
+        return modified_at
+
+    async def get(self, key):
+        entry = catalog_cache.local.get(key)
+        if entry is not None or self.redis is None:
+            return entry
+        try:
+            fields = await self.redis.hgetall(catalog_cache.KEY_PREFIX + key)
+        except Exception as e:
+            catalog_cache.redis_errors += 1
+            logger.warning("Error reading catalog cache from Redis: %s", e)
+            return None
+        return catalog_cache.adopt_shared_entry(key, fields)
+
+    async def set(self, key, entry):
+        catalog_cache.local.set(key, entry)
+        if self.redis is not None:
+            try:
+                async with self.redis.pipeline() as pipe:
+                    pipe.hset(catalog_cache.KEY_PREFIX + key, mapping=entry)
+                    pipe.expire(catalog_cache.KEY_PREFIX + key, catalog_cache.ttl)
+                    await pipe.execute()
+            except Exception as e:
+                catalog_cache.redis_errors += 1
+                logger.warning("Error writing catalog cache to Redis: %s", e)
+
+
+class AsyncProfileCache:
+    """Async Redis and database tiers for utils.profile_cache.profile_cache."""
+
+    def __init__(self):
+        self.redis = None
+
+    def init_app(self, app):
+        redis_url = app.config.get('PROFILE_CACHE_REDIS_URL')
+        if redis_url:
+            self.redis = aioredis.Redis.from_url(
+                redis_url,
+                socket_timeout=app.config.get('REDIS_SOCKET_TIMEOUT', 0.1),
+                socket_connect_timeout=app.config.get('REDIS_CONNECT_TIMEOUT', 0.1),
+                max_connections=app.config.get('REDIS_MAX_CONNECTIONS', 50)
+            )
+
+    async def _redis(self, action):
+        breaker = profile_cache.breaker
+        if self.redis is None or not breaker.allow():
+            return _MISSING
+        try:
+            result = await action(self.redis)
+        except Exception as e:
+            profile_cache.redis_errors += 1
+            breaker.record_failure()
+            logger.warning("Error talking to profile cache Redis: %s", e)
+            return _MISSING
+        breaker.record_success()
+        return result
+
+    async def get(self, session, user_id):
+        """The user's profile dict, or None if there is no such user."""
+        profile = profile_cache.local.get(user_id, _MISSING)
+        if profile is not _MISSING:
+            return profile
+
+        key = f'{profile_cache.KEY_PREFIX}{user_id}'
+        body = await self._redis(lambda client: client.get(key))
+        if body not in (_MISSING, None):
+            profile_cache.redis_hits += 1
+            profile = json.loads(body)
+            profile_cache.local.set(user_id, profile)
+            return profile
+
+        profile_cache.db_loads += 1
+        user = await session.get(User, user_id)
+        if user is None:
+            return None
+        profile = USER_PROFILE(user)
+        profile_cache.local.set(user_id, profile)
+        await self._redis(lambda client: client.setex(key, profile_cache.ttl, json.dumps(profile)))
+        return profile
+
+
+async def is_token_revoked(flask_app, jwt_payload):
+    """token_blocklist.is_revoked without blocking the event loop.
+
+    The in-process verdict and epoch caches answer almost every request;
+    on a miss the sync check (Redis, then the users table) runs on a
+    worker thread and refills them.
+    """
+    verdict = token_blocklist.cached_verdict(jwt_payload)
+    if verdict is not None:
+        return verdict
+
+    def check():
+        with flask_app.app_context():
+            return token_blocklist.is_revoked(jwt_payload)
+    return await asyncio.to_thread(check)
+
+
+async_catalog_cache = AsyncCatalogCache()
+async_profile_cache = AsyncProfileCache()
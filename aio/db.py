@@ -0,0 +1,90 @@
+"""
+Async SQLAlchemy engine for the ASGI handlers.
+
+Built from the same SQLALCHEMY_DATABASE_URI and SSL settings as the sync
+engine, with asyncpg as the driver. The ORM models are shared: handlers run
+select(Product) etc. on an AsyncSession and serialise with the same
+schemas, so every relationship they touch must be eager-loaded. Pool
+recycling, pre-ping, statement timeout and PgBouncer handling follow the
+sync engine's DB_* settings, and the pool is sized from the same
+DB_MAX_CONNECTIONS share as the sync one (utils.db_pool.asgi_split).
+"""
+import ssl
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from utils import db_pool
+
+# libpq options that asyncpg does not understand in the URL; they are
+# turned into its `ssl` argument instead
+_LIBPQ_SSL_PARAMS = ('sslmode', 'sslcert', 'sslkey', 'sslrootcert')
+
+
+def async_database_url(uri):
+    """The sync DATABASE_URI with the asyncpg driver and no libpq SSL params."""
+    url = make_url(uri).set(drivername='postgresql+asyncpg')
+    return url.difference_update_query(_LIBPQ_SSL_PARAMS)
+
+
+def ssl_argument(uri, connect_args):
+    """asyncpg's `ssl` argument for the sync engine's libpq SSL settings.
+
+    Settings in the URL win over SQLALCHEMY_ENGINE_OPTIONS connect_args, as
+    they do for libpq.
+    """
+    options = {**(connect_args or {}), **make_url(uri).query}
+    mode = options.get('sslmode') or 'prefer'
+    if mode == 'disable':
+        return False
+    if not (options.get('sslrootcert') or options.get('sslcert')):
+        return mode
+
+    context = ssl.create_default_context(cafile=options.get('sslrootcert'))
+    if mode in ('require', 'prefer', 'allow') and not options.get('sslrootcert'):
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+    elif mode != 'verify-full':
+        context.check_hostname = False  # verify-ca: trust the chain, not the host name
+    if options.get('sslcert'):
+        context.load_cert_chain(options['sslcert'], options.get('sslkey'))
+    return context
+
+
+class AsyncDatabase:
+    def __init__(self):
+        self.engine = None
+        self.sessionmaker = None
+
+    def init_app(self, app):
+        uri = app.config['SQLALCHEMY_DATABASE_URI']
+        connect_args = app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}).get('connect_args')
+        size, overflow = db_pool.async_pool_size(app.config)
+        self.engine = create_async_engine(
+            async_database_url(uri),
+            connect_args={'ssl': ssl_argument(uri, connect_args), **db_pool.asyncpg_connect_args(app.config)},
+            pool_size=size,
+            max_overflow=overflow,
+            pool_timeout=app.config['DB_POOL_TIMEOUT'],
+            pool_recycle=app.config['DB_POOL_RECYCLE'],
+            pool_pre_ping=app.config['DB_POOL_PRE_PING'],
+            pool_use_lifo=True,
+        )
+        db_pool.init_engine(app, self.engine.sync_engine)
+        self.sessionmaker = async_sessionmaker(self.engine, expire_on_commit=False)
+
+    def session(self):
+        """A new AsyncSession; use as `async with async_db.session() as session:`."""
+        return self.sessionmaker()
+
+    async def dispose(self):
+        if self.engine is not None:
+            await self.engine.dispose()
+
+    def stats(self):
+        if self.engine is None:
+            return {'enabled': False}
+        return {'enabled': True, **db_pool.stats(self.engine.sync_engine)}
+
+
+async_db = AsyncDatabase()
@@ -0,0 +1,183 @@
+"""
+Async versions of the read-heavy GET endpoints.
+
+Each handler mirrors the Flask view named in ROUTES: same queries, same
+schemas, same payloads and status codes. A handler returns
+(payload, status), or None to hand the request to the Flask view - used
+for the cases it does not reproduce (keyset cursors, the product 404 page).
+"""
+import logging
+import math
+
+from sqlalchemy import func, select
+
+from aio.cache import async_profile_cache
+from models import Order, Product
+from routes.orders import LOAD_ORDER_ITEMS
+from utils.serializers import ORDER, PRODUCT, PRODUCT_CARD, PRODUCT_SUMMARY, many
+
+logger = logging.getLogger('sleepcraft.aio')
+
+# Flask-SQLAlchemy's paginate() defaults
+DEFAULT_PER_PAGE = 20
+MAX_PER_PAGE = 100
+
+
+async def paginate(session, stmt, page, per_page):
+    """paginate(error_out=False) for a select(): (items, page, pages, total)."""
+    page = page if page >= 1 else 1
+    per_page = min(per_page, MAX_PER_PAGE) if per_page >= 1 else DEFAULT_PER_PAGE
+    items = (await session.scalars(stmt.limit(per_page).offset((page - 1) * per_page))).all()
+    total = await session.scalar(select(func.count()).select_from(stmt.order_by(None).subquery()))
+    pages = math.ceil(total / per_page) if total else 0
+    return items, page, pages, total
+
+
+# -- main -------------------------------------------------------------------
+
+async def index(request, session):
+    try:
+        featured_products = (await session.scalars(select(Product).limit(8))).all()
+        categories = (await session.execute(select(Product.category).distinct())).all()
+        return {
+            'success': True,
+            'data': {
+                'featured_products': many(PRODUCT_CARD, featured_products),
+                'categories': [c[0] for c in categories if c[0]]
+            }
+        }, 200
+    except Exception as e:
+        return {'success': False, 'error': str(e)}, 500
+
+
+# -- products ---------------------------------------------------------------
+
+async def products_list(request, session):
+    if 'cursor' in request.args:
+        return None
+    try:
+        page = request.int_arg('page', 1)
+        per_page = request.int_arg('per_page', 12)
+        category = request.args.get('category')
+
+        stmt = select(Product)
+        if category:
+            stmt = stmt.where(Product.category == category)
+
+        items, page, pages, total = await paginate(session, stmt, page, per_page)
+        return {
+            'success': True,
+            'data': {
+                'products': many(PRODUCT, items),
+                'pagination': {
+                    'page': page,
+                    'pages': pages,
+                    'total': total,
+                    'has_next': page < pages,
+                    'has_prev': page > 1
+                }
+            }
+        }, 200
+    except Exception as e:
+        return {'success': False, 'error': str(e)}, 500
+
+
+async def get_categories(request, session):
+    try:
+        categories = (await session.execute(select(Product.category).distinct())).all()
+        return {
+            'success': True,
+            'data': {
+                'categories': [c[0] for c in categories]
+            }
+        }, 200
+    except Exception as e:
+        return {'success': False, 'error': str(e)}, 500
+
+
+async def product_detail(request, session):
+    try:
+        product = await session.get(Product, request.path_params['product_id'])
+        if product is None:
+            return None
+
+        related_products = (await session.scalars(
+            select(Product).where(
+                Product.category == product.category,
+                Product.product_id != product.product_id
+            ).limit(4)
+        )).all()
+
+        return {
+            'success': True,
+            'data': {
+                'product': PRODUCT(product),
+                'related_products': many(PRODUCT_SUMMARY, related_products)
+            }
+        }, 200
+    except Exception as e:
+        return {'success': False, 'error': str(e)}, 500
+
+
+# -- orders (JWT) -----------------------------------------------------------
+
+async def get_order(request, session):
+    try:
+        order = await session.scalar(
+            select(Order).options(LOAD_ORDER_ITEMS).where(
+                Order.order_id == request.path_params['order_id'],
+                Order.user_id == request.user_id
+            )
+        )
+        if not order:
+            return {'success': False, 'error': 'Order not found'}, 404
+        return {'success': True, 'data': ORDER(order)}, 200
+    except Exception as e:
+        logger.exception("Error fetching order %s", request.path_params['order_id'])
+        return {'success': False, 'error': f'Failed to fetch order: {str(e)}'}, 500
+
+
+async def get_user_orders(request, session):
+    try:
+        orders = (await session.scalars(
+            select(Order).options(LOAD_ORDER_ITEMS)
+            .where(Order.user_id == request.user_id)
+            .order_by(Order.date.desc())
+        )).all()
+        orders_data = many(ORDER, orders)
+        return {
+            'success': True,
+            'data': {
+                'orders': orders_data,
+                'count': len(orders_data)
+            }
+        }, 200
+    except Exception as e:
+        logger.exception("Error fetching orders for user %s", request.user_id)
+        return {'success': False, 'error': f'Failed to fetch orders: {str(e)}'}, 500
+
+
+# -- auth (JWT) -------------------------------------------------------------
+
+async def current_profile(request, session):
+    try:
+        profile = await async_profile_cache.get(session, request.user_id)
+        if profile is None:
+            return {'success': False, 'error': 'User not found'}, 404
+        return {'success': True, 'data': {'user': profile}}, 200
+    except Exception as e:
+        logger.exception("Error loading profile")
+        return {'success': False, 'error': str(e)}, 500
+
+
+# (path regex, Flask endpoint, handler, rate-limit budget, catalog-cached, JWT required)
+ROUTES = [
+    (r'/api/', 'main.index', index, 'catalog', True, False),
+    (r'/api/products', 'products.products_list', products_list, 'catalog', True, False),
+    (r'/api/products/categories', 'products.get_categories', get_categories, 'catalog', True, False),
+    (r'/api/products/(?P<product_id>\d+)', 'products.product_detail', product_detail, 'catalog', True, False),
+    (r'/api/orders/(?P<order_id>\d+)', 'orders.get_order', get_order, 'shopping', False, True),
+    (r'/api/orders/user/all', 'orders.get_user_orders', get_user_orders, 'shopping', False, True),
+    (r'/api/auth/me', 'auth.get_current_user', current_profile, 'auth', False, True),
+    (r'/api/auth/profile', 'auth.get_profile', current_profile, 'auth', False, True),
+]
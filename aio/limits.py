@@ -0,0 +1,75 @@
+"""
+Per-blueprint rate-limit budgets for the ASGI handlers.
+
+Flask-Limiter only sees requests that reach Flask, so the async handlers
+draw from RATELIMIT_BUDGETS themselves with the `limits` async strategies.
+Storage, strategy, key prefix and identifiers match what Flask-Limiter's
+shared_limit uses (prefix, key, budget scope), so with a Redis storage URI
+both modes count against the same counters. The async Redis storage needs
+`limits[async-redis]`.
+"""
+import logging
+import time
+
+from limits import parse_many
+from limits.aio.strategies import STRATEGIES
+from limits.storage import storage_from_string
+
+logger = logging.getLogger('sleepcraft.aio')
+
+
+class AsyncRateLimiter:
+    def __init__(self):
+        self.enabled = False
+        self.strategy = None
+        self.prefix = ''
+        self.budgets = {}
+        self.headers_enabled = True
+        self.swallow_errors = True
+        self.errors = 0
+
+    def init_app(self, app):
+        config = app.config
+        uri = config.get('RATELIMIT_STORAGE_URI', 'memory://')
+        if not uri.startswith('async+'):
+            uri = f'async+{uri}'
+        storage = storage_from_string(uri, **config.get('RATELIMIT_STORAGE_OPTIONS', {}))
+        self.strategy = STRATEGIES[config.get('RATELIMIT_STRATEGY', 'fixed-window')](storage)
+        self.prefix = config.get('RATELIMIT_KEY_PREFIX', '')
+        self.budgets = {name: parse_many(value) for name, value in config.get('RATELIMIT_BUDGETS', {}).items()}
+        self.headers_enabled = config.get('RATELIMIT_HEADERS_ENABLED', True)
+        self.swallow_errors = config.get('RATELIMIT_SWALLOW_ERRORS', True)
+        self.enabled = config.get('RATELIMIT_ENABLED', True)
+
+    async def hit(self, budget, key):
+        """Count one request against `budget` for `key`.
+
+        Returns (allowed, headers): the X-RateLimit-* / Retry-After headers
+        Flask-Limiter would send for the tightest limit in the budget.
+        """
+        if not self.enabled:
+            return True, {}
+        identifiers = [self.prefix, key, budget] if self.prefix else [key, budget]
+        headers = {}
+        try:
+            for item in sorted(self.budgets.get(budget, ())):
+                allowed = await self.strategy.hit(item, *identifiers)
+                if (self.headers_enabled and not headers) or not allowed:
+                    reset_at, remaining = await self.strategy.get_window_stats(item, *identifiers)
+                    headers = {
+                        'X-RateLimit-Limit': str(item.amount),
+                        'X-RateLimit-Remaining': str(remaining),
+                        'X-RateLimit-Reset': str(int(reset_at)),
+                    }
+                if not allowed:
+                    headers['Retry-After'] = str(max(1, int(reset_at - time.time())))
+                    return False, headers
+        except Exception as e:
+            self.errors += 1
+            logger.warning("Error checking rate limit: %s", e)
+            if not self.swallow_errors:
+                raise
+        return True, headers if self.headers_enabled else {}
+
+
+async_limiter = AsyncRateLimiter()
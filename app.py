@@ -4,113 +4,163 @@ import os
 from dotenv import load_dotenv
 load_dotenv()
 
-from flask import Flask, jsonify, session, request
-from flask_cors import CORS
-from models import db, User, Product, Cart, Wishlist
-from config import Config
-from extensions import limiter, jwt
-
-app = Flask(__name__)
-app.config.from_object(Config)
-
-# Configure session cookies for cross-site OAuth redirects (localhost dev only).
-# In production, use HTTPS and proper domain/SameSite settings.
-app.config.update(
-    SESSION_COOKIE_SAMESITE='None',
-    SESSION_COOKIE_SECURE=False,  # Allow http://localhost for dev
-    SESSION_COOKIE_HTTPONLY=True,
-)
-
-# Debug: Print loaded config values
-print(f"DEBUG: GOOGLE_CLIENT_ID = {app.config.get('GOOGLE_CLIENT_ID')}")
-print(f"DEBUG: GOOGLE_CLIENT_SECRET = {app.config.get('GOOGLE_CLIENT_SECRET')}")
-print(f"DEBUG: JWT_SECRET_KEY = {app.config.get('JWT_SECRET_KEY')}")
-print(f"DEBUG: SECRET_KEY = {app.config.get('SECRET_KEY')}")
-
-# Enable CORS
-CORS(app, resources={
-    r"/*": {
-        "origins": ["http://localhost:3000"],  # Next.js frontend
-        "supports_credentials": True  # Required for session cookies
-    }
-})
-
-# Initialize extensions with app
-db.init_app(app)
-jwt.init_app(app)
-limiter.init_app(app)
-
-# Import token blocklist
-from utils.token_blocklist import is_token_blocked
-
-@jwt.token_in_blocklist_loader
-def check_if_token_is_revoked(jwt_header, jwt_payload):
-    jti = jwt_payload["jti"]
-    return is_token_blocked(jti)
-
-# JWT error handlers
-@jwt.expired_token_loader
-def expired_token_callback(jwt_header, jwt_payload):
-    return jsonify({
-        'success': False,
-        'message': 'The token has expired',
-        'error': 'token_expired'
-    }), 401
-
-@jwt.invalid_token_loader
-def invalid_token_callback(error):
-    print(f"DEBUG JWT invalid_token_loader: {error}")
-    return jsonify({
-        'success': False,
-        'message': 'Signature verification failed',
-        'error': 'invalid_token'
-    }), 401
-
-@jwt.unauthorized_loader
-def missing_token_callback(error):
-    print(f"DEBUG JWT unauthorized_loader: {error}")
-    return jsonify({
-        'success': False,
-        'message': 'Request does not contain an access token',
-        'error': 'authorization_required'
-    }), 401
-
-@jwt.needs_fresh_token_loader
-def token_not_fresh_callback(jwt_header, jwt_payload):
-    return jsonify({
-        'success': False,
-        'message': 'The token is not fresh',
-        'error': 'fresh_token_required'
-    }), 401
-
-# Import routes
-from routes.main import main_bp
-from routes.auth import auth_bp
-from routes.products import products_bp
-from routes.cart import cart_bp
-from routes.orders import orders_bp
-from routes.admin import admin_bp
-
-# Register Blueprints
-app.register_blueprint(main_bp, url_prefix='/api')
-app.register_blueprint(auth_bp, url_prefix='/api/auth')
-app.register_blueprint(products_bp, url_prefix='/api/products')
-app.register_blueprint(cart_bp, url_prefix='/api/cart')
-app.register_blueprint(orders_bp, url_prefix='/api/orders')
-app.register_blueprint(admin_bp, url_prefix='/api/admin')
-
-def create_tables():
+from flask import Flask, jsonify
+from config import Config, get_database_uri
+from models import db
+import migrations
+
+# The web stack - blueprints, limiter, JWT, caches, google-auth and Redis
+# clients - is imported inside create_app(), so CLI commands and scripts that
+# only need the database (create_cli_app) start without loading it.
+
+
+def _new_app(config_class):
+    app = Flask(__name__)
+    app.config.from_object(config_class)
+    app.config['SQLALCHEMY_DATABASE_URI'] = get_database_uri(app.config['SQLALCHEMY_DATABASE_URI'])
+    return app
+
+
+def create_cli_app(config_class=Config):
+    """App with only the database layer, for CLI commands and scripts.
+
+    Registers the same write hooks as the web app (summary tables, revenue
+    rollups, catalog and profile cache invalidation), so data changed from a
+    script stays consistent with what the API serves.
+    """
+    import utils.store_stats  # registers summary-table hooks on Order/User/Product
+    import utils.revenue_rollups  # registers daily revenue rollup hooks on Order
+    from utils.cache import catalog_cache
+    from utils.profile_cache import profile_cache
+
+    app = _new_app(config_class)
+    db.init_app(app)
+    catalog_cache.init_app(app)
+    profile_cache.init_app(app)
+    return app
+
+
+def create_app(config_class=Config):
+    """The API application."""
+    from flask_cors import CORS
+    from extensions import limiter, jwt
+    from routes import register_blueprints
+    from utils import db_pool, sql_instrumentation
+    from utils.cache import catalog_cache
+    from utils.db_routing import replica_router
+    from utils.google_certs import google_certs
+    from utils.json_provider import FastJSONProvider
+    from utils.password_hashing import password_hasher
+    from utils.profile_cache import profile_cache
+    from utils.suggest import suggest_index
+    from utils.token_blocklist import token_blocklist
+    import utils.store_stats  # registers summary-table hooks on Order/User/Product
+    import utils.revenue_rollups  # registers daily revenue rollup hooks on Order
+
+    app = _new_app(config_class)
+    app.json = FastJSONProvider(app)
+
+    # Configure session cookies for cross-site OAuth redirects (localhost dev only).
+    # In production, use HTTPS and proper domain/SameSite settings.
+    app.config.update(
+        SESSION_COOKIE_SAMESITE='None',
+        SESSION_COOKIE_SECURE=False,  # Allow http://localhost for dev
+        SESSION_COOKIE_HTTPONLY=True,
+    )
+
+    # Enable CORS
+    CORS(app, resources={
+        r"/*": {
+            "origins": app.config['CORS_ORIGINS'],  # Next.js frontend
+            "supports_credentials": True  # Required for session cookies
+        }
+    })
+
+    # Initialize extensions with app
+    db_pool.init_app(app)  # engine options must be in place before db.init_app
+    replica_router.init_app(app)  # adds the replica binds, with the same engine options
+    db.init_app(app)
+    with app.app_context():
+        for engine in db.engines.values():
+            db_pool.init_engine(app, engine)
+    jwt.init_app(app)
+    limiter.init_app(app)
+    catalog_cache.init_app(app)
+    sql_instrumentation.init_app(app)
+    google_certs.init_app(app)
+    password_hasher.init_app(app)
+    profile_cache.init_app(app)
+    token_blocklist.init_app(app)
+    suggest_index.init_app(app)
+    _register_jwt_handlers(jwt)
+    register_blueprints(app)
+    return app
+
+
+def _register_jwt_handlers(jwt):
+    from utils.token_blocklist import is_token_revoked
+
+    @jwt.token_in_blocklist_loader
+    def check_if_token_is_revoked(jwt_header, jwt_payload):
+        return is_token_revoked(jwt_payload)
+
+    # JWT error handlers
+    @jwt.expired_token_loader
+    def expired_token_callback(jwt_header, jwt_payload):
+        return jsonify({
+            'success': False,
+            'message': 'The token has expired',
+            'error': 'token_expired'
+        }), 401
+
+    @jwt.invalid_token_loader
+    def invalid_token_callback(error):
+        print(f"DEBUG JWT invalid_token_loader: {error}")
+        return jsonify({
+            'success': False,
+            'message': 'Signature verification failed',
+            'error': 'invalid_token'
+        }), 401
+
+    @jwt.unauthorized_loader
+    def missing_token_callback(error):
+        print(f"DEBUG JWT unauthorized_loader: {error}")
+        return jsonify({
+            'success': False,
+            'message': 'Request does not contain an access token',
+            'error': 'authorization_required'
+        }), 401
+
+    @jwt.needs_fresh_token_loader
+    def token_not_fresh_callback(jwt_header, jwt_payload):
+        return jsonify({
+            'success': False,
+            'message': 'The token is not fresh',
+            'error': 'fresh_token_required'
+        }), 401
+
+
+def __getattr__(name):
+    # `gunicorn app:app` and `from app import app` build the API app on first use
+    if name == 'app':
+        app = globals()['app'] = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def create_tables(app):
     try:
         with app.app_context():
             # Test the database connection
             db.engine.connect()
-            # Create tables
-            db.create_all()
-            print("Database connection successful and tables created.")
+            # Apply pending schema migrations
+            migrations.upgrade(db.engine)
+            print("Database connection successful and migrations applied.")
     except Exception as e:
         print(f"Error connecting to database: {e}")
         raise
 
 if __name__ == '__main__':
-    create_tables()
+    app = create_app()
+    create_tables(app)
     app.run(debug=True)
@@ -0,0 +1,15 @@
+"""
+ASGI entry point (see aio/ for what runs async):
+
+    uvicorn asgi:application --workers 4
+"""
+from app import create_app
+from aio import create_asgi_app
+from config import Config
+
+
+class ASGIConfig(Config):
+    ASGI_MODE = True
+
+
+application = create_asgi_app(create_app(ASGIConfig))
@@ -3,10 +3,12 @@ from datetime import timedelta
 from urllib.parse import urlparse
 
 
-# Helper function to validate and normalize DATABASE_URL before class definition
-def _get_database_uri():
-    """Validate and normalize DATABASE_URL for Aiven PostgreSQL."""
-    raw_url = os.environ.get('DATABASE_URL')
+def get_database_uri(raw_url):
+    """Validate and normalize DATABASE_URL for Aiven PostgreSQL.
+
+    Called by the app factories (app.create_app / create_cli_app), not at
+    import, so importing config never fails on a missing or bad URL.
+    """
     if not raw_url:
         raise RuntimeError('DATABASE_URL environment variable is required and must point to your Aiven PostgreSQL')
     
@@ -32,6 +34,18 @@ def _get_database_uri():
     return db_url
 
 
+def _get_replica_uris():
+    """DATABASE_REPLICA_URLS as a list, with the same scheme normalisation as DATABASE_URL."""
+    uris = []
+    for raw_url in os.environ.get('DATABASE_REPLICA_URLS', '').split(','):
+        db_url = raw_url.strip()
+        if db_url.startswith('postgres://'):
+            db_url = db_url.replace('postgres://', 'postgresql://', 1)
+        if db_url:
+            uris.append(db_url)
+    return uris
+
+
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'anupam-world-secret-key-2024'
 
@@ -44,12 +58,17 @@ class Config:
     # DATABASE configuration - Aiven PostgreSQL required
     # The application requires a valid DATABASE_URL environment variable pointing
     # to an Aiven PostgreSQL instance. Do NOT use sqlite or placeholders in production.
-    SQLALCHEMY_DATABASE_URI = _get_database_uri()
+    # Checked and normalized by get_database_uri() when an app is created.
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL')
 
     # OAuth Configuration
     GOOGLE_CLIENT_ID = os.environ.get('GOOGLE_CLIENT_ID')
     GOOGLE_CLIENT_SECRET = os.environ.get('GOOGLE_CLIENT_SECRET')
     GOOGLE_DISCOVERY_URL = "https://accounts.google.com/.well-known/openid-configuration"
+    # Signing certificates for ID tokens, cached per Cache-Control (utils.google_certs)
+    GOOGLE_CERTS_URL = os.environ.get('GOOGLE_CERTS_URL', 'https://www.googleapis.com/oauth2/v1/certs')
+    GOOGLE_HTTP_TIMEOUT = float(os.environ.get('GOOGLE_HTTP_TIMEOUT', 5))  # seconds
+    GOOGLE_HTTP_POOL_SIZE = int(os.environ.get('GOOGLE_HTTP_POOL_SIZE', 10))
 
     # SSL Configuration for Aiven (optional - only added if cert env vars provided)
     # SSL configuration: Aiven typically requires sslmode=require. If you have
@@ -64,8 +83,115 @@ class Config:
     }
 
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Connection pool (see utils.db_pool). DB_MAX_CONNECTIONS is this service's
+    # share of the Aiven plan's connection limit, split across WEB_CONCURRENCY
+    # worker processes; DB_POOL_SIZE/DB_MAX_OVERFLOW override the computed sizes.
+    WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', 1))  # worker processes
+    WEB_THREADS = int(os.environ.get('WEB_THREADS', 8))  # request threads per worker
+    DB_MAX_CONNECTIONS = int(os.environ.get('DB_MAX_CONNECTIONS', 20))
+    DB_POOL_SIZE = int(os.environ['DB_POOL_SIZE']) if os.environ.get('DB_POOL_SIZE') else None
+    DB_MAX_OVERFLOW = int(os.environ['DB_MAX_OVERFLOW']) if os.environ.get('DB_MAX_OVERFLOW') else None
+    DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 10))  # seconds to wait for a connection
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 300))  # seconds; under the idle-drop timeout
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', 'true').lower() != 'false'
+    DB_CONNECT_TIMEOUT = int(os.environ.get('DB_CONNECT_TIMEOUT', 10))  # seconds
+    DB_STATEMENT_TIMEOUT_MS = int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', 15000))  # 0 disables
+    DB_PGBOUNCER = os.environ.get('DB_PGBOUNCER', 'false').lower() == 'true'  # transaction pooling
+
+    # Read replicas (see utils.db_routing): reads of GET requests go to a replica
+    # that is at most REPLICA_MAX_LAG seconds behind; clients that just wrote are
+    # pinned to the primary for REPLICA_PIN_SECONDS (default: max lag + check interval)
+    DATABASE_REPLICA_URLS = _get_replica_uris()
+    REPLICA_MAX_LAG = float(os.environ.get('REPLICA_MAX_LAG', 5))  # seconds
+    REPLICA_LAG_CHECK_INTERVAL = float(os.environ.get('REPLICA_LAG_CHECK_INTERVAL', 2))  # seconds
+    REPLICA_PIN_SECONDS = float(os.environ['REPLICA_PIN_SECONDS']) if os.environ.get('REPLICA_PIN_SECONDS') else None
+    REPLICA_PIN_REDIS_URL = os.environ.get('REPLICA_PIN_REDIS_URL')  # share pins across workers
+    REPLICA_PRIMARY_ENDPOINTS = [e for e in os.environ.get('REPLICA_PRIMARY_ENDPOINTS', '').split(',') if e]
+
+    # Browser origins allowed to call the API with credentials (comma-separated)
+    CORS_ORIGINS = os.environ.get('CORS_ORIGINS', 'http://localhost:3000').split(',')
     PERMANENT_SESSION_LIFETIME = timedelta(days=7)
 
+    # Catalog read-through cache (in-process LRU, optional shared Redis tier)
+    CATALOG_CACHE_ENABLED = os.environ.get('CATALOG_CACHE_ENABLED', 'true').lower() != 'false'
+    CATALOG_CACHE_TTL = int(os.environ.get('CATALOG_CACHE_TTL', 300))  # seconds
+    CATALOG_CACHE_MAX_ENTRIES = int(os.environ.get('CATALOG_CACHE_MAX_ENTRIES', 1024))
+    CATALOG_CACHE_REDIS_URL = os.environ.get('CATALOG_CACHE_REDIS_URL')  # e.g. redis://localhost:6379/1
+    # Catalog responses carry ETag/Last-Modified; no-cache makes browsers revalidate (and get 304s)
+    CATALOG_CACHE_CONTROL = os.environ.get('CATALOG_CACHE_CONTROL', 'public, no-cache')
+
+    # SQL instrumentation: slow-query log, and Server-Timing headers (query counts and
+    # timings) only when opted in with SERVER_TIMING_ENABLED=true - unset means app.debug
+    SERVER_TIMING_ENABLED = (os.environ['SERVER_TIMING_ENABLED'].lower() == 'true'
+                             if os.environ.get('SERVER_TIMING_ENABLED') else None)
+    SLOW_QUERY_THRESHOLD_MS = float(os.environ.get('SLOW_QUERY_THRESHOLD_MS', 200))
+    SLOW_QUERY_LOG_FILE = os.environ.get('SLOW_QUERY_LOG_FILE')  # stderr when unset
+
+    # Redis (token blocklist): bounded pool and short timeouts so a slow
+    # Redis cannot stall every authenticated request
+    REDIS_HOST = os.environ.get('REDIS_HOST', 'localhost')
+    REDIS_PORT = int(os.environ.get('REDIS_PORT', 6379))
+    REDIS_DB = int(os.environ.get('REDIS_DB', 0))
+    REDIS_MAX_CONNECTIONS = int(os.environ.get('REDIS_MAX_CONNECTIONS', 50))
+    REDIS_SOCKET_TIMEOUT = float(os.environ.get('REDIS_SOCKET_TIMEOUT', 0.1))  # seconds
+    REDIS_CONNECT_TIMEOUT = float(os.environ.get('REDIS_CONNECT_TIMEOUT', 0.1))  # seconds
+
+    # Token blocklist verdict cache, circuit breaker and per-user epoch cache
+    TOKEN_BLOCKLIST_CACHE_TTL = int(os.environ.get('TOKEN_BLOCKLIST_CACHE_TTL', 5))  # seconds, allowed verdicts
+    TOKEN_BLOCKLIST_CACHE_MAX_ENTRIES = int(os.environ.get('TOKEN_BLOCKLIST_CACHE_MAX_ENTRIES', 10000))
+    TOKEN_BLOCKLIST_BREAKER_THRESHOLD = int(os.environ.get('TOKEN_BLOCKLIST_BREAKER_THRESHOLD', 5))
+    TOKEN_BLOCKLIST_BREAKER_RESET = float(os.environ.get('TOKEN_BLOCKLIST_BREAKER_RESET', 30))  # seconds
+    TOKEN_EPOCH_CACHE_TTL = int(os.environ.get('TOKEN_EPOCH_CACHE_TTL', 5))  # seconds, per-user epochs
+
+    # Rate limiting (Flask-Limiter). Point RATELIMIT_STORAGE_URI at Redis
+    # (e.g. redis://localhost:6379/2) so all workers share counters; the
+    # in-memory store is the stand-in for tests and single-process runs.
+    # fixed-window costs one atomic INCR+EXPIRE script call per limit.
+    RATELIMIT_STORAGE_URI = os.environ.get('RATELIMIT_STORAGE_URI', 'memory://')
+    RATELIMIT_STORAGE_OPTIONS = {
+        'socket_timeout': float(os.environ.get('REDIS_SOCKET_TIMEOUT', 0.1)),
+        'socket_connect_timeout': float(os.environ.get('REDIS_CONNECT_TIMEOUT', 0.1)),
+        'max_connections': int(os.environ.get('REDIS_MAX_CONNECTIONS', 50)),
+    } if RATELIMIT_STORAGE_URI.startswith('redis') else {}
+    RATELIMIT_STRATEGY = os.environ.get('RATELIMIT_STRATEGY', 'fixed-window')
+    RATELIMIT_KEY_PREFIX = 'sleepcraft'
+    RATELIMIT_DEFAULT = os.environ.get('RATELIMIT_DEFAULT', '2000 per hour')
+    RATELIMIT_IN_MEMORY_FALLBACK_ENABLED = True  # keep limiting per worker if Redis is down
+    RATELIMIT_SWALLOW_ERRORS = True
+    RATELIMIT_HEADERS_ENABLED = True
+    # Per-blueprint budgets (see extensions.limit_blueprint)
+    RATELIMIT_BUDGETS = {
+        'catalog': os.environ.get('RATELIMIT_CATALOG', '600 per minute'),
+        'shopping': os.environ.get('RATELIMIT_SHOPPING', '120 per minute'),
+        'auth': os.environ.get('RATELIMIT_AUTH', '30 per minute'),
+        'admin': os.environ.get('RATELIMIT_ADMIN', '300 per minute'),
+    }
+
+    # /api/auth/me profile cache: short-lived local LRU, optional shared Redis tier
+    PROFILE_CACHE_LOCAL_TTL = int(os.environ.get('PROFILE_CACHE_LOCAL_TTL', 30))  # seconds
+    PROFILE_CACHE_TTL = int(os.environ.get('PROFILE_CACHE_TTL', 300))  # seconds, Redis tier
+    PROFILE_CACHE_MAX_ENTRIES = int(os.environ.get('PROFILE_CACHE_MAX_ENTRIES', 10000))
+    PROFILE_CACHE_REDIS_URL = os.environ.get('PROFILE_CACHE_REDIS_URL')  # e.g. redis://localhost:6379/3
+
+    # Password hashing: werkzeug method string, and a bounded process pool per app worker
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))  # 0 = hash inline
+    PASSWORD_HASH_QUEUE_DEPTH = int(os.environ.get('PASSWORD_HASH_QUEUE_DEPTH', 16))
+    PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 10))  # seconds
+
+    # Admin CSV/NDJSON exports: rows fetched per server-side cursor round trip
+    EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', 1000))
+
+    # Optional ASGI mode (asgi.py): async handlers for catalog/order/profile reads.
+    # Set by asgi.py; the worker's DB_MAX_CONNECTIONS share is then split between
+    # the sync pool (one connection per Flask thread) and the asyncpg pool.
+    # The ASYNC_DB_* sizes and the thread count override the computed ones.
+    ASGI_MODE = False
+    ASYNC_DB_POOL_SIZE = int(os.environ['ASYNC_DB_POOL_SIZE']) if os.environ.get('ASYNC_DB_POOL_SIZE') else None
+    ASYNC_DB_MAX_OVERFLOW = int(os.environ['ASYNC_DB_MAX_OVERFLOW']) if os.environ.get('ASYNC_DB_MAX_OVERFLOW') else None
+    ASGI_WSGI_THREADS = int(os.environ['ASGI_WSGI_THREADS']) if os.environ.get('ASGI_WSGI_THREADS') else None
+
     # Upload settings
     UPLOAD_FOLDER = 'static/uploads'
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
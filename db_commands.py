@@ -1,31 +1,64 @@
-from flask import Flask
+from app import create_cli_app
 from models import db
-from config import Config
+from utils import revenue_rollups, store_stats
+import migrations
 import sys
 
-app = Flask(__name__)
-app.config.from_object(Config)
-db.init_app(app)
+app = create_cli_app()
 
 def init_db():
+    """Apply all pending schema migrations (replaces db.create_all())."""
     with app.app_context():
         try:
             # Test connection
             db.engine.connect()
             print("Successfully connected to the database")
             
-            # Create tables
-            db.create_all()
-            print("Successfully created all tables")
+            applied = migrations.upgrade(db.engine)
+            print(f"Successfully applied {len(applied)} migration(s)")
             
         except Exception as e:
             print(f"Error: {e}")
             sys.exit(1)
 
+def migration_status():
+    with app.app_context():
+        for version, done in migrations.status(db.engine):
+            print(f"  [{'x' if done else ' '}] {version}")
+
+def rebuild_stats():
+    """Recompute the store_stats summary row from the order/user/product tables."""
+    with app.app_context():
+        try:
+            store_stats.rebuild()
+            print("Successfully rebuilt store stats")
+        except Exception as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+
+def rebuild_rollups():
+    """Recompute the daily revenue rollup tables from the order tables."""
+    with app.app_context():
+        try:
+            revenue_rollups.rebuild()
+            print("Successfully rebuilt revenue rollups")
+        except Exception as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+
 if __name__ == "__main__":
     if len(sys.argv) > 1:
-        if sys.argv[1] == "init":
+        if sys.argv[1] in ("init", "migrate"):
             init_db()
+        elif sys.argv[1] == "status":
+            migration_status()
+        elif sys.argv[1] == "rebuild-stats":
+            rebuild_stats()
+        elif sys.argv[1] == "rebuild-rollups":
+            rebuild_rollups()
     else:
         print("Available commands:")
-        print("python db_commands.py init  - Initialize the database")
\ No newline at end of file
+        print("python db_commands.py migrate         - Apply pending schema migrations (alias: init)")
+        print("python db_commands.py status          - List applied and pending migrations")
+        print("python db_commands.py rebuild-stats   - Rebuild the admin dashboard summary table")
+        print("python db_commands.py rebuild-rollups - Rebuild the daily revenue rollup tables")
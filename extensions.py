@@ -2,14 +2,45 @@
 Shared Flask extensions (limiter, jwt, etc.) to avoid circular imports.
 Import from this module instead of directly from app.
 """
+from flask import current_app, g, request
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
-from flask_jwt_extended import JWTManager
+from flask_jwt_extended import JWTManager, decode_token
 
-limiter = Limiter(
-    key_func=get_remote_address,
-    default_limits=["200 per day", "50 per hour"],
-    storage_uri="memory://"
-)
+
+def rate_limit_key():
+    """Rate limit authenticated traffic per user, anonymous traffic per IP.
+
+    Keying by JWT identity stops users behind one NAT/proxy from sharing a
+    budget and stops one user spreading requests over many IPs. The token is
+    only decoded here (signature and expiry), not checked against the
+    blocklist - that still happens in jwt_required.
+    """
+    if 'rate_limit_key' not in g:
+        key = None
+        auth = request.headers.get('Authorization', '')
+        if auth.startswith('Bearer '):
+            try:
+                key = f"user:{decode_token(auth[7:])['sub']}"
+            except Exception:
+                key = None
+        g.rate_limit_key = key or get_remote_address()
+    return g.rate_limit_key
+
+
+# Storage, strategy and default limits come from the RATELIMIT_* settings in
+# config.py, so production can point every worker at one Redis while tests
+# and local runs keep the in-memory store.
+limiter = Limiter(key_func=rate_limit_key)
 
 jwt = JWTManager()
+
+
+def limit_blueprint(blueprint, budget):
+    """Give every route in `blueprint` a share of the RATELIMIT_BUDGETS[budget] limit.
+
+    Blueprints with the same budget draw from the same counter. Routes with
+    their own @limiter.limit keep that limit instead.
+    """
+    limiter.shared_limit(lambda: current_app.config['RATELIMIT_BUDGETS'][budget], scope=budget)(blueprint)
+    return blueprint
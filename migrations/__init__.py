@@ -0,0 +1,79 @@
+"""
+Versioned schema migrations.
+
+Each module in migrations/versions is named NNNN_description.py and defines
+upgrade(conn). Applied versions are recorded in the schema_migrations table
+and pending ones run in order, each in its own transaction. Modules that set
+TRANSACTIONAL = False (e.g. CREATE INDEX CONCURRENTLY, which Postgres refuses
+to run inside a transaction) get an autocommit connection instead, so their
+statements must be idempotent.
+
+    python db_commands.py migrate   - apply pending migrations
+    python db_commands.py status    - list applied/pending migrations
+
+New schema changes go in a new version module; never edit an applied one.
+"""
+import importlib
+import pkgutil
+from datetime import datetime
+
+from sqlalchemy import text
+
+from migrations import versions
+
+_CREATE_TABLE = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version VARCHAR(100) PRIMARY KEY,
+    applied_at TIMESTAMP NOT NULL
+)
+"""
+
+
+def available():
+    """All migration modules, ordered by version."""
+    names = sorted(m.name for m in pkgutil.iter_modules(versions.__path__) if m.name[:4].isdigit())
+    return [(name, importlib.import_module(f'{versions.__name__}.{name}')) for name in names]
+
+
+def applied(engine):
+    with engine.begin() as conn:
+        conn.execute(text(_CREATE_TABLE))
+        return {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+
+def _record(conn, version):
+    conn.execute(
+        text("INSERT INTO schema_migrations (version, applied_at) VALUES (:version, :applied_at)"),
+        {'version': version, 'applied_at': datetime.utcnow()}
+    )
+
+
+def upgrade(engine):
+    """Apply every pending migration; returns the versions applied."""
+    done = applied(engine)
+    ran = []
+    for version, module in available():
+        if version in done:
+            continue
+        print(f"Applying migration {version}")
+        # Index builds and backfills may outlast DB_STATEMENT_TIMEOUT_MS
+        if getattr(module, 'TRANSACTIONAL', True):
+            with engine.begin() as conn:
+                conn.execute(text("SET LOCAL statement_timeout = 0"))
+                module.upgrade(conn)
+                _record(conn, version)
+        else:
+            with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+                conn.execute(text("SET statement_timeout = 0"))
+                try:
+                    module.upgrade(conn)
+                    _record(conn, version)
+                finally:
+                    conn.execute(text("RESET statement_timeout"))  # back to the connection default
+        ran.append(version)
+    return ran
+
+
+def status(engine):
+    done = applied(engine)
+    return [(version, version in done) for version, _ in available()]
@@ -0,0 +1,80 @@
+"""Baseline schema, as previously created by db.create_all()."""
+
+STATEMENTS = [
+    """
+    CREATE TABLE IF NOT EXISTS product (
+        product_id SERIAL PRIMARY KEY,
+        name VARCHAR(255) NOT NULL,
+        category VARCHAR(100) NOT NULL,
+        mrp FLOAT NOT NULL,
+        discount FLOAT,
+        description TEXT,
+        image_url VARCHAR(255)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS users (
+        user_id SERIAL PRIMARY KEY,
+        name VARCHAR(150) NOT NULL,
+        email VARCHAR(150) NOT NULL UNIQUE,
+        password_hash VARCHAR(200),
+        mobile_number VARCHAR(20) UNIQUE,
+        type_of_product VARCHAR(100),
+        oauth_provider VARCHAR(50),
+        oauth_id VARCHAR(200),
+        profile_picture VARCHAR(500),
+        is_verified BOOLEAN,
+        last_login TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS cart (
+        cart_id SERIAL PRIMARY KEY,
+        user_id INTEGER NOT NULL REFERENCES users (user_id),
+        product_id INTEGER NOT NULL REFERENCES product (product_id),
+        quantity INTEGER NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS wishlist (
+        wishlist_id SERIAL PRIMARY KEY,
+        user_id INTEGER NOT NULL REFERENCES users (user_id),
+        product_id INTEGER NOT NULL REFERENCES product (product_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS "order" (
+        order_id SERIAL PRIMARY KEY,
+        user_id INTEGER NOT NULL REFERENCES users (user_id),
+        status VARCHAR(50) NOT NULL,
+        invoice VARCHAR(255),
+        product_id INTEGER NOT NULL REFERENCES product (product_id),
+        payment FLOAT NOT NULL,
+        date TIMESTAMP,
+        mode_of_payment VARCHAR(50)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS service (
+        service_id SERIAL PRIMARY KEY,
+        address TEXT NOT NULL,
+        service_status VARCHAR(50) NOT NULL,
+        payment FLOAT NOT NULL,
+        user_id INTEGER NOT NULL REFERENCES users (user_id),
+        date TIMESTAMP,
+        agent VARCHAR(100)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS address_book (
+        address_id SERIAL PRIMARY KEY,
+        user_id INTEGER NOT NULL REFERENCES users (user_id),
+        address TEXT NOT NULL
+    )
+    """,
+]
+
+
+def upgrade(conn):
+    for statement in STATEMENTS:
+        conn.exec_driver_sql(statement)
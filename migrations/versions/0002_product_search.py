@@ -0,0 +1,21 @@
+"""Generated tsvector column plus GIN full-text and trigram indexes for product search.
+
+The search document is frozen here as it was when this migration was written;
+models.PRODUCT_SEARCH_DOCUMENT may change later, through a new migration.
+"""
+
+SEARCH_DOCUMENT = (
+    "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(category, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'C')"
+)
+
+
+def upgrade(conn):
+    conn.exec_driver_sql("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    conn.exec_driver_sql(
+        "ALTER TABLE product ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        f"GENERATED ALWAYS AS ({SEARCH_DOCUMENT}) STORED"
+    )
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_product_search_vector ON product USING gin (search_vector)")
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_product_name_trgm ON product USING gin (name gin_trgm_ops)")
@@ -0,0 +1,44 @@
+"""Dashboard summary row, daily revenue rollups and checkout idempotency keys."""
+
+STATEMENTS = [
+    """
+    CREATE TABLE IF NOT EXISTS store_stats (
+        stats_id INTEGER PRIMARY KEY,
+        total_users INTEGER NOT NULL DEFAULT 0,
+        total_products INTEGER NOT NULL DEFAULT 0,
+        total_orders INTEGER NOT NULL DEFAULT 0,
+        total_revenue FLOAT NOT NULL DEFAULT 0,
+        pending_orders INTEGER NOT NULL DEFAULT 0,
+        confirmed_orders INTEGER NOT NULL DEFAULT 0,
+        shipped_orders INTEGER NOT NULL DEFAULT 0,
+        delivered_orders INTEGER NOT NULL DEFAULT 0,
+        cancelled_orders INTEGER NOT NULL DEFAULT 0,
+        rebuilt_at TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS revenue_daily (
+        day DATE NOT NULL,
+        payment_mode VARCHAR(50) NOT NULL,
+        revenue FLOAT NOT NULL DEFAULT 0,
+        order_count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, payment_mode)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS idempotency_key (
+        key_id SERIAL PRIMARY KEY,
+        user_id INTEGER NOT NULL REFERENCES users (user_id),
+        key VARCHAR(255) NOT NULL,
+        status_code INTEGER,
+        response_body TEXT,
+        created_at TIMESTAMP,
+        CONSTRAINT uq_idempotency_key_user_key UNIQUE (user_id, key)
+    )
+    """,
+]
+
+
+def upgrade(conn):
+    for statement in STATEMENTS:
+        conn.exec_driver_sql(statement)
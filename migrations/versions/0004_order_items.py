@@ -0,0 +1,84 @@
+"""Fold one-product-per-row orders into order headers with order_item lines.
+
+The old checkout wrote one row per product, each stamped with its own
+datetime.now(), so a checkout's rows are milliseconds apart and may straddle
+a second boundary; their statuses were also changed row by row afterwards.
+Rows are therefore grouped per user and payment mode by time alone: ordered
+by date, a row more than 5 seconds after the previous one starts a new
+checkout. Each checkout becomes one header that keeps its lowest order_id
+and that row's status; each old row becomes a line with quantity 1 at its
+paid amount, since the old schema did not record quantities. The header's
+payment becomes the sum of its lines. Rows without a date are left as
+orders of their own.
+"""
+
+STATEMENTS = [
+    """
+    CREATE TABLE IF NOT EXISTS order_item (
+        order_item_id SERIAL PRIMARY KEY,
+        order_id INTEGER NOT NULL REFERENCES "order" (order_id) ON DELETE CASCADE,
+        product_id INTEGER NOT NULL REFERENCES product (product_id),
+        quantity INTEGER NOT NULL,
+        unit_price FLOAT NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS category_revenue_daily (
+        day DATE NOT NULL,
+        category VARCHAR(100) NOT NULL,
+        revenue FLOAT NOT NULL DEFAULT 0,
+        units INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, category)
+    )
+    """,
+]
+
+FOLD_STATEMENTS = [
+    """
+    INSERT INTO order_item (order_id, product_id, quantity, unit_price)
+    WITH gaps AS (
+        SELECT order_id, product_id, payment, user_id, coalesce(mode_of_payment, '') AS mode, date,
+               CASE WHEN date - lag(date) OVER w <= interval '5 seconds' THEN 0 ELSE 1 END AS new_checkout
+        FROM "order"
+        WINDOW w AS (PARTITION BY user_id, coalesce(mode_of_payment, '') ORDER BY date, order_id)
+    ),
+    checkouts AS (
+        SELECT order_id, product_id, payment, user_id, mode,
+               sum(new_checkout) OVER (PARTITION BY user_id, mode ORDER BY date, order_id) AS checkout
+        FROM gaps
+    )
+    SELECT min(order_id) OVER (PARTITION BY user_id, mode, checkout), product_id, 1, payment
+    FROM checkouts
+    """,
+    """
+    UPDATE "order" o SET payment = t.total
+    FROM (SELECT order_id, sum(unit_price * quantity) AS total FROM order_item GROUP BY order_id) t
+    WHERE o.order_id = t.order_id
+    """,
+    """
+    DELETE FROM "order" o
+    WHERE NOT EXISTS (SELECT 1 FROM order_item i WHERE i.order_id = o.order_id)
+    """,
+    'ALTER TABLE "order" DROP COLUMN product_id',
+]
+
+
+def upgrade(conn):
+    # Databases upgraded by hand with the old per-product category rollups
+    legacy_rollups = conn.exec_driver_sql(
+        "SELECT 1 FROM information_schema.columns "
+        "WHERE table_name = 'category_revenue_daily' AND column_name = 'order_count'"
+    ).first()
+    if legacy_rollups:
+        conn.exec_driver_sql("DROP TABLE category_revenue_daily")
+
+    for statement in STATEMENTS:
+        conn.exec_driver_sql(statement)
+
+    legacy_orders = conn.exec_driver_sql(
+        "SELECT 1 FROM information_schema.columns "
+        "WHERE table_name = 'order' AND column_name = 'product_id'"
+    ).first()
+    if legacy_orders:
+        for statement in FOLD_STATEMENTS:
+            conn.exec_driver_sql(statement)
@@ -0,0 +1,61 @@
+"""Build the dashboard summary row and revenue rollups from the order tables.
+
+Frozen SQL for the schema as of this migration, rather than the live
+utils.store_stats / utils.revenue_rollups rebuilds, which follow later
+schema changes (e.g. the shard columns added in 0011).
+"""
+
+STATEMENTS = [
+    """
+    INSERT INTO store_stats (
+        stats_id, total_users, total_products, total_orders, total_revenue, pending_orders,
+        confirmed_orders, shipped_orders, delivered_orders, cancelled_orders, rebuilt_at
+    )
+    SELECT 1,
+           (SELECT count(*) FROM users),
+           (SELECT count(*) FROM product),
+           count(*),
+           coalesce(sum(payment), 0),
+           count(*) FILTER (WHERE status = 'pending'),
+           count(*) FILTER (WHERE status = 'confirmed'),
+           count(*) FILTER (WHERE status = 'shipped'),
+           count(*) FILTER (WHERE status = 'delivered'),
+           count(*) FILTER (WHERE status = 'cancelled'),
+           now() AT TIME ZONE 'UTC'
+    FROM "order"
+    ON CONFLICT (stats_id) DO UPDATE SET
+        total_users = excluded.total_users,
+        total_products = excluded.total_products,
+        total_orders = excluded.total_orders,
+        total_revenue = excluded.total_revenue,
+        pending_orders = excluded.pending_orders,
+        confirmed_orders = excluded.confirmed_orders,
+        shipped_orders = excluded.shipped_orders,
+        delivered_orders = excluded.delivered_orders,
+        cancelled_orders = excluded.cancelled_orders,
+        rebuilt_at = excluded.rebuilt_at
+    """,
+    "DELETE FROM revenue_daily",
+    "DELETE FROM category_revenue_daily",
+    """
+    INSERT INTO revenue_daily (day, payment_mode, revenue, order_count)
+    SELECT date(date), coalesce(mode_of_payment, ''), sum(payment), count(*)
+    FROM "order"
+    WHERE status <> 'cancelled' AND date IS NOT NULL
+    GROUP BY date(date), coalesce(mode_of_payment, '')
+    """,
+    """
+    INSERT INTO category_revenue_daily (day, category, revenue, units)
+    SELECT date(o.date), p.category, sum(i.unit_price * i.quantity), sum(i.quantity)
+    FROM order_item i
+    JOIN "order" o ON o.order_id = i.order_id
+    JOIN product p ON p.product_id = i.product_id
+    WHERE o.status <> 'cancelled' AND o.date IS NOT NULL
+    GROUP BY date(o.date), p.category
+    """,
+]
+
+
+def upgrade(conn):
+    for statement in STATEMENTS:
+        conn.exec_driver_sql(statement)
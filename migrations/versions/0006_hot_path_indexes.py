@@ -0,0 +1,31 @@
+"""Indexes for the per-user, per-status and per-category lookups on the request path.
+
+Built CONCURRENTLY so they can be added to a live database without blocking
+writes; that cannot run inside a transaction, hence TRANSACTIONAL = False.
+"""
+TRANSACTIONAL = False
+
+INDEXES = [
+    'ix_cart_user_id ON cart (user_id)',
+    'ix_wishlist_user_product ON wishlist (user_id, product_id)',
+    'ix_order_user_date ON "order" (user_id, date)',
+    'ix_order_status_date ON "order" (status, date)',
+    'ix_order_date_id ON "order" (date, order_id)',
+    'ix_order_item_order_id ON order_item (order_id)',
+    'ix_order_item_product_id ON order_item (product_id)',
+    'ix_product_category ON product (category)',
+]
+
+
+def upgrade(conn):
+    for index in INDEXES:
+        # A failed concurrent build leaves an INVALID index behind; drop it so IF NOT EXISTS retries
+        name = index.split(' ON ')[0]
+        invalid = conn.exec_driver_sql(
+            "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname = %(name)s AND NOT i.indisvalid",
+            {'name': name}
+        ).first()
+        if invalid:
+            conn.exec_driver_sql(f"DROP INDEX CONCURRENTLY {name}")
+        conn.exec_driver_sql(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {index}")
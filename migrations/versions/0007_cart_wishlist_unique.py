@@ -0,0 +1,53 @@
+"""One cart line and one wishlist entry per (user, product).
+
+The cart and wishlist routes upsert with ON CONFLICT (user_id, product_id),
+which needs a unique constraint to arbitrate. Existing duplicates are merged
+first (cart quantities summed, capped at 99, onto the oldest row), then the
+unique index is built CONCURRENTLY and attached as a constraint. It leads
+with user_id, so it replaces the plain per-user indexes from 0006.
+"""
+TRANSACTIONAL = False
+
+CONSTRAINTS = [
+    ('cart', 'uq_cart_user_product', 'ix_cart_user_id'),
+    ('wishlist', 'uq_wishlist_user_product', 'ix_wishlist_user_product'),
+]
+
+DEDUPE = [
+    """
+    UPDATE cart SET quantity = merged.quantity
+    FROM (
+        SELECT min(cart_id) AS cart_id, LEAST(sum(quantity), 99) AS quantity
+        FROM cart GROUP BY user_id, product_id HAVING count(*) > 1
+    ) AS merged
+    WHERE cart.cart_id = merged.cart_id
+    """,
+    """
+    DELETE FROM cart c USING cart keep
+    WHERE c.user_id = keep.user_id AND c.product_id = keep.product_id AND c.cart_id > keep.cart_id
+    """,
+    """
+    DELETE FROM wishlist w USING wishlist keep
+    WHERE w.user_id = keep.user_id AND w.product_id = keep.product_id AND w.wishlist_id > keep.wishlist_id
+    """,
+]
+
+
+def _exists(conn, query, name):
+    return conn.exec_driver_sql(query, {'name': name}).first() is not None
+
+
+def upgrade(conn):
+    for table, constraint, _ in CONSTRAINTS:
+        if _exists(conn, "SELECT 1 FROM pg_constraint WHERE conname = %(name)s", constraint):
+            continue
+        for statement in DEDUPE:
+            conn.exec_driver_sql(statement)
+        # A failed concurrent build leaves an INVALID index behind; drop it and retry
+        if _exists(conn, "SELECT 1 FROM pg_class WHERE relname = %(name)s", constraint):
+            conn.exec_driver_sql(f"DROP INDEX CONCURRENTLY {constraint}")
+        conn.exec_driver_sql(f"CREATE UNIQUE INDEX CONCURRENTLY {constraint} ON {table} (user_id, product_id)")
+        conn.exec_driver_sql(f"ALTER TABLE {table} ADD CONSTRAINT {constraint} UNIQUE USING INDEX {constraint}")
+
+    for _, _, redundant in CONSTRAINTS:
+        conn.exec_driver_sql(f"DROP INDEX CONCURRENTLY IF EXISTS {redundant}")
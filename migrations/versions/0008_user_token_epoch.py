@@ -0,0 +1,8 @@
+"""Per-user token epoch: tokens carry the epoch they were issued under and are
+rejected once the user's epoch has moved past it."""
+
+
+def upgrade(conn):
+    conn.exec_driver_sql(
+        "ALTER TABLE users ADD COLUMN IF NOT EXISTS token_epoch INTEGER NOT NULL DEFAULT 0"
+    )
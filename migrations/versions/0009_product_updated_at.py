@@ -0,0 +1,11 @@
+"""Product.updated_at, the basis for catalog Last-Modified validators.
+
+Existing rows start at the migration time. Only ORM writes maintain it
+(onupdate); bulk SQL updates to product must set it themselves.
+"""
+
+
+def upgrade(conn):
+    conn.exec_driver_sql(
+        "ALTER TABLE product ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP NOT NULL DEFAULT now()"
+    )
@@ -0,0 +1,12 @@
+"""Order.date NOT NULL, so it can key the admin orders cursor.
+
+Rows without a date get 1970-01-01: they sort last in the newest-first
+listing and stay outside every revenue window, as the rollup rebuild
+already treated them.
+"""
+
+
+def upgrade(conn):
+    conn.exec_driver_sql("""UPDATE "order" SET date = '1970-01-01' WHERE date IS NULL""")
+    conn.exec_driver_sql("""ALTER TABLE "order" ALTER COLUMN date SET DEFAULT now()""")
+    conn.exec_driver_sql("""ALTER TABLE "order" ALTER COLUMN date SET NOT NULL""")
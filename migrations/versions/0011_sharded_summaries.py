@@ -0,0 +1,27 @@
+"""Shard the summary counters and exclude cancelled orders from dashboard revenue.
+
+revenue_daily and category_revenue_daily get a `shard` column in their
+primary keys; existing rows become shard 0. store_stats keeps its rows -
+the shards are added by writes - and its revenue is recomputed without
+cancelled orders, matching the revenue analytics.
+"""
+
+STATEMENTS = [
+    "ALTER TABLE revenue_daily ADD COLUMN IF NOT EXISTS shard SMALLINT NOT NULL DEFAULT 0",
+    "ALTER TABLE revenue_daily DROP CONSTRAINT IF EXISTS revenue_daily_pkey",
+    "ALTER TABLE revenue_daily ADD PRIMARY KEY (day, payment_mode, shard)",
+    "ALTER TABLE category_revenue_daily ADD COLUMN IF NOT EXISTS shard SMALLINT NOT NULL DEFAULT 0",
+    "ALTER TABLE category_revenue_daily DROP CONSTRAINT IF EXISTS category_revenue_daily_pkey",
+    "ALTER TABLE category_revenue_daily ADD PRIMARY KEY (day, category, shard)",
+    """
+    UPDATE store_stats SET total_revenue = (
+        SELECT coalesce(sum(payment), 0) FROM "order" WHERE status <> 'cancelled'
+    )
+    WHERE stats_id = 1
+    """,
+]
+
+
+def upgrade(conn):
+    for statement in STATEMENTS:
+        conn.exec_driver_sql(statement)
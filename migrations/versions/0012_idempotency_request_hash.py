@@ -0,0 +1,15 @@
+"""Fingerprints of the checkout request stored with each idempotency key.
+
+Keys claimed before this migration have NULL hashes and replay without the
+check.
+"""
+
+STATEMENTS = [
+    "ALTER TABLE idempotency_key ADD COLUMN IF NOT EXISTS request_hash VARCHAR(64)",
+    "ALTER TABLE idempotency_key ADD COLUMN IF NOT EXISTS cart_hash VARCHAR(64)",
+]
+
+
+def upgrade(conn):
+    for statement in STATEMENTS:
+        conn.exec_driver_sql(statement)
@@ -1,11 +1,27 @@
 from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from utils.password_hashing import hash_password, verify_password
+from utils.db_routing import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+# Weighted full-text document for a product: name (A) > category (B) > description (C).
+# Stored as a generated column so Postgres keeps it current on every insert/update.
+PRODUCT_SEARCH_DOCUMENT = (
+    "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(category, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'C')"
+)
 
 class Product(db.Model):
     __tablename__ = 'product'
+    __table_args__ = (
+        db.Index('ix_product_search_vector', 'search_vector', postgresql_using='gin'),
+        db.Index('ix_product_name_trgm', 'name', postgresql_using='gin',
+                 postgresql_ops={'name': 'gin_trgm_ops'}),
+        db.Index('ix_product_category', 'category'),
+    )
     product_id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(255), nullable=False)
     category = db.Column(db.String(100), nullable=False)
@@ -13,6 +29,10 @@ class Product(db.Model):
     discount = db.Column(db.Float, default=0.0)
     description = db.Column(db.Text)
     image_url = db.Column(db.String(255))
+    search_vector = db.Column(TSVECTOR, db.Computed(PRODUCT_SEARCH_DOCUMENT, persisted=True))
+    # Basis for catalog Last-Modified validators (see utils.http_cache)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow,
+                           onupdate=datetime.utcnow, server_default=db.func.now())
 
 class User(db.Model):
     __tablename__ = 'users'
@@ -29,16 +49,22 @@ class User(db.Model):
     profile_picture = db.Column(db.String(500))  # URL to profile picture
     is_verified = db.Column(db.Boolean, default=False)
     last_login = db.Column(db.DateTime, default=datetime.utcnow)
+    # Bumped to revoke every outstanding token (see utils.token_blocklist)
+    token_epoch = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     
     addresses = db.relationship('AddressBook', backref='user', lazy=True)
 
     def set_password(self, password):
         if password:
-            self.password_hash = generate_password_hash(password)
+            self.password_hash = hash_password(password)
             
     def check_password(self, password):
+        """Check a password, upgrading a hash made with outdated parameters (caller commits)."""
         if self.password_hash:
-            return check_password_hash(self.password_hash, password)
+            matches, new_hash = verify_password(self.password_hash, password)
+            if new_hash:
+                self.password_hash = new_hash
+            return matches
         return False
     
     @property
@@ -86,6 +112,9 @@ class User(db.Model):
 
 class Cart(db.Model):
     __tablename__ = 'cart'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'product_id', name='uq_cart_user_product'),
+    )
     cart_id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.user_id'), nullable=False)
     product_id = db.Column(db.Integer, db.ForeignKey('product.product_id'), nullable=False)
@@ -96,6 +125,9 @@ class Cart(db.Model):
 
 class Wishlist(db.Model):
     __tablename__ = 'wishlist'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'product_id', name='uq_wishlist_user_product'),
+    )
     wishlist_id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.user_id'), nullable=False)
     product_id = db.Column(db.Integer, db.ForeignKey('product.product_id'), nullable=False)
@@ -104,19 +136,48 @@ class Wishlist(db.Model):
     product = db.relationship('Product')
 
 class Order(db.Model):
+    """Order header: one row per checkout, with the products in OrderItem lines."""
     __tablename__ = 'order'
+    __table_args__ = (
+        db.Index('ix_order_user_date', 'user_id', 'date'),
+        db.Index('ix_order_status_date', 'status', 'date'),
+        db.Index('ix_order_date_id', 'date', 'order_id'),
+    )
     order_id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.user_id'), nullable=False)
-    status = db.Column(db.String(50), nullable=False)
+    # active_history: the summary hooks (utils.store_stats, utils.revenue_rollups)
+    # need the previous value even when the order was expired before the change
+    status = db.column_property(db.Column(db.String(50), nullable=False), active_history=True)
     invoice = db.Column(db.String(255))
-    product_id = db.Column(db.Integer, db.ForeignKey('product.product_id'), nullable=False)
-    payment = db.Column(db.Float, nullable=False)
-    date = db.Column(db.DateTime, default=datetime.utcnow)
-    mode_of_payment = db.Column(db.String(50))
+    payment = db.column_property(db.Column(db.Float, nullable=False), active_history=True)  # order total
+    date = db.column_property(
+        db.Column(db.DateTime, nullable=False, default=datetime.utcnow, server_default=db.func.now()),
+        active_history=True
+    )
+    mode_of_payment = db.column_property(db.Column(db.String(50)), active_history=True)
 
     user = db.relationship('User', backref=db.backref('orders', lazy=True))
+    items = db.relationship('OrderItem', backref='order', lazy=True,
+                            cascade='all, delete-orphan', order_by='OrderItem.order_item_id')
+
+class OrderItem(db.Model):
+    __tablename__ = 'order_item'
+    __table_args__ = (
+        db.Index('ix_order_item_order_id', 'order_id'),
+        db.Index('ix_order_item_product_id', 'product_id'),
+    )
+    order_item_id = db.Column(db.Integer, primary_key=True)
+    order_id = db.Column(db.Integer, db.ForeignKey('order.order_id', ondelete='CASCADE'), nullable=False)
+    product_id = db.Column(db.Integer, db.ForeignKey('product.product_id'), nullable=False)
+    quantity = db.Column(db.Integer, nullable=False, default=1)
+    unit_price = db.Column(db.Float, nullable=False)
+
     product = db.relationship('Product')
 
+    @property
+    def line_total(self):
+        return self.unit_price * self.quantity
+
 class Service(db.Model):
     __tablename__ = 'service'
     service_id = db.Column(db.Integer, primary_key=True)
@@ -134,3 +195,54 @@ class AddressBook(db.Model):
     address_id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.user_id'), nullable=False)
     address = db.Column(db.Text, nullable=False)
+
+
+class StoreStats(db.Model):
+    """Sharded counter rows summed for the admin dashboard, kept current by utils.store_stats."""
+    __tablename__ = 'store_stats'
+    stats_id = db.Column(db.Integer, primary_key=True)
+    total_users = db.Column(db.Integer, nullable=False, default=0)
+    total_products = db.Column(db.Integer, nullable=False, default=0)
+    total_orders = db.Column(db.Integer, nullable=False, default=0)
+    total_revenue = db.Column(db.Float, nullable=False, default=0.0)
+    pending_orders = db.Column(db.Integer, nullable=False, default=0)
+    confirmed_orders = db.Column(db.Integer, nullable=False, default=0)
+    shipped_orders = db.Column(db.Integer, nullable=False, default=0)
+    delivered_orders = db.Column(db.Integer, nullable=False, default=0)
+    cancelled_orders = db.Column(db.Integer, nullable=False, default=0)
+    rebuilt_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class RevenueDaily(db.Model):
+    """Per-day, per-payment-mode revenue rollup, kept current by utils.revenue_rollups."""
+    __tablename__ = 'revenue_daily'
+    day = db.Column(db.Date, primary_key=True)
+    payment_mode = db.Column(db.String(50), primary_key=True, default='')
+    shard = db.Column(db.SmallInteger, primary_key=True, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0.0)
+    order_count = db.Column(db.Integer, nullable=False, default=0)
+
+class CategoryRevenueDaily(db.Model):
+    """Per-day, per-product-category revenue rollup, kept current by utils.revenue_rollups."""
+    __tablename__ = 'category_revenue_daily'
+    day = db.Column(db.Date, primary_key=True)
+    category = db.Column(db.String(100), primary_key=True)
+    shard = db.Column(db.SmallInteger, primary_key=True, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0.0)
+    units = db.Column(db.Integer, nullable=False, default=0)
+
+
+class IdempotencyKey(db.Model):
+    """Stored result of a request made with an Idempotency-Key header, replayed on retries."""
+    __tablename__ = 'idempotency_key'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'key', name='uq_idempotency_key_user_key'),
+    )
+    key_id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.user_id'), nullable=False)
+    key = db.Column(db.String(255), nullable=False)
+    request_hash = db.Column(db.String(64))  # sha256 of the JSON body
+    cart_hash = db.Column(db.String(64))  # sha256 of the cart lines it was claimed with
+    status_code = db.Column(db.Integer)
+    response_body = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
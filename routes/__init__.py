@@ -1,4 +1,34 @@
 """
 Routes package for the application.
 Contains all route blueprints.
-"""
\ No newline at end of file
+"""
+from extensions import limit_blueprint
+from routes.main import main_bp
+from routes.auth import auth_bp
+from routes.products import products_bp
+from routes.cart import cart_bp
+from routes.orders import orders_bp
+from routes.admin import admin_bp
+
+# Rate limit budgets: catalog reads and auth writes are counted separately.
+# Applied once here, at import, so every app created by create_app() shares them.
+limit_blueprint(main_bp, 'catalog')
+limit_blueprint(products_bp, 'catalog')
+limit_blueprint(auth_bp, 'auth')
+limit_blueprint(cart_bp, 'shopping')
+limit_blueprint(orders_bp, 'shopping')
+limit_blueprint(admin_bp, 'admin')
+
+BLUEPRINTS = [
+    (main_bp, '/api'),
+    (auth_bp, '/api/auth'),
+    (products_bp, '/api/products'),
+    (cart_bp, '/api/cart'),
+    (orders_bp, '/api/orders'),
+    (admin_bp, '/api/admin'),
+]
+
+
+def register_blueprints(app):
+    for blueprint, url_prefix in BLUEPRINTS:
+        app.register_blueprint(blueprint, url_prefix=url_prefix)
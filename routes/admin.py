@@ -1,58 +1,104 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
+from flask_jwt_extended import jwt_required, get_jwt_identity
 from models import db, User, Order, Product, Cart, Wishlist
+from sqlalchemy.orm import joinedload
 from datetime import datetime, timedelta
+from functools import wraps
+from utils.cache import catalog_cache
+from utils.suggest import suggest_index
+from utils.token_blocklist import token_blocklist
+from utils.google_certs import google_certs
+from utils.password_hashing import password_hasher
+from utils.profile_cache import profile_cache
+from utils.pagination import InvalidCursor, cached_count, keyset_paginate
+from utils.exports import (
+    FORMATS, ORDER_COLUMNS, USER_COLUMNS, InvalidExportFilter, orders_statement,
+    stream_export, users_statement
+)
+from utils.store_stats import get_stats
+from utils.revenue_rollups import GRANULARITIES, revenue_summary
+from utils.query_budget import query_budget
+from utils import db_pool
+from utils.db_routing import replica_router
+from routes.orders import LOAD_ORDER_ITEMS
+from utils.serializers import (
+    ADMIN_ORDER, ADMIN_ORDER_DETAIL, ADMIN_PRODUCT, ADMIN_USER, ADMIN_USER_DETAIL,
+    RECENT_ORDER, USER_ORDER, WISHLIST_ENTRY, many
+)
 
 admin_bp = Blueprint('admin', __name__)
 
 
+def admin_required(view):
+    """jwt_required(), and the token's user must be an admin (see admin_setup.py)."""
+    @wraps(view)
+    @jwt_required()
+    def wrapper(*args, **kwargs):
+        user = db.session.get(User, int(get_jwt_identity()))
+        if user is None or user.type_of_product != 'admin':
+            return jsonify({'success': False, 'error': 'Admin access required'}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def _keyset_meta(page, count_key, count_query):
+    """Pagination fields for cursor mode; total only with ?with_total=1 (cached)."""
+    meta = {
+        'next_cursor': page.next_cursor,
+        'has_next': page.has_next,
+        'per_page': page.per_page
+    }
+    if request.args.get('with_total', type=int):
+        meta['total'] = cached_count(f'admin:{count_key}', count_query)
+    return meta
+
+
+def _export_response(build_statement, columns, name):
+    """Stream `build_statement(request.args)` as ?format=csv (default) or ndjson."""
+    fmt = request.args.get('format', 'csv').lower()
+    if fmt not in FORMATS:
+        return jsonify({'success': False, 'error': 'Invalid format'}), 400
+    try:
+        stmt = build_statement(request.args)
+    except InvalidExportFilter as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    response = Response(stream_with_context(stream_export(stmt, columns, fmt)), mimetype=FORMATS[fmt])
+    response.headers['Content-Disposition'] = f'attachment; filename={name}.{fmt}'
+    response.headers['X-Accel-Buffering'] = 'no'  # let nginx pass chunks through as they are written
+    return response
+
+
 # Dashboard Statistics
 @admin_bp.route('/dashboard', methods=['GET'])
+@query_budget(3)
 def dashboard():
     """Get admin dashboard statistics"""
     try:
-        # Count statistics
-        total_users = User.query.count()
-        total_orders = Order.query.count()
-        total_products = Product.query.count()
-        
-        # Revenue calculation
-        total_revenue = sum(order.payment for order in Order.query.all())
-        
-        # Orders by status
-        pending_orders = Order.query.filter_by(status='pending').count()
-        confirmed_orders = Order.query.filter_by(status='confirmed').count()
-        shipped_orders = Order.query.filter_by(status='shipped').count()
-        delivered_orders = Order.query.filter_by(status='delivered').count()
+        # Totals and status counts come from the maintained summary row
+        stats = get_stats()
         
         # Recent orders
-        recent_orders = Order.query.order_by(Order.date.desc()).limit(5).all()
+        recent_orders = Order.query.options(
+            joinedload(Order.user), LOAD_ORDER_ITEMS
+        ).order_by(Order.date.desc()).limit(5).all()
         
-        recent_orders_data = []
-        for order in recent_orders:
-            recent_orders_data.append({
-                'order_id': order.order_id,
-                'user_id': order.user_id,
-                'user_name': order.user.name if order.user else 'Unknown',
-                'product_id': order.product_id,
-                'product_name': order.product.name if order.product else 'Unknown',
-                'amount': float(order.payment),
-                'status': order.status,
-                'date': order.date.isoformat() if order.date else None
-            })
+        recent_orders_data = many(RECENT_ORDER, recent_orders)
         
         return jsonify({
             'success': True,
             'data': {
                 'stats': {
-                    'total_users': total_users,
-                    'total_orders': total_orders,
-                    'total_products': total_products,
-                    'total_revenue': float(total_revenue),
+                    'total_users': stats.total_users,
+                    'total_orders': stats.total_orders,
+                    'total_products': stats.total_products,
+                    'total_revenue': float(stats.total_revenue),
                     'orders_by_status': {
-                        'pending': pending_orders,
-                        'confirmed': confirmed_orders,
-                        'shipped': shipped_orders,
-                        'delivered': delivered_orders
+                        'pending': stats.pending_orders,
+                        'confirmed': stats.confirmed_orders,
+                        'shipped': stats.shipped_orders,
+                        'delivered': stats.delivered_orders,
+                        'cancelled': stats.cancelled_orders
                     }
                 },
                 'recent_orders': recent_orders_data
@@ -71,21 +117,22 @@ def get_users():
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 10, type=int)
         
-        users = User.query.paginate(page=page, per_page=per_page)
+        if 'cursor' in request.args:
+            users = keyset_paginate(User.query, [User.user_id], request.args.get('cursor'), per_page)
+        else:
+            users = User.query.paginate(page=page, per_page=per_page)
         
-        users_data = []
-        for user in users.items:
-            users_data.append({
-                'user_id': user.user_id,
-                'name': user.name,
-                'email': user.email,
-                'mobile_number': user.mobile_number,
-                'oauth_provider': user.oauth_provider,
-                'is_verified': user.is_verified,
-                'last_login': user.last_login.isoformat() if user.last_login else None,
-                'created_at': user.name  # Assuming name field, you might need to add created_at
-            })
+        users_data = many(ADMIN_USER, users.items)
         
+        if 'cursor' in request.args:
+            return jsonify({
+                'success': True,
+                'data': {
+                    'users': users_data,
+                    **_keyset_meta(users, 'users', User.query)
+                }}
+            ), 200
+
         return jsonify({
             'success': True,
             'data': {
@@ -95,11 +142,21 @@ def get_users():
             'current_page': page
             }}
         ), 200
+    except InvalidCursor as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+@admin_bp.route('/users/export', methods=['GET'])
+@admin_required
+def export_users():
+    """Stream every user as CSV or NDJSON"""
+    return _export_response(users_statement, USER_COLUMNS, 'users')
+
+
 @admin_bp.route('/users/<int:user_id>', methods=['GET'])
+@query_budget(4)
 def get_user_details(user_id):
     """Get detailed user information"""
     try:
@@ -108,34 +165,18 @@ def get_user_details(user_id):
             return jsonify({'success': False, 'error': 'User not found'}), 404
         
         # Get user's orders
-        user_orders = Order.query.filter_by(user_id=user_id).all()
-        orders_data = [{
-            'order_id': o.order_id,
-            'product_name': o.product.name if o.product else 'Unknown',
-            'amount': float(o.payment),
-            'status': o.status,
-            'date': o.date.isoformat() if o.date else None
-        } for o in user_orders]
+        user_orders = Order.query.options(LOAD_ORDER_ITEMS).filter_by(user_id=user_id).all()
+        orders_data = many(USER_ORDER, user_orders)
         
         # Get user's wishlist
-        wishlist = Wishlist.query.filter_by(user_id=user_id).all()
-        wishlist_data = [{
-            'product_id': w.product_id,
-            'product_name': w.product.name if w.product else 'Unknown'
-        } for w in wishlist]
+        wishlist = Wishlist.query.options(joinedload(Wishlist.product)).filter_by(user_id=user_id).all()
+        wishlist_data = many(WISHLIST_ENTRY, wishlist)
         
         return jsonify({
             'success': True,
             'data': {
                 'user': {
-                    'user_id': user.user_id,
-                    'name': user.name,
-                    'email': user.email,
-                    'mobile_number': user.mobile_number,
-                    'oauth_provider': user.oauth_provider,
-                    'profile_picture': user.profile_picture,
-                    'is_verified': user.is_verified,
-                    'last_login': user.last_login.isoformat() if user.last_login else None,
+                    **ADMIN_USER_DETAIL(user),
                     'total_orders': len(user_orders),
                     'total_spent': sum(o.payment for o in user_orders)
                 },
@@ -149,6 +190,7 @@ def get_user_details(user_id):
 
 # Orders Management
 @admin_bp.route('/orders', methods=['GET'])
+@query_budget(3)
 def get_orders():
     """Get all orders with pagination and filtering"""
     try:
@@ -156,27 +198,27 @@ def get_orders():
         per_page = request.args.get('per_page', 10, type=int)
         status_filter = request.args.get('status', '')
         
-        query = Order.query
+        query = Order.query.options(joinedload(Order.user), LOAD_ORDER_ITEMS)
         if status_filter:
             query = query.filter_by(status=status_filter)
         
-        orders = query.order_by(Order.date.desc()).paginate(page=page, per_page=per_page)
+        if 'cursor' in request.args:
+            orders = keyset_paginate(query, [Order.date, Order.order_id], request.args.get('cursor'),
+                                     per_page, descending=True)
+        else:
+            orders = query.order_by(Order.date.desc()).paginate(page=page, per_page=per_page)
         
-        orders_data = []
-        for order in orders.items:
-            orders_data.append({
-                'order_id': order.order_id,
-                'user_id': order.user_id,
-                'user_name': order.user.name if order.user else 'Unknown',
-                'user_email': order.user.email if order.user else 'Unknown',
-                'product_id': order.product_id,
-                'product_name': order.product.name if order.product else 'Unknown',
-                'amount': float(order.payment),
-                'status': order.status,
-                'payment_method': order.mode_of_payment,
-                'date': order.date.isoformat() if order.date else None
-            })
+        orders_data = many(ADMIN_ORDER, orders.items)
         
+        if 'cursor' in request.args:
+            return jsonify({
+                'success': True,
+                'data': {
+                    'orders': orders_data,
+                    **_keyset_meta(orders, f'orders:{status_filter}', query)
+                }}
+            ), 200
+
         return jsonify({
             'success': True,
             'data': {
@@ -186,33 +228,33 @@ def get_orders():
                 'current_page': page
             }}
         ), 200
+    except InvalidCursor as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+@admin_bp.route('/orders/export', methods=['GET'])
+@admin_required
+def export_orders():
+    """Stream orders matching the status/date filters as CSV or NDJSON"""
+    return _export_response(orders_statement, ORDER_COLUMNS, 'orders')
+
+
 @admin_bp.route('/orders/<int:order_id>', methods=['GET'])
+@query_budget(2)
 def get_order_details(order_id):
     """Get detailed order information"""
     try:
-        order = Order.query.get(order_id)
+        order = Order.query.options(
+            joinedload(Order.user), LOAD_ORDER_ITEMS
+        ).filter_by(order_id=order_id).first()
         if not order:
             return jsonify({'success': False, 'error': 'Order not found'}), 404
         
         return jsonify({
             'success': True,
-            'data': {
-                'order_id': order.order_id,
-                'user_id': order.user_id,
-                'user_name': order.user.name if order.user else 'Unknown',
-                'user_email': order.user.email if order.user else 'Unknown',
-                'user_phone': order.user.mobile_number if order.user else 'Unknown',
-                'product_id': order.product_id,
-                'product_name': order.product.name if order.product else 'Unknown',
-                'amount': float(order.payment),
-                'status': order.status,
-                'payment_method': order.mode_of_payment,
-                'date': order.date.isoformat() if order.date else None
-            }
+            'data': ADMIN_ORDER_DETAIL(order)
         }), 200
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -252,18 +294,22 @@ def get_products():
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 10, type=int)
         
-        products = Product.query.paginate(page=page, per_page=per_page)
+        if 'cursor' in request.args:
+            products = keyset_paginate(Product.query, [Product.product_id], request.args.get('cursor'), per_page)
+        else:
+            products = Product.query.paginate(page=page, per_page=per_page)
         
-        products_data = []
-        for product in products.items:
-            products_data.append({
-                'product_id': product.product_id,
-                'name': product.name,
-                'price': float(product.mrp) if product.mrp else 0,
-                'category': product.category if product.category else 'N/A',
-                'stock': 'N/A'
-            })
+        products_data = many(ADMIN_PRODUCT, products.items)
         
+        if 'cursor' in request.args:
+            return jsonify({
+                'success': True,
+                'data': {
+                    'products': products_data,
+                    **_keyset_meta(products, f'products:{catalog_cache.version()}', Product.query)
+                }}
+            ), 200
+
         return jsonify({
             'success': True,
             'data': {
@@ -273,6 +319,8 @@ def get_products():
                 'current_page': page
             }}
         ), 200
+    except InvalidCursor as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -283,25 +331,37 @@ def revenue_analytics():
     """Get revenue analytics"""
     try:
         days = request.args.get('days', 30, type=int)
-        start_date = datetime.now() - timedelta(days=days)
-        
-        orders = Order.query.filter(Order.date >= start_date).all()
+        granularity = request.args.get('granularity', 'day').lower()
         
-        # Group by date
-        revenue_by_date = {}
-        for order in orders:
-            date_key = order.date.strftime('%Y-%m-%d') if order.date else 'Unknown'
-            if date_key not in revenue_by_date:
-                revenue_by_date[date_key] = 0
-            revenue_by_date[date_key] += order.payment
+        if granularity not in GRANULARITIES:
+            return jsonify({'success': False, 'error': 'Invalid granularity'}), 400
         
         return jsonify({
             'success': True,
-            'data': {
-                'revenue_by_date': revenue_by_date,
-                'total_revenue': sum(revenue_by_date.values()),
-                'average_daily_revenue': sum(revenue_by_date.values()) / len(revenue_by_date) if revenue_by_date else 0
-            }}
-        ), 200
+            'data': revenue_summary(days=days, granularity=granularity)
+        }), 200
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
+
+
+# Runtime metrics
+@admin_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """Get cache and runtime counters"""
+    return jsonify({
+        'success': True,
+        'data': {
+            'catalog_cache': catalog_cache.stats(),
+            'suggest_index': suggest_index.stats(),
+            'token_blocklist': token_blocklist.stats(),
+            'google_certs': google_certs.stats(),
+            'password_hashing': password_hasher.stats(),
+            'profile_cache': profile_cache.stats(),
+            'db_pool': db_pool.stats(db.engine),
+            'db_replicas': {
+                **replica_router.stats(),
+                'pools': {key: db_pool.stats(db.engines[key]) for key in replica_router.bind_keys},
+            },
+            'async_db': current_app.extensions['async_db'].stats() if 'async_db' in current_app.extensions else None
+        }
+    }), 200
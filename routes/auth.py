@@ -1,3 +1,4 @@
+import logging
 import sys
 from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent))
@@ -12,14 +13,25 @@ from flask_jwt_extended import (
 )
 from werkzeug.security import check_password_hash
 from datetime import datetime, timezone
-from google.oauth2 import id_token
-from google.auth.transport import requests as google_requests
 from extensions import limiter
+from utils.google_certs import verify_google_id_token
+from utils.password_hashing import HashingBusy
+from utils.profile_cache import profile_cache
+from utils.token_blocklist import add_to_blocklist, revoke_user_tokens, token_claims
 
 from models import db, User, AddressBook
 
 auth_bp = Blueprint('auth', __name__)
 
+logger = logging.getLogger('sleepcraft.auth')
+
+
+def _hashing_busy():
+    """Password hashing pool is saturated - shed the request rather than queue it"""
+    response = jsonify({'success': False, 'error': 'Server busy, please try again shortly'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
 
 @auth_bp.route('/google', methods=['POST'])
 @limiter.limit("5 per minute")
@@ -46,11 +58,10 @@ def google_login():
                 'error': 'Missing credential (ID token)'
             }), 400
         
-        # Verify the ID token with Google
+        # Verify the ID token against Google's (cached) signing certificates
         try:
-            idinfo = id_token.verify_oauth2_token(
+            idinfo = verify_google_id_token(
                 credential,
-                google_requests.Request(),
                 current_app.config['GOOGLE_CLIENT_ID']
             )
             
@@ -119,9 +130,9 @@ def google_login():
         access_token = create_access_token(
             identity=str(user.user_id),
             fresh=True,
-            additional_claims={'email': user.email, 'name': user.name}
+            additional_claims={'email': user.email, 'name': user.name, **token_claims(user)}
         )
-        refresh_token = create_refresh_token(identity=str(user.user_id))
+        refresh_token = create_refresh_token(identity=str(user.user_id), additional_claims=token_claims(user))
         
         return jsonify({
             'success': True,
@@ -174,7 +185,10 @@ def signup():
         mobile_number=mobile_number,
         oauth_provider='local'
     )
-    user.set_password(password)
+    try:
+        user.set_password(password)
+    except HashingBusy:
+        return _hashing_busy()
     
     db.session.add(user)
     db.session.commit()
@@ -183,9 +197,9 @@ def signup():
     access_token = create_access_token(
         identity=user.user_id,
         fresh=True,
-        additional_claims={'email': user.email, 'name': user.name}
+        additional_claims={'email': user.email, 'name': user.name, **token_claims(user)}
     )
-    refresh_token = create_refresh_token(identity=user.user_id)
+    refresh_token = create_refresh_token(identity=user.user_id, additional_claims=token_claims(user))
     
     return jsonify({
         'success': True,
@@ -217,10 +231,13 @@ def login():
     
     user = User.query.filter_by(email=email).first()
     
-    if not user or not user.check_password(password):
-        return jsonify({'success': False, 'error': 'Invalid email or password'}), 401
+    try:
+        if not user or not user.check_password(password):
+            return jsonify({'success': False, 'error': 'Invalid email or password'}), 401
+    except HashingBusy:
+        return _hashing_busy()
     
-    # Update last login
+    # Update last login (and any password hash upgraded by check_password)
     user.last_login = datetime.now(timezone.utc)
     db.session.commit()
     
@@ -228,9 +245,9 @@ def login():
     access_token = create_access_token(
         identity=user.user_id,
         fresh=True,
-        additional_claims={'email': user.email, 'name': user.name}
+        additional_claims={'email': user.email, 'name': user.name, **token_claims(user)}
     )
-    refresh_token = create_refresh_token(identity=user.user_id)
+    refresh_token = create_refresh_token(identity=user.user_id, additional_claims=token_claims(user))
     
     return jsonify({
         'success': True,
@@ -263,7 +280,7 @@ def refresh():
         access_token = create_access_token(
             identity=user.user_id,
             fresh=False,
-            additional_claims={'email': user.email, 'name': user.name}
+            additional_claims={'email': user.email, 'name': user.name, **token_claims(user)}
         )
         
         return jsonify({
@@ -282,79 +299,58 @@ def refresh():
 @jwt_required()
 def logout():
     """Logout user (client should delete tokens)"""
-    # With JWT, logout is handled client-side by deleting the tokens
-    # Optionally implement token blacklist here for added security
+    # Revoke the presented token; other sessions stay logged in
+    token = get_jwt()
+    add_to_blocklist(token['jti'], token['exp'])
     return jsonify({
         'success': True,
         'message': 'Logged out successfully'
     }), 200
 
 
-@auth_bp.route('/me', methods=['GET'])
+@auth_bp.route('/logout-all', methods=['POST'])
 @jwt_required()
-def get_current_user():
-    """Get current user info"""
+def logout_all():
+    """Revoke every access and refresh token issued to the user"""
     try:
-        user_id = get_jwt_identity()
-        print(f"DEBUG /me: Got user_id from JWT: {user_id}")
-        user = User.query.get(user_id)
-        
-        if not user:
-            print(f"DEBUG /me: User not found for id {user_id}")
+        epoch = revoke_user_tokens(int(get_jwt_identity()))
+        if epoch is None:
             return jsonify({'success': False, 'error': 'User not found'}), 404
-        
-        print(f"DEBUG /me: Returning user {user.email}")
         return jsonify({
             'success': True,
-            'data': {
-                'user': {
-                    'id': user.user_id,
-                    'email': user.email,
-                    'name': user.name,
-                    'mobile_number': user.mobile_number,
-                    'profile_picture': user.profile_picture,
-                    'oauth_provider': user.oauth_provider,
-                    'last_login': user.last_login.isoformat() if user.last_login else None
-                }
-            }
+            'message': 'Logged out of all sessions'
         }), 200
     except Exception as e:
-        print(f"DEBUG /me: Exception - {str(e)}")
-        import traceback
-        traceback.print_exc()
+        db.session.rollback()
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
-@auth_bp.route('/profile', methods=['GET'])
-@jwt_required()
-def get_profile():
-    """Alias for /me endpoint - Get current user profile"""
+def _current_profile_response():
+    """Shared implementation of /me and /profile, served from the profile cache"""
     try:
-        user_id = int(get_jwt_identity())
-        print(f"DEBUG /profile: Got user_id from JWT: {user_id}")
-        user = User.query.get(user_id)
-        
-        if not user:
-            print(f"DEBUG /profile: User not found for id {user_id}")
+        profile = profile_cache.get(int(get_jwt_identity()))
+        if profile is None:
             return jsonify({'success': False, 'error': 'User not found'}), 404
-        
-        print(f"DEBUG /profile: Returning user {user.email}")
         return jsonify({
             'success': True,
             'data': {
-                'user': {
-                    'id': user.user_id,
-                    'email': user.email,
-                    'name': user.name,
-                    'mobile_number': user.mobile_number,
-                    'profile_picture': user.profile_picture,
-                    'oauth_provider': user.oauth_provider,
-                    'last_login': user.last_login.isoformat() if user.last_login else None
-                }
+                'user': profile
             }
         }), 200
     except Exception as e:
-        print(f"DEBUG /profile: Exception - {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error loading profile")
         return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@auth_bp.route('/me', methods=['GET'])
+@jwt_required()
+def get_current_user():
+    """Get current user info"""
+    return _current_profile_response()
+
+
+@auth_bp.route('/profile', methods=['GET'])
+@jwt_required()
+def get_profile():
+    """Alias for /me endpoint - Get current user profile"""
+    return _current_profile_response()
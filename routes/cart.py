@@ -2,21 +2,88 @@ import sys
 from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent))
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, abort
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from models import db, Product, Cart, Wishlist
-from sqlalchemy import asc, desc
+from sqlalchemy import asc, desc, text
+from sqlalchemy.orm import contains_eager, joinedload
+from utils.query_budget import query_budget
+from utils.serializers import CART_ITEM, WISHLIST_ITEM, many
 
 cart_bp = Blueprint('cart', __name__)
 
+# Cart and wishlist mutations are single statements relying on the unique
+# (user_id, product_id) constraints: the write and the new item count come
+# back in one round trip, and concurrent adds cannot create duplicate rows.
+# Counts are computed from the statement's snapshot, which does not yet see
+# the row being written, hence the adjustments.
+
+ADD_TO_CART_SQL = text("""
+    WITH upserted AS (
+        INSERT INTO cart (user_id, product_id, quantity)
+        SELECT :user_id, p.product_id, :quantity FROM product p WHERE p.product_id = :product_id
+        ON CONFLICT (user_id, product_id)
+        DO UPDATE SET quantity = LEAST(cart.quantity + EXCLUDED.quantity, 99)
+        RETURNING cart_id, product_id, quantity
+    )
+    SELECT u.cart_id, u.quantity, p.name,
+           (SELECT count(*) FROM cart c
+            WHERE c.user_id = :user_id AND c.product_id <> u.product_id) + 1 AS cart_count
+    FROM upserted u JOIN product p ON p.product_id = u.product_id
+""")
+
+UPDATE_CART_SQL = text("""
+    WITH updated AS (
+        UPDATE cart SET quantity = :quantity
+        WHERE cart_id = :item_id AND user_id = :user_id
+        RETURNING cart_id
+    )
+    SELECT (SELECT count(*) FROM updated) AS affected,
+           (SELECT count(*) FROM cart WHERE user_id = :user_id) AS cart_count
+""")
+
+REMOVE_FROM_CART_SQL = text("""
+    WITH removed AS (
+        DELETE FROM cart WHERE cart_id = :item_id AND user_id = :user_id
+        RETURNING cart_id
+    )
+    SELECT (SELECT count(*) FROM removed) AS affected,
+           (SELECT count(*) FROM cart WHERE user_id = :user_id) - (SELECT count(*) FROM removed) AS cart_count
+""")
+
+# DO UPDATE (rather than DO NOTHING) so an existing row is still returned;
+# xmax = 0 only for a freshly inserted tuple.
+ADD_TO_WISHLIST_SQL = text("""
+    WITH upserted AS (
+        INSERT INTO wishlist (user_id, product_id)
+        SELECT :user_id, p.product_id FROM product p WHERE p.product_id = :product_id
+        ON CONFLICT (user_id, product_id) DO UPDATE SET product_id = EXCLUDED.product_id
+        RETURNING wishlist_id, product_id, (xmax = 0) AS inserted
+    )
+    SELECT u.wishlist_id, u.inserted, p.name,
+           (SELECT count(*) FROM wishlist w
+            WHERE w.user_id = :user_id AND w.product_id <> u.product_id) + 1 AS wishlist_count
+    FROM upserted u JOIN product p ON p.product_id = u.product_id
+""")
+
+REMOVE_FROM_WISHLIST_SQL = text("""
+    WITH removed AS (
+        DELETE FROM wishlist WHERE wishlist_id = :item_id AND user_id = :user_id
+        RETURNING wishlist_id
+    )
+    SELECT (SELECT count(*) FROM removed) AS affected,
+           (SELECT count(*) FROM wishlist WHERE user_id = :user_id) - (SELECT count(*) FROM removed) AS wishlist_count
+""")
+
 @cart_bp.route('/')
 @jwt_required()
+@query_budget(1)
 def view_cart():
     user_id = get_jwt_identity()
 
     # Sorting: ?sort=price_asc|price_desc|name_asc|name_desc|newest|quantity_desc
     sort = request.args.get('sort', '').lower()
-    query = Cart.query.filter_by(user_id=user_id).join(Product)
+    query = Cart.query.filter_by(user_id=user_id).join(Product).options(contains_eager(Cart.product))
 
     if sort == 'price_asc':
         query = query.order_by(asc(Product.mrp))
@@ -35,18 +102,7 @@ def view_cart():
 
     cart_items = query.all()
 
-    cart_data = [
-        {
-            'id': item.cart_id,
-            'product_id': item.product.product_id,
-            'product_name': item.product.name,
-            'product_price': float(item.product.mrp),
-            'quantity': item.quantity,
-            'subtotal': float(item.product.mrp * item.quantity),
-            'image': item.product.image_url
-        }
-        for item in cart_items
-    ]
+    cart_data = many(CART_ITEM, cart_items)
 
     total_amount = sum(item.product.mrp * item.quantity for item in cart_items)
 
@@ -63,8 +119,7 @@ def view_cart():
 @jwt_required()
 def add_to_cart(product_id):
     try:
-        user_id = get_jwt_identity()
-        product = Product.query.get_or_404(product_id)
+        user_id = int(get_jwt_identity())
         
         # Get quantity from JSON or form data
         data = request.get_json() or {}
@@ -76,29 +131,24 @@ def add_to_cart(product_id):
         except (ValueError, TypeError):
             quantity = 1
         
-        # Use a transaction to ensure data consistency
+        # One statement: insert or bump the (user, product) row and count the cart
         try:
-            cart_item = Cart.query.filter_by(
-                user_id=user_id, 
-                product_id=product_id
-            ).with_for_update().first()  # Lock the row for update
+            row = db.session.execute(ADD_TO_CART_SQL, {
+                'user_id': user_id,
+                'product_id': product_id,
+                'quantity': quantity
+            }).first()
             
-            if cart_item:
-                cart_item.quantity = min(cart_item.quantity + quantity, 99)  # Prevent overflow
-            else:
-                cart_item = Cart(
-                    user_id=user_id,
-                    product_id=product_id,
-                    quantity=quantity
-                )
-                db.session.add(cart_item)
+            if row is None:
+                db.session.rollback()
+                return jsonify({'success': False, 'message': 'Product not found'}), 404
             
             db.session.commit()
             
             return jsonify({
                 'success': True,
-                'message': f'{product.name} added to cart!',
-                'cart_count': Cart.query.filter_by(user_id=user_id).count()
+                'message': f'{row.name} added to cart!',
+                'cart_count': row.cart_count
             })
             
         except Exception as e:
@@ -111,65 +161,57 @@ def add_to_cart(product_id):
 @cart_bp.route('/update/<int:item_id>', methods=['POST'])
 @jwt_required()
 def update_cart(item_id):
-    user_id = get_jwt_identity()
-    cart_item = Cart.query.filter_by(
-        cart_id=item_id,
-        user_id=user_id
-    ).first_or_404()
+    user_id = int(get_jwt_identity())
     
     data = request.get_json() or {}
     quantity = int(data.get('quantity', request.form.get('quantity', 1)))
     
+    params = {'user_id': user_id, 'item_id': item_id}
     if quantity <= 0:
-        db.session.delete(cart_item)
+        row = db.session.execute(REMOVE_FROM_CART_SQL, params).one()
         message = 'Item removed from cart'
     else:
-        cart_item.quantity = quantity
+        row = db.session.execute(UPDATE_CART_SQL, dict(params, quantity=quantity)).one()
         message = 'Cart updated'
     
+    if not row.affected:
+        db.session.rollback()
+        abort(404)
+    
     db.session.commit()
     
     return jsonify({
         'success': True,
         'message': message,
-        'cart_count': Cart.query.filter_by(user_id=user_id).count()
+        'cart_count': row.cart_count
     })
 
 @cart_bp.route('/remove/<int:item_id>', methods=['POST'])
 @jwt_required()
 def remove_from_cart(item_id):
-    user_id = get_jwt_identity()
-    cart_item = Cart.query.filter_by(
-        cart_id=item_id,
-        user_id=user_id
-    ).first_or_404()
+    user_id = int(get_jwt_identity())
+    row = db.session.execute(REMOVE_FROM_CART_SQL, {'user_id': user_id, 'item_id': item_id}).one()
+    
+    if not row.affected:
+        db.session.rollback()
+        abort(404)
     
-    db.session.delete(cart_item)
     db.session.commit()
     
     return jsonify({
         'success': True,
         'message': 'Item removed from cart',
-        'cart_count': Cart.query.filter_by(user_id=user_id).count()
+        'cart_count': row.cart_count
     })
 
 @cart_bp.route('/wishlist')
 @jwt_required()
+@query_budget(1)
 def view_wishlist():
     user_id = get_jwt_identity()
-    wishlist_items = Wishlist.query.filter_by(user_id=user_id).all()
+    wishlist_items = Wishlist.query.options(joinedload(Wishlist.product)).filter_by(user_id=user_id).all()
     
-    wishlist_data = [
-        {
-            'id': item.wishlist_id,
-            'product_id': item.product.product_id,
-            'product_name': item.product.name,
-            'product_price': float(item.product.mrp),
-            'product_category': item.product.category,
-            'image': item.product.image_url,
-        }
-        for item in wishlist_items
-    ]
+    wishlist_data = many(WISHLIST_ITEM, wishlist_items)
     
     return jsonify({
         'success': True,
@@ -183,33 +225,31 @@ def view_wishlist():
 @jwt_required()
 def add_to_wishlist(product_id):
     try:
-        user_id = get_jwt_identity()
-        product = Product.query.get_or_404(product_id)
+        user_id = int(get_jwt_identity())
         
-        # Use a transaction with row-level locking
+        # One statement: insert if absent, report whether it was new, and count
         try:
-            existing_item = Wishlist.query.filter_by(
-                user_id=user_id,
-                product_id=product_id
-            ).with_for_update().first()
+            row = db.session.execute(ADD_TO_WISHLIST_SQL, {
+                'user_id': user_id,
+                'product_id': product_id
+            }).first()
             
-            if not existing_item:
-                wishlist_item = Wishlist(
-                    user_id=user_id,
-                    product_id=product_id
-                )
-                db.session.add(wishlist_item)
-                db.session.commit()
-                
+            if row is None:
+                db.session.rollback()
+                return jsonify({'success': False, 'message': 'Product not found'}), 404
+            
+            db.session.commit()
+            
+            if row.inserted:
                 return jsonify({
                     'success': True,
-                    'message': f'{product.name} added to wishlist!',
-                    'wishlist_count': Wishlist.query.filter_by(user_id=user_id).count()
+                    'message': f'{row.name} added to wishlist!',
+                    'wishlist_count': row.wishlist_count
                 })
             else:
                 return jsonify({
                     'success': False,
-                    'message': f'{product.name} is already in your wishlist!'
+                    'message': f'{row.name} is already in your wishlist!'
                 }), 409
                 
         except Exception as e:
@@ -222,18 +262,17 @@ def add_to_wishlist(product_id):
 @cart_bp.route('/wishlist/remove/<int:item_id>', methods=['POST'])
 @jwt_required()
 def remove_from_wishlist(item_id):
-    user_id = get_jwt_identity()
-    wishlist_item = Wishlist.query.filter_by(
-        wishlist_id=item_id,
-        user_id=user_id
-    ).first_or_404()
+    user_id = int(get_jwt_identity())
+    row = db.session.execute(REMOVE_FROM_WISHLIST_SQL, {'user_id': user_id, 'item_id': item_id}).one()
+    
+    if not row.affected:
+        db.session.rollback()
+        abort(404)
     
-    db.session.delete(wishlist_item)
     db.session.commit()
     
     return jsonify({
         'success': True,
         'message': 'Item removed from wishlist',
-        'wishlist_count': Wishlist.query.filter_by(user_id=user_id).count()
+        'wishlist_count': row.wishlist_count
     })
-
@@ -4,12 +4,16 @@ sys.path.append(str(Path(__file__).parent.parent))
 
 from flask import Blueprint, request, jsonify
 from models import db, Product
-from sqlalchemy import or_, asc, desc
+from utils.cache import cached_catalog_view
+from utils.search import search_products
+from utils.serializers import PRODUCT_CARD, many
+from utils.suggest import suggest_index
 
 
 main_bp = Blueprint('main', __name__)
 
 @main_bp.route('/')
+@cached_catalog_view
 def index():
     # Grab a few products as featured
     featured_products = Product.query.limit(8).all()
@@ -18,19 +22,7 @@ def index():
     categories = db.session.query(Product.category).distinct().all()
     categories = [c[0] for c in categories if c[0]]  # Flatten tuples, filter out None
 
-    featured_data = [
-        {
-            'id': p.product_id,
-            'name': p.name,
-            'description': p.description,
-            'price': float(p.mrp),
-            'category': p.category,
-            'image': p.image_url,
-            # model doesn't have in_stock; provide conservative default
-            'in_stock': True
-        }
-        for p in featured_products
-    ]
+    featured_data = many(PRODUCT_CARD, featured_products)
 
     return jsonify({
         'success': True,
@@ -88,48 +80,14 @@ def search():
     per_page = 12
     
     if query and len(query) >= 2:  # Minimum 2 characters for search
-        # Use ilike for case-insensitive search and escape special characters
-        search_term = "%{}%".format(query.replace('%', r'\%').replace('_', r'\_'))
-
-        products_query = Product.query.filter(
-            or_(
-                Product.name.ilike(search_term),
-                Product.description.ilike(search_term),
-                Product.category.ilike(search_term)
-            )
-        )
-
-        # Sorting support
         sort = request.args.get('sort', '').lower()
-        if sort == 'price_asc':
-            products_query = products_query.order_by(asc(Product.mrp))
-        elif sort == 'price_desc':
-            products_query = products_query.order_by(desc(Product.mrp))
-        elif sort == 'name_desc':
-            products_query = products_query.order_by(desc(Product.name))
-        else:
-            # default: name ascending
-            products_query = products_query.order_by(asc(Product.name))
-        
-        # Paginate results
-        pagination = products_query.paginate(page=page, per_page=per_page, error_out=False)
-        products = pagination.items
+        pagination, match = search_products(query, sort=sort, page=page, per_page=per_page)
         total_results = pagination.total
-        
-        products_data = [
-            {
-                'id': p.id,
-                'name': p.name,
-                'description': p.description,
-                'price': float(p.price),
-                'category': p.category,
-                'image': p.image,
-                'in_stock': p.in_stock
-            }
-            for p in products
-        ]
+
+        products_data = many(PRODUCT_CARD, pagination.items)
     else:
         pagination = None
+        match = None
         products_data = []
         total_results = 0
     
@@ -139,6 +97,7 @@ def search():
             'query': query,
             'products': products_data,
             'total_results': total_results,
+            'match': match,
             'page': page,
             'per_page': per_page,
             'has_next': pagination.has_next if pagination else False,
@@ -146,3 +105,19 @@ def search():
         }
     })
 
+
+
+@main_bp.route('/search/suggest')
+def search_suggest():
+    query = request.args.get('q', '').strip()
+    limit = request.args.get('limit', 8, type=int)
+
+    suggestions = suggest_index.suggest(query, limit=limit) if query else []
+
+    return jsonify({
+        'success': True,
+        'data': {
+            'query': query,
+            'suggestions': suggestions
+        }
+    })
@@ -1,28 +1,106 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime, timezone
-from models import db, Order, Cart, Product, AddressBook
+import hashlib
+import json
+import logging
+from models import db, Order, OrderItem, Cart, Product, AddressBook, IdempotencyKey
+from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import selectinload
+from utils import revenue_rollups, store_stats
+from utils.query_budget import query_budget
+from utils.serializers import ORDER, many
 
 orders_bp = Blueprint('orders', __name__)
 
+logger = logging.getLogger('sleepcraft.orders')
+
+# Loads an order's lines and their products in one extra query for any number of orders
+LOAD_ORDER_ITEMS = selectinload(Order.items).joinedload(OrderItem.product)
+
+
+def _fingerprint(value):
+    return hashlib.sha256(json.dumps(value, sort_keys=True, separators=(',', ':')).encode()).hexdigest()
+
+
+def _claim_idempotency_key(user_id, key, data, cart_items):
+    """Claim key for this request, or return the stored response of an earlier one.
+
+    The claim row is inserted in the checkout transaction, after the cart
+    rows are locked. A concurrent retry blocks until the first request
+    commits (and then replays its response) or rolls back (and then
+    proceeds itself).
+
+    The key is bound to the request body and the cart lines it was claimed
+    with. Reusing it with a different body, or with a non-empty cart that
+    differs from the original one, is a client bug and gets a 422 instead of
+    the other request's response. An empty cart is what a genuine retry
+    sees, since the first checkout cleared it.
+    """
+    request_hash = _fingerprint(data)
+    cart_hash = _fingerprint(sorted([item.product_id, item.quantity] for item in cart_items))
+    claimed = db.session.execute(
+        insert(IdempotencyKey)
+        .values(user_id=user_id, key=key, request_hash=request_hash, cart_hash=cart_hash,
+                created_at=datetime.now(timezone.utc))
+        .on_conflict_do_nothing(index_elements=['user_id', 'key'])
+        .returning(IdempotencyKey.key_id)
+    ).scalar()
+    if claimed is not None:
+        return claimed, None
+
+    stored = IdempotencyKey.query.filter_by(user_id=user_id, key=key).first()
+    db.session.rollback()
+    if (stored.request_hash not in (None, request_hash)
+            or (cart_items and stored.cart_hash not in (None, cart_hash))):
+        return None, (jsonify({
+            'success': False,
+            'error': 'Idempotency-Key was already used for a different request'
+        }), 422)
+    response = current_app.response_class(
+        stored.response_body, status=stored.status_code, mimetype='application/json'
+    )
+    response.headers['Idempotent-Replayed'] = 'true'
+    return None, response
+
 
 @orders_bp.route('/create', methods=['POST'])
 @jwt_required()
 def create_order():
-    """Create a new order from cart items"""
+    """Create a new order from cart items.
+
+    Runs as one transaction: the user's cart rows are locked, products are
+    fetched in one query, the order header is inserted with RETURNING and
+    all of its lines go in with a single multi-row INSERT. Send an Idempotency-Key header to make retries
+    return the original result instead of ordering twice.
+    """
     try:
         user_id = int(get_jwt_identity())
         data = request.get_json()
 
-        # Get cart items for the user
-        cart_items = Cart.query.filter_by(user_id=user_id).all()
-        
+        # Lock the user's cart rows so concurrent checkouts serialise
+        cart_items = Cart.query.filter_by(user_id=user_id).order_by(Cart.cart_id).with_for_update().all()
+
+        idempotency_key = request.headers.get('Idempotency-Key')
+        key_id = None
+        if idempotency_key:
+            key_id, replay = _claim_idempotency_key(user_id, idempotency_key[:255], data, cart_items)
+            if replay is not None:
+                return replay
+
         if not cart_items:
+            db.session.rollback()
             return jsonify({
                 'success': False,
                 'error': 'Your cart is empty'
             }), 400
 
+        products = {
+            p.product_id: p
+            for p in Product.query.filter(Product.product_id.in_({item.product_id for item in cart_items})).all()
+        }
+
         # Extract shipping address
         shipping_address = data.get('shipping_address', {})
         email = data.get('email')
@@ -38,51 +116,73 @@ def create_order():
         db.session.add(address_book)
         db.session.flush()  # Get the address_id
 
-        # Calculate total amount
-        total_amount = sum(item.product.mrp * item.quantity for item in cart_items if item.product)
-
-        # Create orders for each cart item
-        orders = []
-        for item in cart_items:
-            if not item.product:
-                continue
-            order = Order(
-                user_id=user_id,
-                product_id=item.product_id,
-                status='pending',
-                payment=item.product.mrp * item.quantity,
-                mode_of_payment=payment_method,
-                date=datetime.now(timezone.utc)
+        # One order header, plus one line per cart item in a single INSERT
+        lines = [
+            {
+                'product_id': item.product_id,
+                'quantity': item.quantity,
+                'unit_price': products[item.product_id].mrp
+            }
+            for item in cart_items
+            if item.product_id in products
+        ]
+        total_amount = sum(line['unit_price'] * line['quantity'] for line in lines)
+
+        order_id = None
+        if lines:
+            header = {
+                'user_id': user_id,
+                'status': 'pending',
+                'payment': total_amount,
+                'mode_of_payment': payment_method,
+                'date': datetime.utcnow()  # naive UTC, like Order.date's default and the rollup days
+            }
+            order_id = db.session.execute(
+                insert(Order).values(header).returning(Order.order_id)
+            ).scalar()
+            db.session.execute(
+                insert(OrderItem).values([{**line, 'order_id': order_id} for line in lines])
             )
-            db.session.add(order)
-            orders.append(order)
-
-        # Clear the cart after creating orders
-        Cart.query.filter_by(user_id=user_id).delete()
-
-        # Commit all changes
-        db.session.commit()
 
-        # Get the first order ID for reference
-        first_order_id = orders[0].order_id if orders else None
+            # Core inserts bypass the ORM hooks that maintain the summaries
+            connection = db.session.connection()
+            store_stats.record_orders(connection, [header])
+            revenue_rollups.record_orders(connection, [header])
+            revenue_rollups.record_order_items(
+                connection, [{**line, 'date': header['date'], 'status': header['status']} for line in lines]
+            )
 
-        print(f"DEBUG: Order created successfully. Order ID: {first_order_id}, User ID: {user_id}")
+        # Clear the cart rows that were ordered; a row added concurrently was not
+        # locked or ordered, so it stays in the cart
+        Cart.query.filter(Cart.cart_id.in_([item.cart_id for item in cart_items])).delete()
 
-        return jsonify({
+        payload = {
             'success': True,
             'data': {
-                'order_id': first_order_id,
+                'order_id': order_id,
                 'total_amount': total_amount,
                 'payment_method': payment_method,
-                'message': f'Order placed successfully! {len(orders)} item(s) ordered.'
+                'message': f'Order placed successfully! {len(lines)} item(s) ordered.'
             }
-        }), 201
+        }
+
+        if key_id is not None:
+            db.session.execute(
+                update(IdempotencyKey)
+                .where(IdempotencyKey.key_id == key_id)
+                .values(status_code=201, response_body=current_app.json.dumps(payload))
+            )
+
+        # Commit all changes
+        db.session.commit()
+
+        logger.info("Order %s created for user %s", order_id, user_id)
+
+        return jsonify(payload), 201
 
     except Exception as e:
         db.session.rollback()
-        import traceback
-        traceback.print_exc()
-        print(f"DEBUG: Error creating order: {str(e)}")
+        logger.exception("Error creating order")
         return jsonify({
             'success': False,
             'error': f'Failed to create order: {str(e)}'
@@ -91,12 +191,15 @@ def create_order():
 
 @orders_bp.route('/<int:order_id>', methods=['GET'])
 @jwt_required()
+@query_budget(2)
 def get_order(order_id):
     """Get order details"""
     try:
         user_id = int(get_jwt_identity())
         
-        order = Order.query.filter_by(order_id=order_id, user_id=user_id).first()
+        order = Order.query.options(LOAD_ORDER_ITEMS).filter_by(
+            order_id=order_id, user_id=user_id
+        ).first()
         
         if not order:
             return jsonify({
@@ -106,19 +209,11 @@ def get_order(order_id):
 
         return jsonify({
             'success': True,
-            'data': {
-                'order_id': order.order_id,
-                'status': order.status,
-                'product_id': order.product_id,
-                'product_name': order.product.name if order.product else 'Unknown',
-                'payment': order.payment,
-                'payment_method': order.mode_of_payment,
-                'date': order.date.isoformat() if order.date else None
-            }
+            'data': ORDER(order)
         }), 200
 
     except Exception as e:
-        print(f"DEBUG: Error fetching order: {str(e)}")
+        logger.exception("Error fetching order %s", order_id)
         return jsonify({
             'success': False,
             'error': f'Failed to fetch order: {str(e)}'
@@ -127,24 +222,17 @@ def get_order(order_id):
 
 @orders_bp.route('/user/all', methods=['GET'])
 @jwt_required()
+@query_budget(2)
 def get_user_orders():
     """Get all orders for the logged-in user"""
     try:
         user_id = int(get_jwt_identity())
         
-        orders = Order.query.filter_by(user_id=user_id).order_by(Order.date.desc()).all()
+        orders = Order.query.options(LOAD_ORDER_ITEMS).filter_by(
+            user_id=user_id
+        ).order_by(Order.date.desc()).all()
         
-        orders_data = []
-        for order in orders:
-            orders_data.append({
-                'order_id': order.order_id,
-                'status': order.status,
-                'product_id': order.product_id,
-                'product_name': order.product.name if order.product else 'Unknown',
-                'payment': order.payment,
-                'payment_method': order.mode_of_payment,
-                'date': order.date.isoformat() if order.date else None
-            })
+        orders_data = many(ORDER, orders)
 
         return jsonify({
             'success': True,
@@ -155,7 +243,7 @@ def get_user_orders():
         }), 200
 
     except Exception as e:
-        print(f"DEBUG: Error fetching user orders: {str(e)}")
+        logger.exception("Error fetching orders for user")
         return jsonify({
             'success': False,
             'error': f'Failed to fetch orders: {str(e)}'
@@ -5,10 +5,14 @@ sys.path.append(str(Path(__file__).parent.parent))
 from flask import Blueprint, request, abort, jsonify
 from models import db, Product
 from sqlalchemy import or_, func
+from utils.cache import cached_catalog_view, catalog_cache
+from utils.pagination import InvalidCursor, cached_count, keyset_paginate
+from utils.serializers import PRODUCT, PRODUCT_SUMMARY, many
 
 products_bp = Blueprint('products', __name__)
 
 @products_bp.route('')
+@cached_catalog_view
 def products_list():
     try:
         page = request.args.get('page', 1, type=int)
@@ -19,21 +23,16 @@ def products_list():
         
         if category:
             query = query.filter_by(category=category)
+
+        if 'cursor' in request.args:
+            return _products_keyset_page(query, category, per_page)
             
         pagination = query.paginate(page=page, per_page=per_page, error_out=False)
         
         return jsonify({
             'success': True,
             'data': {
-                'products': [{
-                    'id': p.product_id,
-                    'name': p.name,
-                    'category': p.category,
-                    'mrp': p.mrp,
-                    'discount': p.discount,
-                    'description': p.description,
-                    'image_url': p.image_url
-                } for p in pagination.items],
+                'products': many(PRODUCT, pagination.items),
                 'pagination': {
                     'page': pagination.page,
                     'pages': pagination.pages,
@@ -43,13 +42,39 @@ def products_list():
                 }
             }
         }), 200
+    except InvalidCursor as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
             'error': str(e)
         }), 500
 
+def _products_keyset_page(query, category, per_page):
+    """Cursor mode for products_list: ?cursor=<opaque>&with_total=1"""
+    page = keyset_paginate(query, [Product.product_id], request.args.get('cursor'), per_page)
+
+    pagination = {
+        'per_page': page.per_page,
+        'next_cursor': page.next_cursor,
+        'has_next': page.has_next
+    }
+    if request.args.get('with_total', type=int):
+        pagination['total'] = cached_count(f'products:{catalog_cache.version()}:{category}', query)
+
+    return jsonify({
+        'success': True,
+        'data': {
+            'products': many(PRODUCT, page.items),
+            'pagination': pagination
+        }
+    }), 200
+
 @products_bp.route('/categories')
+@cached_catalog_view
 def get_categories():
     try:
         categories = db.session.query(Product.category).distinct().all()
@@ -66,6 +91,7 @@ def get_categories():
         }), 500
 
 @products_bp.route('/<int:product_id>')
+@cached_catalog_view
 def product_detail(product_id):
     try:
         product = Product.query.get_or_404(product_id)
@@ -78,23 +104,8 @@ def product_detail(product_id):
         return jsonify({
             'success': True,
             'data': {
-                'product': {
-                    'id': product.product_id,
-                    'name': product.name,
-                    'category': product.category,
-                    'mrp': product.mrp,
-                    'discount': product.discount,
-                    'description': product.description,
-                    'image_url': product.image_url
-                },
-                'related_products': [{
-                    'id': p.product_id,
-                    'name': p.name,
-                    'category': p.category,
-                    'mrp': p.mrp,
-                    'discount': p.discount,
-                    'image_url': p.image_url
-                } for p in related_products]
+                'product': PRODUCT(product),
+                'related_products': many(PRODUCT_SUMMARY, related_products)
             }
         }), 200
     except Exception as e:
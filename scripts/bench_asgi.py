@@ -0,0 +1,173 @@
+"""
+Sync vs ASGI load test.
+
+Starts the API once per mode with the same number of worker processes -
+gunicorn gthread workers on app:app for sync, uvicorn workers on
+asgi:application for ASGI - and drives it with CONCURRENCY concurrent
+clients for DURATION seconds over a mix of the endpoints that have async
+handlers. Reports requests/sec, p50/p99 latency and the total RSS of the
+server processes, so the two modes can be compared at equal memory.
+
+The catalog cache is off by default so every request reaches Postgres;
+set BENCH_CATALOG_CACHE=true to measure cache hits instead. Rate-limit
+budgets are raised for the run.
+
+Usage (against a scratch database - a bench user is created; needs
+gunicorn, uvicorn and httpx):
+    python scripts/bench_asgi.py
+"""
+import asyncio
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+# Ensure project root is on path so top-level imports work when run from scripts/
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+import httpx
+from flask_jwt_extended import create_access_token
+
+from app import app
+from models import db, Product, User
+from utils.token_blocklist import token_claims
+
+WORKERS = int(os.environ.get('BENCH_WORKERS', 2))
+SYNC_THREADS = int(os.environ.get('BENCH_SYNC_THREADS', 8))
+CONCURRENCY = int(os.environ.get('BENCH_CONCURRENCY', 64))
+DURATION = float(os.environ.get('BENCH_DURATION', 20))
+WARMUP = 3.0
+PORT = 8765
+EMAIL = 'bench-asgi@example.com'
+
+MODES = {
+    'sync': ['gunicorn', '--workers', str(WORKERS), '--threads', str(SYNC_THREADS),
+             '--worker-class', 'gthread', '--bind', f'127.0.0.1:{PORT}', 'app:app'],
+    'asgi': ['uvicorn', 'asgi:application', '--workers', str(WORKERS), '--host', '127.0.0.1',
+             '--port', str(PORT), '--no-access-log', '--log-level', 'warning'],
+}
+
+
+def bench_fixture():
+    """A bench user's access token and some product ids."""
+    with app.app_context():
+        user = User.query.filter_by(email=EMAIL).first()
+        if not user:
+            user = User(name='ASGI Bench', email=EMAIL, oauth_provider='local')
+            db.session.add(user)
+            db.session.commit()
+        token = create_access_token(identity=str(user.user_id), additional_claims=token_claims(user))
+        product_ids = [p for (p,) in db.session.query(Product.product_id).limit(200)]
+    return token, product_ids
+
+
+def request_mix(product_ids):
+    """(weight, path, authenticated) for each endpoint under test."""
+    return [
+        (3, lambda: f'/api/products?page={random.randint(1, 5)}', False),
+        (3, lambda: f'/api/products/{random.choice(product_ids)}', False),
+        (1, lambda: '/api/', False),
+        (1, lambda: '/api/products/categories', False),
+        (2, lambda: '/api/auth/me', True),
+        (1, lambda: '/api/orders/user/all', True),
+    ]
+
+
+def process_tree_rss_mb(pid):
+    """Total RSS of pid and its descendants (Linux /proc)."""
+    children = {}
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                with open(f'/proc/{entry}/stat') as f:
+                    ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+            except (OSError, IndexError, ValueError):
+                continue
+            children.setdefault(ppid, []).append(int(entry))
+    total, stack = 0, [pid]
+    while stack:
+        current = stack.pop()
+        try:
+            with open(f'/proc/{current}/statm') as f:
+                total += int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except OSError:
+            pass
+        stack.extend(children.get(current, []))
+    return total / 2**20
+
+
+async def wait_ready(client):
+    for _ in range(100):
+        try:
+            if (await client.get('/api/contact')).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError('server did not start')
+
+
+async def drive(client, token, product_ids, duration):
+    mix = request_mix(product_ids)
+    weights = [weight for weight, _, _ in mix]
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            _, path, authenticated = random.choices(mix, weights)[0]
+            headers = {'Authorization': f'Bearer {token}'} if authenticated else {}
+            start = time.perf_counter()
+            try:
+                response = await client.get(path(), headers=headers)
+                ok = response.status_code in (200, 304)
+            except httpx.HTTPError:
+                ok = False
+            latencies.append(time.perf_counter() - start)
+            errors += not ok
+
+    await asyncio.gather(*(worker() for _ in range(CONCURRENCY)))
+    return latencies, errors
+
+
+async def run_mode(name, token, product_ids):
+    env = {
+        **os.environ,
+        'CATALOG_CACHE_ENABLED': os.environ.get('BENCH_CATALOG_CACHE', 'false'),
+        'RATELIMIT_CATALOG': '1000000 per minute',
+        'RATELIMIT_SHOPPING': '1000000 per minute',
+        'RATELIMIT_AUTH': '1000000 per minute',
+    }
+    server = subprocess.Popen(MODES[name], cwd=ROOT, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    limits = httpx.Limits(max_connections=CONCURRENCY, max_keepalive_connections=CONCURRENCY)
+    try:
+        async with httpx.AsyncClient(base_url=f'http://127.0.0.1:{PORT}', limits=limits, timeout=30) as client:
+            await wait_ready(client)
+            await drive(client, token, product_ids, WARMUP)
+            latencies, errors = await drive(client, token, product_ids, DURATION)
+            rss = process_tree_rss_mb(server.pid)
+    finally:
+        server.terminate()
+        server.wait()
+
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+    print(f"{name:>5} {len(latencies) / DURATION:>9.1f} {statistics.median(latencies) * 1000:>9.1f} "
+          f"{p99:>9.1f} {errors:>7} {rss:>9.1f}")
+
+
+async def main():
+    token, product_ids = bench_fixture()
+    print(f"{WORKERS} workers, {CONCURRENCY} concurrent clients, {DURATION:.0f}s per mode")
+    print(f"{'mode':>5} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7} {'RSS MB':>9}")
+    for name in MODES:
+        await run_mode(name, token, product_ids)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,98 @@
+"""
+Concurrent checkout benchmark.
+
+For each concurrency level, fills one user's cart and fires that many
+simultaneous POST /api/orders/create requests for the same user, reporting
+checkouts/sec and confirming that exactly one of them placed the order.
+A second round sends every request with the same Idempotency-Key and checks
+that all of them get the same order back.
+
+Usage (against a scratch database - orders, carts and a bench user are created):
+    python scripts/bench_checkout.py
+"""
+import os
+import sys
+import threading
+import time
+import uuid
+
+# Ensure project root is on path so top-level imports work when run from scripts/
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask_jwt_extended import create_access_token
+
+from app import app
+from models import db, Cart, Product, User
+
+CONCURRENCY = [1, 4, 16, 32]
+ROUNDS = 20
+CART_ITEMS = 3
+
+
+def bench_user():
+    user = User.query.filter_by(email='bench-checkout@example.com').first()
+    if not user:
+        user = User(name='Checkout Bench', email='bench-checkout@example.com', oauth_provider='local')
+        db.session.add(user)
+        db.session.commit()
+    return user.user_id
+
+
+def fill_cart(user_id, product_ids):
+    Cart.query.filter_by(user_id=user_id).delete()
+    for product_id in product_ids:
+        db.session.add(Cart(user_id=user_id, product_id=product_id, quantity=1))
+    db.session.commit()
+
+
+def fire(token, n, same_key):
+    shared_key = str(uuid.uuid4())
+    results = [None] * n
+    barrier = threading.Barrier(n)
+
+    def worker(i):
+        client = app.test_client()
+        headers = {
+            'Authorization': f'Bearer {token}',
+            'Idempotency-Key': shared_key if same_key else str(uuid.uuid4()),
+        }
+        barrier.wait()
+        response = client.post('/api/orders/create', json={'shipping_address': {}}, headers=headers)
+        results[i] = (response.status_code, (response.get_json() or {}).get('data', {}).get('order_id'))
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - started, results
+
+
+def main():
+    with app.app_context():
+        user_id = bench_user()
+        product_ids = [p.product_id for p in Product.query.limit(CART_ITEMS).all()]
+        if not product_ids:
+            print("No products found - run scripts/seed_products.py first")
+            sys.exit(1)
+        token = create_access_token(identity=str(user_id))
+
+        print(f"{'threads':>8} {'mode':>10} {'req/s':>8} {'one order':>9} {'ok':>4}")
+        for n in CONCURRENCY:
+            for same_key in (False, True):
+                elapsed_total = 0.0
+                correct = 0
+                for _ in range(ROUNDS):
+                    fill_cart(user_id, product_ids)
+                    elapsed, results = fire(token, n, same_key)
+                    elapsed_total += elapsed
+                    placed = {order_id for status, order_id in results if status == 201}
+                    correct += len(placed) == 1
+                mode = 'same-key' if same_key else 'distinct'
+                rate = n * ROUNDS / elapsed_total
+                print(f"{n:>8} {mode:>10} {rate:>8.1f} {correct:>6}/{ROUNDS:<2} {'yes' if correct == ROUNDS else 'NO':>4}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+Streaming export benchmark.
+
+Tops the bench user's orders up to ORDERS rows (1,000,000 by default; set
+BENCH_EXPORT_ORDERS to change it) with a single INSERT ... SELECT from
+generate_series, then downloads GET /api/admin/orders/export as CSV and as
+NDJSON through the test client, reading the body chunk by chunk. RSS is
+sampled as chunks arrive: it should level off within the first batches and
+stay flat to the end, however many rows are exported.
+
+Usage (against a scratch database - orders and a bench user are created):
+    python scripts/bench_export.py
+"""
+import os
+import resource
+import sys
+import time
+
+# Ensure project root is on path so top-level imports work when run from scripts/
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import text
+
+from app import app
+from extensions import limiter
+from models import db, Order, User
+
+ORDERS = int(os.environ.get('BENCH_EXPORT_ORDERS', 1_000_000))
+EMAIL = 'bench-export@example.com'
+
+SEED_ORDERS_SQL = text("""
+    INSERT INTO "order" (user_id, status, payment, date, mode_of_payment)
+    SELECT :user_id,
+           (ARRAY['pending', 'confirmed', 'shipped', 'delivered', 'cancelled'])[1 + n % 5],
+           100 + n % 5000,
+           now() - make_interval(mins => n),
+           'cod'
+    FROM generate_series(1, :count) AS n
+""")
+
+
+def rss_mb():
+    """Current resident set size in MB (Linux), else peak RSS."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * resource.getpagesize() / 2**20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def seed():
+    user = User.query.filter_by(email=EMAIL).first()
+    if not user:
+        user = User(name='Export Bench', email=EMAIL, oauth_provider='local')
+        db.session.add(user)
+        db.session.commit()
+    existing = Order.query.filter_by(user_id=user.user_id).count()
+    if existing < ORDERS:
+        print(f"Seeding {ORDERS - existing:,} orders...")
+        db.session.execute(SEED_ORDERS_SQL, {'user_id': user.user_id, 'count': ORDERS - existing})
+        db.session.commit()
+
+
+def export(client, fmt):
+    response = client.get(f'/api/admin/orders/export?format={fmt}', buffered=False)
+    assert response.status_code == 200, response.status_code
+
+    start = time.perf_counter()
+    start_rss = rss_mb()
+    samples = []
+    lines = 0
+    size = 0
+    for i, chunk in enumerate(response.response):
+        lines += chunk.count(b'\n')
+        size += len(chunk)
+        if i % 100 == 0:
+            samples.append(rss_mb())
+    response.close()
+    elapsed = time.perf_counter() - start
+    samples.append(rss_mb())
+
+    rows = lines - 1 if fmt == 'csv' else lines
+    print(f"{fmt:>7} {rows:>10,} {rows / elapsed:>10,.0f} {size / 2**20:>8.1f} "
+          f"{start_rss:>9.1f} {samples[len(samples) // 2]:>9.1f} {max(samples):>9.1f} {samples[-1]:>9.1f}")
+
+
+def main():
+    limiter.enabled = False
+    with app.app_context():
+        seed()
+
+    client = app.test_client()
+    print(f"{'format':>7} {'rows':>10} {'rows/s':>10} {'MB out':>8} "
+          f"{'RSS start':>9} {'RSS mid':>9} {'RSS peak':>9} {'RSS end':>9}")
+    for fmt in ('csv', 'ndjson'):
+        export(client, fmt)
+
+
+if __name__ == '__main__':
+    main()
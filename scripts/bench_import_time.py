@@ -0,0 +1,126 @@
+"""
+Startup import-time benchmark.
+
+Runs each entry point in a fresh interpreter under `python -X importtime`
+RUNS times and reports the fastest total import time and module count:
+
+    config   - import config
+    models   - import models
+    cli      - app.create_cli_app(), what admin_setup / db_commands / seed_products pay
+    web      - app.create_app(), what each gunicorn worker pays before its first request
+
+It also checks that deferred dependencies stay deferred: the CLI paths must
+not load the web stack (flask-limiter, flask-jwt-extended, the blueprints)
+and no path may load Redis, google-auth or requests at startup - they are
+imported on first use. A leak fails the run regardless of timings.
+
+Timings are compared with the baseline file: a target more than
+IMPORT_TIME_TOLERANCE (default 1.25, i.e. 25%) slower than its baseline
+fails. Timings only compare on the same hardware, so the baseline is not
+committed: the first run on a machine (no baseline file yet) records it,
+as --save does, and CI keeps it between runs by caching the --baseline
+path. Re-record with --save when a change legitimately moves startup time.
+No database connection is made; DATABASE_URL only has to parse.
+
+Usage:
+    python scripts/bench_import_time.py [--save] [--baseline PATH]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# Ensure project root is on path so top-level imports work when run from scripts/
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+RUNS = int(os.environ.get('IMPORT_TIME_RUNS', 5))
+TOLERANCE = float(os.environ.get('IMPORT_TIME_TOLERANCE', 1.25))
+DEFAULT_BASELINE = os.path.join(ROOT, 'scripts', 'import_time_baseline.json')
+
+TARGETS = {
+    'config': 'import config',
+    'models': 'import models',
+    'cli': 'import app; app.create_cli_app()',
+    'web': 'import app; app.create_app()',
+}
+
+DEFERRED = {'redis', 'google', 'requests'}
+WEB_ONLY = {'flask_limiter', 'flask_jwt_extended', 'flask_cors', 'routes', 'extensions'}
+FORBIDDEN = {
+    'config': DEFERRED | WEB_ONLY | {'flask', 'sqlalchemy'},
+    'models': DEFERRED | WEB_ONLY,
+    'cli': DEFERRED | WEB_ONLY,
+    'web': DEFERRED,
+}
+
+
+def parse_importtime(stderr):
+    """{module: self microseconds} from -X importtime output."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, _, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = int(self_us)
+    return modules
+
+
+def measure(code):
+    env = {
+        **os.environ,
+        'DATABASE_URL': os.environ.get('DATABASE_URL', 'postgresql://localhost/import_time'),
+        'PYTHONDONTWRITEBYTECODE': '1',
+    }
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=ROOT, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    if result.returncode != 0:
+        print(result.stderr[-2000:])
+        raise SystemExit(f"{code!r} failed")
+    return parse_importtime(result.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--save', action='store_true', help='write the timings as the new baseline')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    results, failures = {}, []
+    print(f"{'target':>7} {'ms':>9} {'baseline':>9} {'modules':>8}  heaviest")
+    for name, code in TARGETS.items():
+        runs = [measure(code) for _ in range(RUNS)]
+        fastest = min(runs, key=lambda modules: sum(modules.values()))
+        total_ms = sum(fastest.values()) / 1000
+        results[name] = round(total_ms, 1)
+
+        heaviest = sorted(fastest.items(), key=lambda item: item[1], reverse=True)[:3]
+        base = baseline.get(name)
+        print(f"{name:>7} {total_ms:>9.1f} {base if base is not None else '-':>9} {len(fastest):>8}  "
+              + ', '.join(f'{module} {us / 1000:.0f}ms' for module, us in heaviest))
+
+        leaked = sorted({module.split('.')[0] for module in fastest} & FORBIDDEN[name])
+        if leaked:
+            failures.append(f"{name}: imports {', '.join(leaked)} at startup")
+        if base is not None and total_ms > base * TOLERANCE:
+            failures.append(f"{name}: {total_ms:.1f}ms is over {TOLERANCE:.2f}x the {base}ms baseline")
+
+    if args.save or not baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"Baseline written to {args.baseline}")
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""
+Login throughput benchmark.
+
+Fires concurrent POST /api/auth/login requests for one bench user at each
+PASSWORD_HASH_WORKERS setting (0 = hash on the request thread) and reports
+logins/sec, how many were shed with 503, and the p99 latency of a catalog
+request issued alongside - the requests that hashing used to starve.
+
+Usage (against a scratch database - a bench user is created):
+    python scripts/bench_login.py
+"""
+import os
+import statistics
+import sys
+import threading
+import time
+
+# Ensure project root is on path so top-level imports work when run from scripts/
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import app
+from extensions import limiter
+from models import db, User
+from utils.cache import catalog_cache
+from utils.password_hashing import password_hasher
+
+WORKER_COUNTS = [0, 1, 2, 4, os.cpu_count() or 4]
+THREADS = 16
+LOGINS_PER_THREAD = 10
+EMAIL = 'bench-login@example.com'
+PASSWORD = 'bench-login-password'
+
+
+def bench_user():
+    user = User.query.filter_by(email=EMAIL).first()
+    if not user:
+        user = User(name='Login Bench', email=EMAIL, oauth_provider='local')
+        db.session.add(user)
+    user.set_password(PASSWORD)
+    db.session.commit()
+
+
+def configure(workers):
+    app.config['PASSWORD_HASH_WORKERS'] = workers
+    if password_hasher._executor is not None:
+        password_hasher._executor.shutdown()
+        password_hasher._executor = None
+    password_hasher.init_app(app)
+
+
+def run():
+    statuses = []
+    catalog_ms = []
+    done = threading.Event()
+    barrier = threading.Barrier(THREADS + 1)
+
+    def login_worker():
+        client = app.test_client()
+        barrier.wait()
+        for _ in range(LOGINS_PER_THREAD):
+            response = client.post('/api/auth/login', json={'email': EMAIL, 'password': PASSWORD})
+            statuses.append(response.status_code)
+
+    def catalog_probe():
+        client = app.test_client()
+        barrier.wait()
+        while not done.is_set():
+            started = time.perf_counter()
+            client.get('/api/products/categories')
+            catalog_ms.append((time.perf_counter() - started) * 1000)
+
+    threads = [threading.Thread(target=login_worker) for _ in range(THREADS)]
+    probe = threading.Thread(target=catalog_probe)
+    started = time.perf_counter()
+    for t in threads + [probe]:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    done.set()
+    probe.join()
+
+    catalog_ms.sort()
+    p99 = catalog_ms[max(0, int(len(catalog_ms) * 0.99) - 1)] if catalog_ms else 0.0
+    return statuses, elapsed, statistics.median(catalog_ms) if catalog_ms else 0.0, p99
+
+
+def main():
+    limiter.enabled = False  # the per-IP login limit would cap the run
+    catalog_cache.enabled = False  # make the catalog probe do real work
+
+    with app.app_context():
+        configure(0)
+        bench_user()
+
+    print(f"method: {password_hasher.method}, {THREADS} threads x {LOGINS_PER_THREAD} logins")
+    print(f"{'workers':>8} {'logins/s':>9} {'ok':>5} {'503':>5} {'catalog p50':>12} {'catalog p99':>12}")
+    for workers in WORKER_COUNTS:
+        configure(workers)
+        statuses, elapsed, p50, p99 = run()
+        ok = statuses.count(200)
+        print(f"{workers:>8} {ok / elapsed:>9.1f} {ok:>5} {statuses.count(503):>5} {p50:>10.1f}ms {p99:>10.1f}ms")
+    configure(0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+Search latency benchmark.
+
+Fills a *scratch* database with synthetic products at 10k, 100k and 1M rows
+and reports p50/p99 latency of utils.search.search_products for exact and
+misspelled queries at each size.
+
+Usage:
+    BENCH_DATABASE_URL=postgresql://localhost/sleepcraft_bench python scripts/bench_search.py
+
+Never point BENCH_DATABASE_URL at a real database - the product table is
+truncated before the run.
+"""
+import os
+import random
+import statistics
+import sys
+import time
+
+# Ensure project root is on path so top-level imports work when run from scripts/
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask
+from sqlalchemy import text
+
+from models import db
+import migrations
+from utils.search import search_products
+
+SIZES = [10_000, 100_000, 1_000_000]
+QUERIES_PER_SIZE = 200
+
+STYLES = ['Classic', 'Luxury', 'Modern', 'Rustic', 'Compact', 'Royal', 'Nordic', 'Urban', 'Plush', 'Vintage']
+ITEMS = ['Sofa', 'Mattress', 'Recliner', 'Table', 'Wardrobe', 'Pillow', 'Bedframe', 'Ottoman']
+FINISHES = ['walnut', 'oak', 'teak', 'velvet', 'linen', 'leather', 'cotton', 'memory foam', 'steel', 'cane']
+CATEGORIES = ['Sofa', 'Mattress', 'Chair', 'Table', 'Storage', 'Bedding']
+
+EXACT_QUERIES = [f'{s} {i}' for s in STYLES for i in ITEMS] + FINISHES
+TYPO_QUERIES = ['Matress', 'Recliener', 'Wardrob', 'Ottomon', 'Bedfrme', 'Sopha']
+
+
+def _array(values):
+    return "array[" + ", ".join(f"'{v}'" for v in values) + "]"
+
+
+def fill(start, end):
+    db.session.execute(text(f"""
+        INSERT INTO product (name, category, mrp, discount, description, image_url)
+        SELECT {_array(STYLES)}[1 + i % {len(STYLES)}] || ' ' ||
+               {_array(ITEMS)}[1 + (i / {len(STYLES)}) % {len(ITEMS)}] || ' ' || i,
+               {_array(CATEGORIES)}[1 + i % {len(CATEGORIES)}],
+               1000 + i % 50000,
+               0,
+               'Synthetic product ' || i || ' in ' || {_array(FINISHES)}[1 + (i / 7) % {len(FINISHES)}] || ' finish',
+               NULL
+        FROM generate_series(:start, :end - 1) AS i
+    """), {'start': start, 'end': end})
+    db.session.commit()
+    db.session.execute(text("ANALYZE product"))
+    db.session.commit()
+
+
+def measure(queries):
+    timings = []
+    for _ in range(QUERIES_PER_SIZE):
+        term = random.choice(queries)
+        started = time.perf_counter()
+        pagination, _ = search_products(term)
+        pagination.items
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.99) - 1]
+
+
+def main():
+    url = os.environ.get('BENCH_DATABASE_URL')
+    if not url:
+        print("BENCH_DATABASE_URL is required (use a scratch database)")
+        sys.exit(1)
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = url
+    db.init_app(app)
+
+    with app.app_context():
+        migrations.upgrade(db.engine)
+        db.session.execute(text("TRUNCATE product RESTART IDENTITY CASCADE"))
+        db.session.commit()
+
+        print(f"{'products':>10} {'kind':>6} {'p50 ms':>8} {'p99 ms':>8}")
+        filled = 0
+        for size in SIZES:
+            fill(filled, size)
+            filled = size
+            for kind, queries in (('exact', EXACT_QUERIES), ('typo', TYPO_QUERIES)):
+                p50, p99 = measure(queries)
+                print(f"{size:>10} {kind:>6} {p50:>8.2f} {p99:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+Serialisation microbenchmark.
+
+Builds 1,000 in-memory products, cart lines and orders (no database) and
+reports the cost per 1,000 rows of:
+  * building dicts by hand, as the routes used to
+  * the compiled schemas in utils.serializers
+  * encoding with Flask's default provider vs utils.json_provider
+    (orjson when installed)
+
+Usage:
+    python scripts/bench_serializers.py
+"""
+import os
+import sys
+import timeit
+from datetime import datetime
+
+# Ensure project root is on path so top-level imports work when run from scripts/
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from models import Cart, Order, OrderItem, Product
+from utils.json_provider import FastJSONProvider
+from utils.serializers import CART_ITEM, ORDER, PRODUCT, many
+
+ROWS = 1000
+REPEAT = 20
+
+
+def make_rows():
+    products = [
+        Product(product_id=i, name=f'Product {i}', category='Sofa', mrp=1000.0 + i, discount=5,
+                description='A comfortable bench product', image_url=f'/static/{i}.jpg')
+        for i in range(ROWS)
+    ]
+    carts = [Cart(cart_id=i, product=p, product_id=p.product_id, quantity=2) for i, p in enumerate(products)]
+    orders = []
+    for i, p in enumerate(products):
+        order = Order(order_id=i, status='pending', payment=p.mrp * 2, mode_of_payment='cod',
+                      date=datetime(2024, 1, 1))
+        order.items = [OrderItem(product=p, product_id=p.product_id, quantity=2, unit_price=p.mrp)]
+        orders.append(order)
+    return products, carts, orders
+
+
+def by_hand(products, carts, orders):
+    return {
+        'products': lambda: [{
+            'id': p.product_id, 'name': p.name, 'category': p.category, 'mrp': p.mrp,
+            'discount': p.discount, 'description': p.description, 'image_url': p.image_url
+        } for p in products],
+        'cart': lambda: [{
+            'id': c.cart_id, 'product_id': c.product.product_id, 'product_name': c.product.name,
+            'product_price': float(c.product.mrp), 'quantity': c.quantity,
+            'subtotal': float(c.product.mrp * c.quantity), 'image': c.product.image_url
+        } for c in carts],
+        'orders': lambda: [{
+            'order_id': o.order_id, 'status': o.status,
+            'product_id': o.items[0].product_id if o.items else None,
+            'product_name': o.items[0].product.name if o.items and o.items[0].product else 'Unknown',
+            'item_count': sum(item.quantity for item in o.items),
+            'items': [{
+                'product_id': item.product_id,
+                'product_name': item.product.name if item.product else 'Unknown',
+                'quantity': item.quantity, 'unit_price': float(item.unit_price),
+                'subtotal': float(item.line_total)
+            } for item in o.items],
+            'payment': o.payment, 'payment_method': o.mode_of_payment,
+            'date': o.date.isoformat() if o.date else None
+        } for o in orders],
+    }
+
+
+def per_thousand(fn):
+    seconds = min(timeit.repeat(fn, number=1, repeat=REPEAT))
+    return seconds * 1000 * 1000 / ROWS  # ms per 1,000 rows
+
+
+def main():
+    app = Flask(__name__)
+    default_provider = DefaultJSONProvider(app)
+    fast_provider = FastJSONProvider(app)
+
+    products, carts, orders = make_rows()
+    hand = by_hand(products, carts, orders)
+    compiled = {
+        'products': lambda: many(PRODUCT, products),
+        'cart': lambda: many(CART_ITEM, carts),
+        'orders': lambda: many(ORDER, orders),
+    }
+
+    print(f"JSON backend: {fast_provider.backend}")
+    print(f"{'rows':>9} {'by hand':>9} {'schema':>9} {'json':>9} {'fast':>9}   (ms per 1,000 rows)")
+    for name in ('products', 'cart', 'orders'):
+        data = compiled[name]()
+        assert data == hand[name](), f"{name}: schema output differs from the hand-built dicts"
+        print(f"{name:>9} {per_thousand(hand[name]):>9.3f} {per_thousand(compiled[name]):>9.3f} "
+              f"{per_thousand(lambda: default_provider.dumps(data, separators=(',', ':'))):>9.3f} "
+              f"{per_thousand(lambda: fast_provider.dumps(data)):>9.3f}")
+
+
+if __name__ == '__main__':
+    main()
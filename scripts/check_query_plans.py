@@ -0,0 +1,172 @@
+"""
+Query plan regression check.
+
+Drives every read route through the Flask test client against a seeded
+scratch database, captures the SQL each one runs, and EXPLAINs every SELECT
+with sequential scans disabled. If a filtered lookup on a hot table still
+plans as a Seq Scan, no index can serve it - the check prints the route,
+table and statement and exits non-zero.
+
+Unfiltered full scans (e.g. COUNT(*) over a whole table) are reported but
+not treated as failures.
+
+Usage (the database is migrated and seeded with synthetic rows):
+    PLAN_DATABASE_URL=postgresql://localhost/sleepcraft_plans python scripts/check_query_plans.py
+"""
+import json
+import os
+import sys
+
+# Ensure project root is on path so top-level imports work when run from scripts/
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+PLAN_DATABASE_URL = os.environ.get('PLAN_DATABASE_URL')
+if not PLAN_DATABASE_URL:
+    print("PLAN_DATABASE_URL is required (use a scratch database)")
+    sys.exit(1)
+os.environ['DATABASE_URL'] = PLAN_DATABASE_URL
+os.environ['CATALOG_CACHE_ENABLED'] = 'false'
+
+from flask import has_request_context, request
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+
+from app import app
+from models import db
+import migrations
+
+HOT_TABLES = {'order', 'order_item', 'cart', 'wishlist', 'product', 'users', 'idempotency_key'}
+
+SEED_SQL = [
+    """
+    INSERT INTO product (name, category, mrp, discount, description)
+    SELECT 'Plan Product ' || i, (array['Sofa', 'Mattress', 'Chair', 'Table', 'Storage'])[1 + i % 5],
+           1000 + i, 0, 'Seeded for plan checks'
+    FROM generate_series(1, 5000) AS i
+    """,
+    """
+    INSERT INTO users (name, email, oauth_provider, is_verified)
+    SELECT 'Plan User ' || i, 'plan-user-' || i || '@example.com', 'local', true
+    FROM generate_series(1, 2000) AS i
+    """,
+    """
+    INSERT INTO "order" (user_id, status, payment, date, mode_of_payment)
+    SELECT u.user_id, (array['pending', 'confirmed', 'shipped', 'delivered'])[1 + g % 4],
+           1000, now() - (g || ' hours')::interval, 'cod'
+    FROM users u, generate_series(1, 10) AS g
+    """,
+    """
+    INSERT INTO order_item (order_id, product_id, quantity, unit_price)
+    SELECT o.order_id, (SELECT min(product_id) FROM product) + o.order_id % 5000, 1, 1000
+    FROM "order" o
+    """,
+    """
+    INSERT INTO cart (user_id, product_id, quantity)
+    SELECT u.user_id, (SELECT min(product_id) FROM product) + u.user_id % 5000, 1 FROM users u
+    """,
+    """
+    INSERT INTO wishlist (user_id, product_id)
+    SELECT u.user_id, (SELECT min(product_id) FROM product) + u.user_id % 5000 FROM users u
+    """,
+]
+
+_captured = []
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _capture(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and statement.lstrip().upper().startswith('SELECT'):
+        _captured.append((request.endpoint, statement, parameters))
+
+
+def seed():
+    with db.engine.begin() as conn:
+        if conn.execute(text("SELECT count(*) FROM product")).scalar() >= 5000:
+            return
+        for statement in SEED_SQL:
+            conn.execute(text(statement))
+        conn.execute(text("ANALYZE"))
+
+
+def routes(user_id, order_id, product_id):
+    return [
+        '/api/',
+        '/api/search?q=sofa',
+        '/api/search?q=sofaa',
+        '/api/search/suggest?q=pla',
+        '/api/products?category=Sofa',
+        '/api/products?cursor=',
+        f'/api/products/{product_id}',
+        '/api/products/categories',
+        '/api/cart/',
+        '/api/cart/wishlist',
+        '/api/orders/user/all',
+        f'/api/orders/{order_id}',
+        '/api/admin/dashboard',
+        f'/api/admin/users/{user_id}',
+        '/api/admin/orders?status=pending',
+        '/api/admin/orders?cursor=',
+        f'/api/admin/orders/{order_id}',
+        '/api/admin/analytics/revenue?days=30',
+    ]
+
+
+def _seq_scans(plan):
+    if plan.get('Node Type') == 'Seq Scan':
+        yield plan
+    for child in plan.get('Plans', []):
+        yield from _seq_scans(child)
+
+
+def explain(statement, parameters):
+    with db.engine.connect() as conn:
+        with conn.begin():
+            conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+            result = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters).scalar()
+    plan = result if isinstance(result, list) else json.loads(result)
+    return plan[0]['Plan']
+
+
+def main():
+    failures = []
+    warnings = []
+    with app.app_context():
+        migrations.upgrade(db.engine)
+        seed()
+        user_id, order_id, product_id = db.session.execute(text(
+            'SELECT o.user_id, o.order_id, i.product_id FROM "order" o '
+            'JOIN order_item i ON i.order_id = o.order_id ORDER BY o.order_id LIMIT 1'
+        )).one()
+        token = create_access_token(identity=str(user_id))
+
+    client = app.test_client()
+    headers = {'Authorization': f'Bearer {token}'}
+    for path in routes(user_id, order_id, product_id):
+        response = client.get(path, headers=headers)
+        if response.status_code >= 500:
+            failures.append((path, '-', f'HTTP {response.status_code}'))
+
+    with app.app_context():
+        seen = set()
+        for endpoint, statement, parameters in _captured:
+            if statement in seen:
+                continue
+            seen.add(statement)
+            for node in _seq_scans(explain(statement, parameters)):
+                table = node.get('Relation Name')
+                if table not in HOT_TABLES:
+                    continue
+                entry = (endpoint, table, ' '.join(statement.split()))
+                (failures if 'Filter' in node else warnings).append(entry)
+
+    for endpoint, table, statement in warnings:
+        print(f"NOTE  full scan   {endpoint:<32} {table:<12} {statement[:120]}")
+    for endpoint, table, statement in failures:
+        print(f"FAIL  seq scan    {endpoint:<32} {table:<12} {statement[:120]}")
+    print(f"{len(seen)} distinct statements checked, {len(failures)} failure(s)")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
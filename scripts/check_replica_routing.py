@@ -0,0 +1,147 @@
+"""
+Read-replica routing check.
+
+Runs against a primary and a streaming standby of it (two local Postgres
+instances are enough) and checks, through the Flask test client and the
+router's counters, that:
+
+  * a GET on the catalog reads from the replica
+  * after a POST (add to cart) the same client's GETs go to the primary
+    until the pin expires, and then back to the replica
+  * with replay paused on the standby and the primary moving on, the
+    replica is dropped once it is more than REPLICA_MAX_LAG behind, and
+    reads fall back to the primary; it is used again after replay resumes
+
+Exits non-zero on the first failed check.
+
+Usage (the primary is migrated and seeded; a bench user is created):
+    DATABASE_URL=postgresql://localhost:5432/sleepcraft \
+    DATABASE_REPLICA_URLS=postgresql://localhost:5433/sleepcraft \
+    python scripts/check_replica_routing.py
+"""
+import os
+import sys
+import time
+
+# Ensure project root is on path so top-level imports work when run from scripts/
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+if not os.environ.get('DATABASE_REPLICA_URLS'):
+    print("DATABASE_REPLICA_URLS is required (a streaming standby of DATABASE_URL)")
+    sys.exit(1)
+os.environ.setdefault('CATALOG_CACHE_ENABLED', 'false')
+os.environ.setdefault('REPLICA_MAX_LAG', '2')
+os.environ.setdefault('REPLICA_LAG_CHECK_INTERVAL', '0.5')
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import text
+
+from app import app
+from models import db, Product, User
+from utils.db_routing import replica_router
+from utils.token_blocklist import token_claims
+
+EMAIL = 'replica-check@example.com'
+
+
+def check(name, ok):
+    print(f"{'ok' if ok else 'FAIL':>4}  {name}")
+    if not ok:
+        print(f"      {replica_router.stats()}")
+        sys.exit(1)
+
+
+def fixture():
+    with app.app_context():
+        user = User.query.filter_by(email=EMAIL).first()
+        if not user:
+            user = User(name='Replica Check', email=EMAIL, oauth_provider='local')
+            db.session.add(user)
+            db.session.commit()
+        token = create_access_token(identity=str(user.user_id), additional_claims=token_claims(user))
+        product_id = db.session.query(Product.product_id).limit(1).scalar()
+    if product_id is None:
+        print("No products on the primary; run scripts/seed_products.py first")
+        sys.exit(1)
+    return token, product_id
+
+
+def replica_reads():
+    return sum(r.requests for r in replica_router.replicas or ())
+
+
+def routed_get(client, path, headers):
+    """'replica' or the router's reason for sending the GET to the primary."""
+    before_replica = replica_reads()
+    before = dict(replica_router.primary_requests)
+    response = client.get(path, headers=headers)
+    if response.status_code != 200:
+        return f'status {response.status_code}'
+    if replica_reads() > before_replica:
+        return 'replica'
+    for reason, count in replica_router.primary_requests.items():
+        if count > before.get(reason, 0):
+            return reason
+    return 'unknown'
+
+
+def wait_for(predicate, timeout):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.2)
+    return False
+
+
+def main():
+    token, product_id = fixture()
+    headers = {'Authorization': f'Bearer {token}'}
+    client = app.test_client()
+    print(f"max lag {replica_router.max_lag}s, pin {replica_router.pin_seconds}s")
+
+    # The lag checker starts on the first routed read; give it one round
+    client.get('/api/products/categories')
+    check('replica passes its lag check',
+          wait_for(lambda: bool(replica_router._usable()), replica_router.check_interval * 10))
+
+    check('GET /api/products reads from the replica',
+          routed_get(client, '/api/products', headers) == 'replica')
+
+    response = client.post(f'/api/cart/add/{product_id}', json={'quantity': 1}, headers=headers)
+    check('POST /api/cart/add succeeds', response.status_code in (200, 201))
+    check('GET /api/cart after the write is pinned to the primary',
+          routed_get(client, '/api/cart/', headers) == 'pinned')
+
+    time.sleep(replica_router.pin_seconds + 0.5)
+    check('GET /api/cart reads from the replica once the pin expires',
+          routed_get(client, '/api/cart/', headers) == 'replica')
+
+    # Lag: pause replay on the standby, keep writing on the primary
+    replica = replica_router.replicas[0]
+    with replica.engine.connect() as conn:
+        conn.execute(text('SELECT pg_wal_replay_pause()'))
+    try:
+        def lagging():
+            with app.app_context():
+                db.session.execute(text('SELECT txid_current()'))
+                db.session.commit()
+            return not replica_router._usable()
+        check('paused replica is dropped once it lags',
+              wait_for(lagging, replica_router.max_lag + replica_router.check_interval * 10))
+        check('GET /api/products falls back to the primary',
+              routed_get(client, '/api/products', {}) == 'no_replica')
+    finally:
+        with replica.engine.connect() as conn:
+            conn.execute(text('SELECT pg_wal_replay_resume()'))
+
+    check('replica is used again after replay resumes',
+          wait_for(lambda: bool(replica_router._usable()), replica_router.check_interval * 20))
+    check('GET /api/products reads from the replica again',
+          routed_get(client, '/api/products', {}) == 'replica')
+
+    print(replica_router.stats())
+
+
+if __name__ == '__main__':
+    main()
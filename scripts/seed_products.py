@@ -4,9 +4,11 @@ import sys
 # Ensure project root is on path so top-level imports work when run from scripts/
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from app import app
+from app import create_cli_app
 from models import db, Product
 
+app = create_cli_app()
+
 SAMPLE_PRODUCTS = [
     {
         'name': 'Classic 3-Seater Sofa',
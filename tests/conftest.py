@@ -0,0 +1,154 @@
+"""
+Test fixtures.
+
+The app relies on Postgres (tsvector search, pg_trgm, ON CONFLICT upserts,
+server-side cursors), so the suite runs against a scratch Postgres database
+whose name contains "test". Its public schema is dropped and the migrations
+re-applied once per run:
+
+    TEST_DATABASE_URL=postgresql://localhost/sleepcraft_test python -m pytest -q
+
+Without TEST_DATABASE_URL the tests that need the database (anything using
+the app fixture) are skipped; the unit tests still run. Redis is pointed at a port
+nothing listens on, so the Redis-backed caches run their database fallbacks.
+"""
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+# Ensure project root is on path so top-level imports work when run from tests/
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy.engine import make_url
+
+from config import Config
+
+TEST_DATABASE_URL = os.environ.get('TEST_DATABASE_URL')
+
+if TEST_DATABASE_URL and 'test' not in (make_url(TEST_DATABASE_URL).database or ''):
+    raise RuntimeError('TEST_DATABASE_URL must name a scratch database with "test" in its name')
+
+
+class TestConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = TEST_DATABASE_URL
+    SQLALCHEMY_ENGINE_OPTIONS = {'connect_args': {'sslmode': os.environ.get('PGSSLMODE', 'prefer')}}
+    QUERY_BUDGET_ENFORCE = True
+    RATELIMIT_ENABLED = False
+    REDIS_HOST = '127.0.0.1'
+    REDIS_PORT = 1
+    PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1000'
+    PASSWORD_HASH_WORKERS = 0
+
+
+@pytest.fixture(scope='session')
+def app():
+    if not TEST_DATABASE_URL:
+        pytest.skip('TEST_DATABASE_URL is not set')
+    from sqlalchemy import create_engine
+
+    from app import create_app
+    import migrations
+
+    # Reset before create_app: it starts background readers (the suggest index
+    # build) that would deadlock with DROP SCHEMA
+    engine = create_engine(TEST_DATABASE_URL, **TestConfig.SQLALCHEMY_ENGINE_OPTIONS)
+    with engine.begin() as conn:
+        conn.exec_driver_sql('DROP SCHEMA public CASCADE')
+        conn.exec_driver_sql('CREATE SCHEMA public')
+    migrations.upgrade(engine)
+    engine.dispose()
+
+    return create_app(TestConfig)
+
+
+@pytest.fixture(scope='session')
+def seed(app):
+    """A customer with a cart, wishlist and several multi-line orders, plus an admin.
+
+    Other customers' orders are interleaved by date, so order lists and the
+    dashboard's recent orders span several users: a per-user N+1 then runs
+    one query per user instead of hiding in the identity map.
+    """
+    from models import db, Cart, Order, OrderItem, Product, User, Wishlist
+
+    with app.app_context():
+        customer = User(name='Test Customer', email='customer@example.com', oauth_provider='local',
+                        is_verified=True)
+        admin = User(name='Test Admin', email='admin@example.com', oauth_provider='local',
+                     is_verified=True, type_of_product='admin')
+        products = [
+            Product(name=f'Test Product {i}', category=['Sofa', 'Chair', 'Table'][i % 3],
+                    mrp=1000 + i, discount=0, description='Seeded for tests')
+            for i in range(6)
+        ]
+        others = [
+            User(name=f'Other Customer {i}', email=f'other{i}@example.com', oauth_provider='local',
+                 is_verified=True)
+            for i in range(4)
+        ]
+        db.session.add_all([customer, admin, *others, *products])
+        db.session.flush()
+
+        for product in products[:3]:
+            db.session.add(Cart(user_id=customer.user_id, product_id=product.product_id, quantity=2))
+        for product in products[3:]:
+            db.session.add(Wishlist(user_id=customer.user_id, product_id=product.product_id))
+
+        orders = []
+        for i, status in enumerate(['pending', 'shipped', 'delivered', 'cancelled']):
+            order = Order(user_id=customer.user_id, status=status, payment=0, mode_of_payment='cod',
+                          date=datetime.utcnow() - timedelta(days=i))
+            for product in products[i:i + 3]:
+                order.items.append(OrderItem(product_id=product.product_id, quantity=1, unit_price=product.mrp))
+            order.payment = sum(item.unit_price for item in order.items)
+            db.session.add(order)
+            orders.append(order)
+        for i, other in enumerate(others):
+            order = Order(user_id=other.user_id, status='pending', payment=0, mode_of_payment='cod',
+                          date=datetime.utcnow() - timedelta(days=i, hours=12))
+            for product in products[i + 1:i + 3]:
+                order.items.append(OrderItem(product_id=product.product_id, quantity=1, unit_price=product.mrp))
+            order.payment = sum(item.unit_price for item in order.items)
+            db.session.add(order)
+        db.session.commit()
+
+        return {
+            'customer_id': customer.user_id,
+            'admin_id': admin.user_id,
+            'order_ids': [order.order_id for order in orders],
+            'product_ids': [product.product_id for product in products],
+        }
+
+
+def _auth_headers(app, user_id):
+    from flask_jwt_extended import create_access_token
+    from models import db, User
+    from utils.token_blocklist import token_claims
+
+    with app.app_context():
+        user = db.session.get(User, user_id)
+        token = create_access_token(identity=str(user.user_id), additional_claims=token_claims(user))
+    return {'Authorization': f'Bearer {token}'}
+
+
+@pytest.fixture()
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture()
+def auth_headers(app):
+    return lambda user_id: _auth_headers(app, user_id)
+
+
+@pytest.fixture()
+def customer_headers(app, seed):
+    return _auth_headers(app, seed['customer_id'])
+
+
+@pytest.fixture()
+def admin_headers(app, seed):
+    return _auth_headers(app, seed['admin_id'])
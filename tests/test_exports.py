@@ -0,0 +1,29 @@
+"""Admin exports require an admin token and neutralise spreadsheet formulas."""
+import pytest
+
+
+@pytest.mark.parametrize('path', ['/api/admin/users/export', '/api/admin/orders/export'])
+def test_exports_require_admin(client, customer_headers, path):
+    assert client.get(path).status_code == 401
+    assert client.get(path, headers=customer_headers).status_code == 403
+
+
+def test_csv_formula_cells_are_quoted(app, client, admin_headers):
+    from models import db, User
+
+    with app.app_context():
+        user = User(name='=HYPERLINK("http://example.com")', email='formula@example.com',
+                    oauth_provider='local')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.user_id
+    try:
+        response = client.get('/api/admin/users/export', headers=admin_headers)
+        body = response.get_data(as_text=True)
+    finally:
+        with app.app_context():
+            db.session.execute(db.text('DELETE FROM users WHERE user_id = :id'), {'id': user_id})
+            db.session.commit()
+
+    assert response.status_code == 200
+    assert '"\'=HYPERLINK(""http://example.com"")"' in body
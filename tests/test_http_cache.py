@@ -0,0 +1,21 @@
+"""Validators on cached catalog entries."""
+from email.utils import formatdate
+
+from utils.http_cache import make_entry, negotiate
+
+BODY = b'{"success": true, "data": []}\n'
+
+
+def test_etag_depends_only_on_body():
+    assert make_entry(BODY, 100)['etag'] == make_entry(BODY, 200)['etag']
+    assert make_entry(BODY, 100)['etag'] != make_entry(BODY + b' ', 100)['etag']
+
+
+def test_last_modified_rounds_up():
+    fetched = make_entry(BODY, 1000.0)
+    changed = make_entry(BODY + b' ', 1000.4)
+
+    assert changed['last_modified'] == 1001
+    since = {'If-Modified-Since': formatdate(fetched['last_modified'], usegmt=True)}
+    assert negotiate(since, changed, 'no-cache')[0] == 200
+    assert negotiate(since, fetched, 'no-cache')[0] == 304
@@ -0,0 +1,75 @@
+"""Checkout Idempotency-Key replays retries and rejects reuse for a different request."""
+import pytest
+
+BODY = {
+    'shipping_address': {'address': '1 Test Street', 'city': 'Pune', 'state': 'MH',
+                         'postal_code': '411001', 'country': 'IN'},
+    'email': 'buyer@example.com',
+    'payment_method': 'cod',
+}
+
+
+@pytest.fixture()
+def buyer(app, seed, auth_headers):
+    from models import db, Cart, User
+
+    with app.app_context():
+        user = User(name='Idempotent Buyer', email='buyer@example.com', oauth_provider='local',
+                    is_verified=True)
+        db.session.add(user)
+        db.session.flush()
+        db.session.add(Cart(user_id=user.user_id, product_id=seed['product_ids'][0], quantity=1))
+        db.session.commit()
+        user_id = user.user_id
+    yield user_id, auth_headers(user_id)
+
+    with app.app_context():
+        for table in ('cart', 'idempotency_key', 'address_book'):
+            db.session.execute(db.text(f'DELETE FROM {table} WHERE user_id = :id'), {'id': user_id})
+        db.session.execute(db.text('DELETE FROM order_item WHERE order_id IN '
+                                   '(SELECT order_id FROM "order" WHERE user_id = :id)'), {'id': user_id})
+        db.session.execute(db.text('DELETE FROM "order" WHERE user_id = :id'), {'id': user_id})
+        db.session.execute(db.text('DELETE FROM users WHERE user_id = :id'), {'id': user_id})
+        db.session.commit()
+
+
+def _add_to_cart(app, user_id, product_id, quantity=1):
+    from models import db, Cart
+
+    with app.app_context():
+        db.session.add(Cart(user_id=user_id, product_id=product_id, quantity=quantity))
+        db.session.commit()
+
+
+def test_retry_replays_original_response(client, buyer):
+    _, headers = buyer
+    headers = {**headers, 'Idempotency-Key': 'retry-1'}
+
+    first = client.post('/api/orders/create', json=BODY, headers=headers)
+    retry = client.post('/api/orders/create', json=BODY, headers=headers)
+
+    assert first.status_code == 201
+    assert retry.status_code == 201
+    assert retry.headers.get('Idempotent-Replayed') == 'true'
+    assert retry.get_json() == first.get_json()
+
+
+def test_reuse_with_different_body_is_rejected(client, buyer):
+    _, headers = buyer
+    headers = {**headers, 'Idempotency-Key': 'reuse-body'}
+
+    assert client.post('/api/orders/create', json=BODY, headers=headers).status_code == 201
+    response = client.post('/api/orders/create', json={**BODY, 'payment_method': 'card'}, headers=headers)
+
+    assert response.status_code == 422
+
+
+def test_reuse_with_different_cart_is_rejected(app, client, seed, buyer):
+    user_id, headers = buyer
+    headers = {**headers, 'Idempotency-Key': 'reuse-cart'}
+
+    assert client.post('/api/orders/create', json=BODY, headers=headers).status_code == 201
+    _add_to_cart(app, user_id, seed['product_ids'][1], quantity=2)
+    response = client.post('/api/orders/create', json=BODY, headers=headers)
+
+    assert response.status_code == 422
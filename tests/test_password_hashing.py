@@ -0,0 +1,51 @@
+"""The hashing pool answers HashingBusy on timeouts and recovers from a dead worker."""
+import os
+import threading
+import time
+
+import pytest
+
+from utils.password_hashing import HashingBusy, PasswordHasher
+
+
+def _sleep(seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+def _die():
+    os._exit(1)
+
+
+@pytest.fixture()
+def hasher():
+    hasher = PasswordHasher()
+    hasher.workers, hasher.queue_depth, hasher.timeout = 1, 0, 10
+    hasher._slots = threading.BoundedSemaphore(1)
+    hasher._run(_sleep, 0)  # start the forkserver and its worker outside the timed part
+    with hasher._slots:  # released by the job's done callback, just after the result
+        pass
+    hasher.timeout = 0.5
+    yield hasher
+    if hasher._executor is not None:
+        hasher._executor.shutdown(cancel_futures=True)
+
+
+def test_timeout_is_busy_and_keeps_slot_until_job_ends(hasher):
+    with pytest.raises(HashingBusy):
+        hasher._run(_sleep, 1.5)
+    assert hasher.timeouts == 1
+
+    with pytest.raises(HashingBusy, match='queue is full'):
+        hasher._run(_sleep, 0)  # the timed-out job still occupies the only worker
+
+    time.sleep(1.5)
+    assert hasher._run(_sleep, 0) == 0
+
+
+def test_broken_pool_is_replaced(hasher):
+    with pytest.raises(HashingBusy, match='pool failed'):
+        hasher._run(_die)
+
+    assert hasher._run(_sleep, 0) == 0
+    assert hasher.pool_restarts == 1
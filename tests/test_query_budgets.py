@@ -0,0 +1,32 @@
+"""Every @query_budget route runs against seeded data with QUERY_BUDGET_ENFORCE on."""
+import pytest
+
+from utils.query_budget import QUERY_BUDGETS
+
+# endpoint -> (path, whose token); paths are formatted with the seed fixture
+BUDGETED_REQUESTS = {
+    'routes.cart.view_cart': ('/api/cart/', 'customer'),
+    'routes.cart.view_wishlist': ('/api/cart/wishlist', 'customer'),
+    'routes.orders.get_order': ('/api/orders/{order_id}', 'customer'),
+    'routes.orders.get_user_orders': ('/api/orders/user/all', 'customer'),
+    'routes.admin.dashboard': ('/api/admin/dashboard', 'admin'),
+    'routes.admin.get_user_details': ('/api/admin/users/{customer_id}', 'admin'),
+    'routes.admin.get_orders': ('/api/admin/orders', 'admin'),
+    'routes.admin.get_order_details': ('/api/admin/orders/{order_id}', 'admin'),
+}
+
+
+def test_every_budgeted_route_is_covered(app):
+    assert set(BUDGETED_REQUESTS) == set(QUERY_BUDGETS)
+
+
+@pytest.mark.parametrize('endpoint', sorted(BUDGETED_REQUESTS))
+def test_route_within_budget(client, seed, customer_headers, admin_headers, endpoint):
+    path, who = BUDGETED_REQUESTS[endpoint]
+    headers = customer_headers if who == 'customer' else admin_headers
+    path = path.format(order_id=seed['order_ids'][0], customer_id=seed['customer_id'])
+
+    # QueryBudgetExceeded propagates out of the test client when a route overruns
+    response = client.get(path, headers=headers)
+
+    assert response.status_code == 200, response.get_json()
@@ -0,0 +1,126 @@
+"""Token epoch reads by the blocklist check must not count against a view's query budget."""
+import pytest
+
+from utils.token_blocklist import token_blocklist
+
+BUDGETED_JWT_ROUTES = [
+    '/api/cart/',
+    '/api/cart/wishlist',
+    '/api/orders/{order_id}',
+    '/api/orders/user/all',
+]
+
+
+@pytest.mark.parametrize('path', BUDGETED_JWT_ROUTES)
+def test_budgeted_route_with_cold_epoch_cache(client, seed, customer_headers, path):
+    token_blocklist.epochs.clear()
+    token_blocklist.verdicts.clear()
+    reads = token_blocklist.epoch_db_reads
+
+    response = client.get(path.format(order_id=seed['order_ids'][0]), headers=customer_headers)
+
+    assert response.status_code == 200, response.get_json()
+    assert token_blocklist.epoch_db_reads == reads + 1  # the epoch came from the users table
+
+
+def test_revoked_epoch_still_rejected(app, client, seed, customer_headers):
+    from models import db
+    from utils.token_blocklist import revoke_user_tokens
+
+    with app.app_context():
+        revoke_user_tokens(seed['customer_id'])
+    token_blocklist.epochs.clear()
+    try:
+        assert client.get('/api/cart/', headers=customer_headers).status_code == 401
+    finally:
+        with app.app_context():
+            db.session.execute(db.text('UPDATE users SET token_epoch = 0 WHERE user_id = :id'),
+                               {'id': seed['customer_id']})
+            db.session.commit()
+        token_blocklist.epochs.clear()
+
+
+class FlakyRedis:
+    """In-memory stand-in for the epoch keys; `down` lists the commands that fail."""
+
+    def __init__(self):
+        self.values, self.ttls, self.down = {}, {}, set()
+
+    def _check(self, command):
+        if command in self.down:
+            raise ConnectionError(f'{command} failed')
+
+    def get(self, key):
+        self._check('get')
+        return self.values.get(key)
+
+    def set(self, key, value, nx=False, ex=None):
+        self._check('set')
+        if nx and key in self.values:
+            return None
+        self.values[key], self.ttls[key] = str(value), ex
+        return True
+
+    def delete(self, *keys):
+        self._check('delete')
+        for key in keys:
+            self.values.pop(key, None)
+            self.ttls.pop(key, None)
+
+
+@pytest.fixture()
+def flaky_redis():
+    fake = FlakyRedis()
+    real = token_blocklist.redis
+    token_blocklist.redis = fake
+    token_blocklist.breaker.record_success()  # earlier tests ran against an unreachable Redis
+    token_blocklist.epochs.clear()
+    token_blocklist.verdicts.clear()
+    yield fake
+    token_blocklist.redis = real
+    token_blocklist.breaker.record_success()
+    token_blocklist.epochs.clear()
+    token_blocklist.verdicts.clear()
+
+
+@pytest.fixture()
+def reset_epoch(app, seed):
+    yield
+    from models import db
+    with app.app_context():
+        db.session.execute(db.text('UPDATE users SET token_epoch = 0 WHERE user_id = :id'),
+                           {'id': seed['customer_id']})
+        db.session.commit()
+
+
+def test_epoch_copy_in_redis_expires(client, seed, customer_headers, flaky_redis):
+    assert client.get('/api/cart/', headers=customer_headers).status_code == 200
+
+    key = f"token_epoch:{seed['customer_id']}"
+    assert flaky_redis.values[key] == '0'
+    assert flaky_redis.ttls[key] == token_blocklist.epoch_ttl
+
+
+def test_revoke_while_redis_write_fails(app, client, seed, customer_headers, flaky_redis, reset_epoch):
+    from utils.token_blocklist import revoke_user_tokens
+
+    assert client.get('/api/cart/', headers=customer_headers).status_code == 200  # Redis holds epoch 0
+    flaky_redis.down.add('set')
+    with app.app_context():
+        revoke_user_tokens(seed['customer_id'])
+
+    assert f"token_epoch:{seed['customer_id']}" not in flaky_redis.values
+    token_blocklist.epochs.clear()  # another worker: Redis has no copy, so the users table decides
+    assert client.get('/api/cart/', headers=customer_headers).status_code == 401
+
+
+def test_revoke_while_redis_is_down(app, client, seed, customer_headers, flaky_redis, reset_epoch):
+    from utils.token_blocklist import revoke_user_tokens
+
+    flaky_redis.down.update({'get', 'set', 'delete'})
+    with app.app_context():
+        assert revoke_user_tokens(seed['customer_id']) == 1
+
+    assert client.get('/api/cart/', headers=customer_headers).status_code == 401
+    token_blocklist.epochs.clear()
+    assert client.get('/api/cart/', headers=customer_headers).status_code == 401
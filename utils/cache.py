@@ -0,0 +1,335 @@
+"""
+Read-through caching for catalog endpoints.
+
+Two tiers:
+  * an in-process LRU with per-entry TTL and a hard size bound
+  * an optional shared Redis tier (CATALOG_CACHE_REDIS_URL) so all workers
+    benefit from a single fill
+
+Keys are built from the endpoint, the catalog version and the query args.
+The catalog version is bumped whenever a Product is written (see
+utils.catalog_events), so entries cached for an older version are simply
+never looked up again and age out of both tiers.
+
+Entries hold the body pre-compressed alongside its ETag and Last-Modified
+validators (utils.http_cache), so repeat visitors get a 304 and everyone
+else gets gzip/br bytes without per-request compression.
+"""
+import calendar
+import logging
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from urllib.parse import urlencode
+
+from flask import current_app, request
+from sqlalchemy import func
+
+from models import db, Product
+from utils import catalog_events, http_cache
+from utils.db_routing import replica_router
+
+logger = logging.getLogger('sleepcraft.cache')
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Thread-safe LRU cache with per-entry TTL and size-bounded eviction."""
+
+    def __init__(self, max_entries=1024, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        return {
+            'entries': len(self._data),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+        }
+
+
+class CatalogCache:
+    """Versioned read-through cache for catalog JSON responses."""
+
+    VERSION_KEY = 'catalog:version'
+    MODIFIED_KEY = 'catalog:modified'
+    KEY_PREFIX = 'catalog:resp:'
+
+    def __init__(self):
+        self.enabled = True
+        self.ttl = 300
+        self.local = LRUCache()
+        self.redis = None
+        self.redis_hits = 0
+        self.redis_misses = 0
+        self.redis_errors = 0
+        self.cache_control = 'public, no-cache'
+        self._version = 0
+        self.last_bump = (0, 0)
+        self._modified_at = None
+        self._version_checked_at = 0.0
+        self._version_check_interval = 1.0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.enabled = app.config.get('CATALOG_CACHE_ENABLED', True)
+        self.ttl = app.config.get('CATALOG_CACHE_TTL', 300)
+        self.local = LRUCache(
+            max_entries=app.config.get('CATALOG_CACHE_MAX_ENTRIES', 1024),
+            ttl=self.ttl
+        )
+        self._version_check_interval = app.config.get('CATALOG_CACHE_VERSION_CHECK_INTERVAL', 1.0)
+        self.cache_control = app.config.get('CATALOG_CACHE_CONTROL', 'public, no-cache')
+        redis_url = app.config.get('CATALOG_CACHE_REDIS_URL')
+        if redis_url:
+            import redis  # only needed when a shared tier is configured
+            self.redis = redis.Redis.from_url(
+                redis_url,
+                socket_timeout=0.2,
+                socket_connect_timeout=0.2
+            )
+        app.extensions['catalog_cache'] = self
+
+    # -- catalog version -------------------------------------------------
+
+    def version(self):
+        """Current catalog version, refreshed from Redis at most once per interval."""
+        if self.redis is None or not self.version_check_due():
+            return self._version
+        try:
+            self.merge_shared_version(*self.redis.mget(self.VERSION_KEY, self.MODIFIED_KEY))
+        except Exception as e:
+            self.redis_errors += 1
+            logger.warning("Error reading catalog version from Redis: %s", e)
+        return self._version
+
+    def local_version(self):
+        """The version as last seen by this worker, without asking Redis."""
+        return self._version
+
+    def version_check_due(self):
+        return time.monotonic() - self._version_checked_at >= self._version_check_interval
+
+    def merge_shared_version(self, shared, modified):
+        """Adopt the version and modification time other workers published."""
+        with self._lock:
+            self._version = max(self._version, int(shared or 0))
+            if modified is not None:
+                self._modified_at = max(self._modified_at or 0, float(modified))
+            self._version_checked_at = time.monotonic()
+
+    def bump_version(self):
+        """Invalidate every cached catalog response.
+
+        last_bump records (version before, version after). after == before + 1
+        means no other worker changed the catalog in between, which lets
+        derived in-process indexes (utils.suggest) tell their own changes
+        from everyone else's.
+        """
+        now = time.time()
+        with self._lock:
+            before = self._version
+            self._version += 1
+            self._modified_at = now
+        if self.redis is not None:
+            try:
+                pipe = self.redis.pipeline()
+                pipe.incr(self.VERSION_KEY)
+                pipe.set(self.MODIFIED_KEY, now)
+                shared = int(pipe.execute()[0])
+                with self._lock:
+                    self._version = max(self._version, shared)
+                    self._version_checked_at = time.monotonic()
+            except Exception as e:
+                self.redis_errors += 1
+                logger.warning("Error bumping catalog version in Redis: %s", e)
+        self.last_bump = (before, self._version)
+        return self._version
+
+    def last_modified(self):
+        """Epoch seconds of the last catalog change.
+
+        Product writes and deletes record the time they bump the version;
+        until the first one, fall back to the newest Product.updated_at.
+        """
+        self.version()
+        if self._modified_at is None:
+            try:
+                newest = db.session.query(func.max(Product.updated_at)).scalar()
+            except Exception as e:
+                logger.warning("Error reading catalog modification time: %s", e)
+                newest = None
+            self.seed_last_modified(newest)
+        return self._modified_at
+
+    def known_last_modified(self):
+        """last_modified() if this worker already knows it, else None."""
+        return self._modified_at
+
+    def seed_last_modified(self, newest):
+        """Initialise last_modified from the newest Product.updated_at (or now)."""
+        with self._lock:
+            if self._modified_at is None:
+                self._modified_at = calendar.timegm(newest.utctimetuple()) if newest else time.time()
+
+    # -- entries ---------------------------------------------------------
+
+    def make_key(self, endpoint, view_args, query_items, version=None):
+        """Cache key for an endpoint, its path args and its (key, value) query pairs."""
+        path_args = urlencode(sorted((view_args or {}).items()))
+        query = urlencode(sorted(query_items))
+        version = self.version() if version is None else version
+        return f"{endpoint}:{version}:{path_args}:{query}"
+
+    def get(self, key):
+        """The cached entry (see utils.http_cache.make_entry) or None."""
+        value = self.local.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        if self.redis is None:
+            return None
+        try:
+            fields = self.redis.hgetall(self.KEY_PREFIX + key)
+        except Exception as e:
+            self.redis_errors += 1
+            logger.warning("Error reading catalog cache from Redis: %s", e)
+            return None
+        return self.adopt_shared_entry(key, fields)
+
+    def adopt_shared_entry(self, key, fields):
+        """Turn a Redis HGETALL reply into an entry and keep it locally."""
+        if not fields:
+            self.redis_misses += 1
+            return None
+        self.redis_hits += 1
+        entry = {name.decode(): value for name, value in fields.items()}
+        entry['etag'] = entry['etag'].decode()
+        entry['last_modified'] = int(entry['last_modified'])
+        self.local.set(key, entry)
+        return entry
+
+    def set(self, key, entry):
+        self.local.set(key, entry)
+        if self.redis is not None:
+            try:
+                pipe = self.redis.pipeline()
+                pipe.hset(self.KEY_PREFIX + key, mapping=entry)
+                pipe.expire(self.KEY_PREFIX + key, self.ttl)
+                pipe.execute()
+            except Exception as e:
+                self.redis_errors += 1
+                logger.warning("Error writing catalog cache to Redis: %s", e)
+
+    def clear(self):
+        self.local.clear()
+        self.bump_version()
+
+    def stats(self):
+        stats = self.local.stats()
+        stats.update({
+            'enabled': self.enabled,
+            'version': self._version,
+            'ttl': self.ttl,
+            'redis': {
+                'enabled': self.redis is not None,
+                'hits': self.redis_hits,
+                'misses': self.redis_misses,
+                'errors': self.redis_errors,
+            }
+        })
+        return stats
+
+
+catalog_cache = CatalogCache()
+
+
+def cached_catalog_view(view):
+    """Serve a catalog view from the cache, filling it on a miss.
+
+    Only successful (200) JSON responses are cached; errors always fall
+    through to the view. Cached responses honour If-None-Match and
+    If-Modified-Since and are sent gzip/br encoded when the client accepts it.
+    A miss renders from the primary, so a lagging replica cannot put an older
+    catalog into the cache under the current version.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not catalog_cache.enabled:
+            return view(*args, **kwargs)
+
+        key = catalog_cache.make_key(request.endpoint, request.view_args, request.args.items(multi=True))
+        entry = catalog_cache.get(key)
+        if entry is not None:
+            response = http_cache.build_response(
+                current_app.response_class, request, entry, catalog_cache.cache_control
+            )
+            response.headers['X-Cache'] = 'HIT'
+            return response
+
+        replica_router.use_primary('cache_fill')
+        response = current_app.make_response(view(*args, **kwargs))
+        if response.status_code != 200:
+            response.headers['X-Cache'] = 'MISS'
+            return response
+
+        entry = http_cache.make_entry(response.get_data(), catalog_cache.last_modified())
+        catalog_cache.set(key, entry)
+        response = http_cache.build_response(
+            current_app.response_class, request, entry, catalog_cache.cache_control
+        )
+        response.headers['X-Cache'] = 'MISS'
+        return response
+    return wrapper
+
+
+@catalog_events.subscribe
+def _invalidate_catalog_cache(changes):
+    catalog_cache.bump_version()
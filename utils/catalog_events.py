@@ -0,0 +1,83 @@
+"""
+Catalog change notifications.
+
+Tracks Product inserts/updates/deletes on the SQLAlchemy session and, once
+the transaction commits, hands the list of changes to every registered
+subscriber (cache invalidation, search suggestions, ...).
+"""
+import logging
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from models import Product
+
+logger = logging.getLogger('sleepcraft.catalog_events')
+
+_subscribers = []
+
+_PENDING_KEY = 'catalog_changes'
+
+
+def subscribe(callback):
+    """Register callback(changes) to run after a commit that touched products.
+
+    `changes` is a list of dicts: {'action', 'product_id', 'name', 'category',
+    'previous_name', 'previous_category'} where action is one of 'insert',
+    'update' or 'delete'. The previous_* values are only set for updates that
+    changed them.
+    """
+    if callback not in _subscribers:
+        _subscribers.append(callback)
+    return callback
+
+
+def notify(changes):
+    """Run all subscribers for the given changes (also used for bulk writes)."""
+    for callback in list(_subscribers):
+        try:
+            callback(changes)
+        except Exception:
+            logger.exception("Error in catalog change subscriber %s", callback.__name__)
+
+
+def _previous(product, attr):
+    history = inspect(product).attrs[attr].history
+    return history.deleted[0] if history.deleted else None
+
+
+def _snapshot(product, action):
+    return {
+        'action': action,
+        'product_id': product.product_id,
+        'name': product.name,
+        'category': product.category,
+        'previous_name': _previous(product, 'name') if action == 'update' else None,
+        'previous_category': _previous(product, 'category') if action == 'update' else None,
+    }
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_product_changes(session, flush_context):
+    pending = session.info.setdefault(_PENDING_KEY, [])
+    for obj in session.new:
+        if isinstance(obj, Product):
+            pending.append(_snapshot(obj, 'insert'))
+    for obj in session.dirty:
+        if isinstance(obj, Product) and session.is_modified(obj, include_collections=False):
+            pending.append(_snapshot(obj, 'update'))
+    for obj in session.deleted:
+        if isinstance(obj, Product):
+            pending.append(_snapshot(obj, 'delete'))
+
+
+@event.listens_for(Session, 'after_commit')
+def _dispatch_product_changes(session):
+    changes = session.info.pop(_PENDING_KEY, None)
+    if changes:
+        notify(changes)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_product_changes(session):
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,82 @@
+"""
+Circuit breaker for calls to an optional backing service (e.g. Redis).
+
+After `failure_threshold` consecutive failures the breaker opens and
+callers skip the service entirely for `reset_timeout` seconds, so a slow
+or unreachable dependency costs nothing per request instead of a socket
+timeout each time. Once the cool-down has passed a single trial call is
+let through (half-open): success closes the breaker, failure reopens it.
+
+    breaker = CircuitBreaker('token_blocklist')
+    if breaker.allow():
+        try:
+            value = call_service()
+            breaker.record_success()
+        except Exception:
+            breaker.record_failure()
+"""
+import logging
+import threading
+import time
+
+logger = logging.getLogger('sleepcraft.circuit_breaker')
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trips = 0
+        self.short_circuits = 0
+        self._lock = threading.Lock()
+
+    def configure(self, failure_threshold=None, reset_timeout=None):
+        if failure_threshold is not None:
+            self.failure_threshold = failure_threshold
+        if reset_timeout is not None:
+            self.reset_timeout = reset_timeout
+
+    def allow(self):
+        """Whether the caller may use the service right now."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                # Let exactly one trial call through
+                self.state = HALF_OPEN
+                return True
+            self.short_circuits += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self.trips += 1
+                    logger.warning("Circuit breaker '%s' opened after %s failure(s)", self.name, self.failures)
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+    def stats(self):
+        return {
+            'state': self.state,
+            'consecutive_failures': self.failures,
+            'failure_threshold': self.failure_threshold,
+            'reset_timeout': self.reset_timeout,
+            'trips': self.trips,
+            'short_circuits': self.short_circuits,
+        }
@@ -0,0 +1,217 @@
+"""
+Connection pool configuration for the Aiven Postgres engine.
+
+init_app() turns the DB_* settings into SQLALCHEMY_ENGINE_OPTIONS and must
+run before db.init_app():
+
+  * size - DB_MAX_CONNECTIONS is this service's share of the plan's
+    connection limit, split across WEB_CONCURRENCY worker processes; each
+    process keeps at most WEB_THREADS connections (one per request thread)
+    and may overflow up to its share. DB_POOL_SIZE / DB_MAX_OVERFLOW
+    override the computed values. In ASGI mode the same share is split
+    between the sync pool, which serves the threads running Flask
+    fallbacks, and the asyncpg pool (see asgi_split).
+  * dropped connections - Aiven and the NAT in front of it close idle TLS
+    connections. Connections are recycled after DB_POOL_RECYCLE seconds,
+    kept alive with TCP keepalives, checked with a pre-ping on checkout, and
+    the pool hands out the most recently used connection first (LIFO) so the
+    spares are the ones left to expire.
+  * DB_STATEMENT_TIMEOUT_MS caps every statement, set once per connection.
+  * DB_PGBOUNCER=true for PgBouncer in transaction mode. Connection startup
+    options are not passed through, so the timeout is set with SET LOCAL at
+    the start of each transaction instead. psycopg2 never uses server-side
+    prepared statements. asyncpg does, so it is configured separately (see
+    asyncpg_connect_args).
+
+The pool is a QueuePool that also records how long checkouts wait;
+stats() is reported by /api/admin/metrics.
+"""
+import threading
+import time
+import uuid
+from collections import deque
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool
+
+WAIT_SAMPLES = 1024
+
+
+class PoolMetrics:
+    def __init__(self):
+        self.checkouts = 0
+        self.connects = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.recent_waits = deque(maxlen=WAIT_SAMPLES)
+        self._lock = threading.Lock()
+
+    def record_wait(self, seconds):
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait += seconds
+            self.max_wait = max(self.max_wait, seconds)
+            self.recent_waits.append(seconds)
+
+    def stats(self):
+        with self._lock:
+            recent = sorted(self.recent_waits)
+            checkouts = self.checkouts
+            total_wait = self.total_wait
+            max_wait = self.max_wait
+        return {
+            'checkouts': checkouts,
+            'connects': self.connects,
+            'timeouts': self.timeouts,
+            'wait_ms': {
+                'avg': round(total_wait / checkouts * 1000, 3) if checkouts else 0.0,
+                'p50': round(recent[len(recent) // 2] * 1000, 3) if recent else 0.0,
+                'p99': round(recent[int(len(recent) * 0.99) - 1] * 1000, 3) if recent else 0.0,
+                'max': round(max_wait * 1000, 3),
+            },
+        }
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records checkout wait times, new connections and timeouts."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.timeouts += 1
+            raise
+        finally:
+            self.metrics.record_wait(time.perf_counter() - started)
+
+    def _create_connection(self):
+        self.metrics.connects += 1
+        return super()._create_connection()
+
+    def recreate(self):
+        # dispose() swaps in a fresh pool; keep counting into the same metrics
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+def worker_connections(config):
+    """This worker process's share of DB_MAX_CONNECTIONS."""
+    return max(1, config['DB_MAX_CONNECTIONS'] // max(1, config['WEB_CONCURRENCY']))
+
+
+def asgi_split(config):
+    """(sync connections, async connections) for one ASGI worker process.
+
+    The sync pool gets one connection per thread handing requests to Flask
+    (ASGI_WSGI_THREADS, default WEB_THREADS), but at most half the share;
+    the asyncpg pool takes the rest.
+    """
+    per_worker = worker_connections(config)
+    threads = config.get('ASGI_WSGI_THREADS') or config['WEB_THREADS']
+    sync = max(1, min(threads, per_worker // 2))
+    return sync, max(1, per_worker - sync)
+
+
+def pool_size(config):
+    """(pool_size, max_overflow) for one worker process."""
+    if config.get('ASGI_MODE'):
+        size = config.get('DB_POOL_SIZE') or asgi_split(config)[0]
+        return size, config.get('DB_MAX_OVERFLOW') or 0
+    per_worker = worker_connections(config)
+    size = config.get('DB_POOL_SIZE') or min(config['WEB_THREADS'], per_worker)
+    overflow = config.get('DB_MAX_OVERFLOW')
+    if overflow is None:
+        overflow = max(0, per_worker - size)
+    return size, overflow
+
+
+def async_pool_size(config):
+    """(pool_size, max_overflow) for one ASGI worker's asyncpg engine."""
+    size = config.get('ASYNC_DB_POOL_SIZE') or asgi_split(config)[1]
+    return size, config.get('ASYNC_DB_MAX_OVERFLOW') or 0
+
+
+def wsgi_threads(config):
+    """Threads running Flask for an ASGI worker: one per sync connection unless set."""
+    return config.get('ASGI_WSGI_THREADS') or pool_size(config)[0]
+
+
+def init_app(app):
+    """Fill in SQLALCHEMY_ENGINE_OPTIONS from the DB_* settings (call before db.init_app)."""
+    config = app.config
+    size, overflow = pool_size(config)
+    options = dict(config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+    connect_args = dict(options.get('connect_args', {}))
+    connect_args.update({
+        'connect_timeout': config['DB_CONNECT_TIMEOUT'],
+        'keepalives': 1,
+        'keepalives_idle': 30,
+        'keepalives_interval': 10,
+        'keepalives_count': 3,
+    })
+    timeout_ms = config['DB_STATEMENT_TIMEOUT_MS']
+    if timeout_ms and not config['DB_PGBOUNCER']:
+        connect_args['options'] = f"{connect_args.get('options', '')} -c statement_timeout={timeout_ms}".strip()
+
+    options.update({
+        'poolclass': TimedQueuePool,
+        'pool_size': size,
+        'max_overflow': overflow,
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': config['DB_POOL_PRE_PING'],
+        'pool_use_lifo': True,
+        'connect_args': connect_args,
+    })
+    config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+
+def install_transaction_timeout(engine, timeout_ms):
+    """SET LOCAL statement_timeout at the start of every transaction (PgBouncer mode)."""
+    @event.listens_for(engine, 'begin')
+    def _set_statement_timeout(conn):
+        conn.exec_driver_sql(f'SET LOCAL statement_timeout = {int(timeout_ms)}')
+
+
+def init_engine(app, engine):
+    """Per-engine hooks that need the created engine (call after db.init_app)."""
+    if app.config['DB_PGBOUNCER'] and app.config['DB_STATEMENT_TIMEOUT_MS']:
+        install_transaction_timeout(engine, app.config['DB_STATEMENT_TIMEOUT_MS'])
+
+
+def asyncpg_connect_args(config):
+    """asyncpg connect_args matching the sync engine's timeout and PgBouncer settings."""
+    args = {'timeout': config['DB_CONNECT_TIMEOUT']}
+    timeout_ms = config['DB_STATEMENT_TIMEOUT_MS']
+    if config['DB_PGBOUNCER']:
+        # Transaction pooling may run each statement on a different server
+        # connection: no prepared-statement caches, and unique statement names
+        args.update({
+            'statement_cache_size': 0,
+            'prepared_statement_cache_size': 0,
+            'prepared_statement_name_func': lambda: f'__asyncpg_{uuid.uuid4()}__',
+        })
+    elif timeout_ms:
+        args['server_settings'] = {'statement_timeout': str(timeout_ms)}
+    return args
+
+
+def stats(engine):
+    pool = engine.pool
+    result = {
+        'size': pool.size(),
+        'checked_out': pool.checkedout(),
+        'checked_in': pool.checkedin(),
+        'overflow': pool.overflow(),
+        'timeout': pool.timeout(),
+    }
+    if isinstance(pool, TimedQueuePool):
+        result.update(pool.metrics.stats())
+    return result
@@ -0,0 +1,301 @@
+"""
+Read-replica routing for the Flask-SQLAlchemy session.
+
+With DATABASE_REPLICA_URLS set, RoutingSession.get_bind sends the reads of
+GET/HEAD/OPTIONS requests to a replica; everything else stays on the
+primary:
+
+  * writes - flushes, INSERT/UPDATE/DELETE, SELECT ... FOR UPDATE and bare
+    session.connection() calls (used by the summary-table rebuilds) - and
+    every later statement in the same request
+  * requests with another method, and endpoints in REPLICA_PRIMARY_ENDPOINTS
+  * reads that pass bind_arguments=PRIMARY (e.g. token revocation epochs,
+    profile cache fills) and the rest of a request after use_primary()
+    (catalog cache fills): what goes into a shared cache under the current
+    version must not be a lagging replica's older view
+  * read-your-writes: after a request commits a write, its client (user
+    and IP) is pinned to the primary for REPLICA_PIN_SECONDS - longer than
+    any lag a replica is allowed to have - so the next page shows the
+    change. Pins are shared through Redis when REPLICA_PIN_REDIS_URL is set,
+    otherwise they only hold on the worker that took the write.
+  * replica lag - a background thread measures each replica's replay lag
+    every REPLICA_LAG_CHECK_INTERVAL seconds; replicas that are behind by
+    more than REPLICA_MAX_LAG or fail the check are skipped until they
+    recover, and with none left reads fall back to the primary.
+
+A request reads from a single replica throughout.
+"""
+import logging
+import os
+import random
+import threading
+import time
+
+from flask import g, has_request_context, request
+from flask_sqlalchemy.session import Session as FlaskSession
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from utils.circuit_breaker import CircuitBreaker
+
+logger = logging.getLogger('sleepcraft.db_routing')
+
+READ_METHODS = frozenset(['GET', 'HEAD', 'OPTIONS'])
+BIND_KEY_PREFIX = 'replica_'
+PIN_KEY_PREFIX = 'replica_pin:'
+
+# bind_arguments for reads that must see the latest committed data
+PRIMARY = {'primary': True}
+
+# Seconds the replica is behind; 0 when it is streaming and has replayed
+# everything it has received (an idle primary does not make a caught-up
+# replica look stale). NULL - unusable - when no WAL receiver is streaming:
+# a standby cut off from the primary has nothing left to replay either. The
+# receiver's status is only visible to roles with pg_read_all_stats; for
+# others a running receiver process counts as streaming.
+LAG_SQL = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN NOT EXISTS (
+            SELECT 1 FROM pg_stat_wal_receiver WHERE coalesce(status, 'streaming') = 'streaming'
+        ) THEN NULL
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+_MISSING = object()
+
+
+class Replica:
+    def __init__(self, name, engine):
+        self.name = name
+        self.engine = engine
+        self.lag = None
+        self.healthy = False
+        self.checked_at = None
+        self.error = None
+        self.requests = 0
+
+    def check(self):
+        try:
+            with self.engine.connect() as conn:
+                lag = conn.execute(LAG_SQL).scalar()
+            self.lag = None if lag is None else float(lag)
+            self.healthy = lag is not None
+            self.error = None if lag is not None else 'WAL receiver not streaming'
+        except Exception as e:
+            self.healthy = False
+            self.error = str(e)
+            logger.warning("Replica %s lag check failed: %s", self.name, e)
+        self.checked_at = time.time()
+
+    def stats(self):
+        return {
+            'name': self.name,
+            'healthy': self.healthy,
+            'lag': self.lag,
+            'checked_at': self.checked_at,
+            'error': self.error,
+            'requests': self.requests,
+        }
+
+
+class ReplicaRouter:
+    def __init__(self):
+        self.bind_keys = []
+        self.replicas = None
+        self.max_lag = 5.0
+        self.check_interval = 2.0
+        self.pin_seconds = 7.0
+        self.primary_endpoints = frozenset()
+        self.pins = None
+        self.redis = None
+        self.breaker = CircuitBreaker('replica_pins')
+        self.primary_requests = {}
+        self._lock = threading.Lock()
+        self._checker_pid = None
+
+    def init_app(self, app):
+        """Register replica binds; call after db_pool.init_app and before db.init_app."""
+        config = app.config
+        urls = config.get('DATABASE_REPLICA_URLS') or []
+        options = config.get('SQLALCHEMY_ENGINE_OPTIONS', {})
+        binds = dict(config.get('SQLALCHEMY_BINDS') or {})
+        self.bind_keys = []
+        for i, url in enumerate(urls):
+            key = f'{BIND_KEY_PREFIX}{i}'
+            binds[key] = {**options, 'url': url}
+            self.bind_keys.append(key)
+        config['SQLALCHEMY_BINDS'] = binds
+
+        self.max_lag = config.get('REPLICA_MAX_LAG', 5.0)
+        self.check_interval = config.get('REPLICA_LAG_CHECK_INTERVAL', 2.0)
+        self.pin_seconds = config.get('REPLICA_PIN_SECONDS') or self.max_lag + self.check_interval
+        self.primary_endpoints = frozenset(config.get('REPLICA_PRIMARY_ENDPOINTS') or ())
+        from utils.cache import LRUCache  # utils.cache imports models, which imports this module
+        self.pins = LRUCache(max_entries=config.get('REPLICA_PIN_MAX_ENTRIES', 10000), ttl=self.pin_seconds)
+        redis_url = config.get('REPLICA_PIN_REDIS_URL')
+        if redis_url:
+            import redis
+            self.redis = redis.Redis.from_url(
+                redis_url,
+                socket_timeout=config.get('REDIS_SOCKET_TIMEOUT', 0.1),
+                socket_connect_timeout=config.get('REDIS_CONNECT_TIMEOUT', 0.1),
+                max_connections=config.get('REDIS_MAX_CONNECTIONS', 50)
+            )
+        app.extensions['replica_router'] = self
+
+    @property
+    def enabled(self):
+        return bool(self.bind_keys)
+
+    # -- lag checks ------------------------------------------------------
+
+    def _ensure_checker(self, engines):
+        """Start the lag-check thread in this process (again after a fork)."""
+        if self._checker_pid == os.getpid():
+            return
+        with self._lock:
+            if self._checker_pid == os.getpid():
+                return
+            self.replicas = [Replica(key, engines[key]) for key in self.bind_keys]
+            thread = threading.Thread(target=self._check_forever, args=(self.replicas,),
+                                      name='replica-lag-check', daemon=True)
+            thread.start()
+            self._checker_pid = os.getpid()
+
+    def _check_forever(self, replicas):
+        while True:
+            for replica in replicas:
+                replica.check()
+            time.sleep(self.check_interval)
+
+    def _usable(self):
+        return [r for r in self.replicas if r.healthy and r.lag is not None and r.lag <= self.max_lag]
+
+    # -- read-your-writes pins -------------------------------------------
+
+    def _client_keys(self):
+        """The user (or IP) the rate limiter sees, plus the IP - signup/login pin by IP."""
+        from extensions import rate_limit_key  # keeps flask-limiter out of `import models`
+        keys = {rate_limit_key(), request.remote_addr}
+        return [key for key in keys if key]
+
+    def _redis(self, action):
+        if self.redis is None or not self.breaker.allow():
+            return _MISSING
+        try:
+            result = action(self.redis)
+        except Exception as e:
+            self.breaker.record_failure()
+            logger.warning("Error talking to replica pin Redis: %s", e)
+            return _MISSING
+        self.breaker.record_success()
+        return result
+
+    def pin_client(self):
+        """Send this request's client to the primary for pin_seconds."""
+        keys = self._client_keys()
+        for key in keys:
+            self.pins.set(key, True)
+
+        def store(client):
+            pipe = client.pipeline()
+            for key in keys:
+                pipe.set(f'{PIN_KEY_PREFIX}{key}', 1, px=int(self.pin_seconds * 1000))
+            return pipe.execute()
+        self._redis(store)
+
+    def _pinned(self):
+        keys = self._client_keys()
+        if any(self.pins.get(key) for key in keys):
+            return True
+        shared = self._redis(lambda client: client.exists(*(f'{PIN_KEY_PREFIX}{key}' for key in keys)))
+        return shared not in (_MISSING, 0)
+
+    # -- routing ---------------------------------------------------------
+
+    def _count_primary(self, reason):
+        self.primary_requests[reason] = self.primary_requests.get(reason, 0) + 1
+
+    def _choose(self, engines):
+        if request.method not in READ_METHODS:
+            return None  # counted by the write itself
+        if request.endpoint in self.primary_endpoints:
+            self._count_primary('primary_endpoint')
+            return None
+        self._ensure_checker(engines)
+        if self._pinned():
+            self._count_primary('pinned')
+            return None
+        usable = self._usable()
+        if not usable:
+            self._count_primary('no_replica')
+            return None
+        replica = random.choice(usable)
+        replica.requests += 1
+        return replica.engine
+
+    def engine_for_read(self, engines):
+        """The replica engine for a read in this request, or None for the primary."""
+        if not self.enabled or not has_request_context() or g.get('db_wrote'):
+            return None
+        engine = g.get('db_replica', _MISSING)
+        if engine is _MISSING:
+            engine = g.db_replica = self._choose(engines)
+        return engine
+
+    def use_primary(self, reason):
+        """Send the rest of this request's reads to the primary (e.g. to fill a cache)."""
+        if self.enabled and has_request_context() and not g.get('db_wrote') \
+                and g.get('db_replica', _MISSING) is not None:
+            g.db_replica = None
+            self._count_primary(reason)
+
+    def note_write(self):
+        if has_request_context() and not g.get('db_wrote'):
+            g.db_wrote = True
+            if request.method in READ_METHODS:
+                self._count_primary('write_in_read_request')
+
+    def stats(self):
+        return {
+            'enabled': self.enabled,
+            'max_lag': self.max_lag,
+            'pin_seconds': self.pin_seconds,
+            'pinned_clients': len(self.pins) if self.pins is not None else 0,
+            'primary_requests': dict(self.primary_requests),
+            'replicas': [r.stats() for r in self.replicas or ()],
+        }
+
+
+replica_router = ReplicaRouter()
+
+
+def _is_write(clause):
+    return clause is not None and (
+        getattr(clause, 'is_dml', False) or getattr(clause, '_for_update_arg', None) is not None
+    )
+
+
+class RoutingSession(FlaskSession):
+    """Flask-SQLAlchemy session that sends eligible reads to a replica."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, primary=False, **kwargs):
+        if bind is None and not primary:
+            if self._flushing or (mapper is None and clause is None) or _is_write(clause):
+                replica_router.note_write()
+            else:
+                engine = replica_router.engine_for_read(self._db.engines)
+                if engine is not None:
+                    return engine
+        return super().get_bind(mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(Session, 'after_commit')
+def _pin_after_write(session):
+    if not replica_router.enabled or not has_request_context():
+        return
+    if request.method not in READ_METHODS or g.get('db_wrote'):
+        replica_router.pin_client()
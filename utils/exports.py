@@ -0,0 +1,140 @@
+"""
+Streaming CSV/NDJSON exports for the admin panel.
+
+Exports select flat rows (no ORM objects, no relationship loading) and run
+with yield_per, which on PostgreSQL uses a server-side cursor: rows arrive
+EXPORT_BATCH_SIZE at a time and each batch is encoded and handed to the
+response before the next is fetched. Memory stays flat however many rows
+match; the response is sent chunked because its length is never known.
+
+Filters mirror the list endpoints: ?status= for orders, plus ?from= and
+?to= (ISO dates or datetimes, `to` exclusive) on the order date, or on
+last_login for users.
+
+CSV cells that a spreadsheet would read as a formula (starting with =, +,
+-, @, tab or CR) are prefixed with a single quote, since names and emails
+are user-supplied. NDJSON is written as-is.
+"""
+import csv
+import io
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import func, select
+
+from models import db, Order, OrderItem, User
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+ORDER_COLUMNS = (
+    'order_id', 'date', 'status', 'user_id', 'user_name', 'user_email',
+    'item_count', 'payment', 'payment_method',
+)
+
+USER_COLUMNS = (
+    'user_id', 'name', 'email', 'mobile_number', 'oauth_provider',
+    'type_of_product', 'is_verified', 'last_login',
+)
+
+
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+class InvalidExportFilter(ValueError):
+    pass
+
+
+def _parse_datetime(name, value):
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise InvalidExportFilter(f"Invalid '{name}' date: {value}")
+
+
+def _date_range(stmt, column, args):
+    if args.get('from'):
+        stmt = stmt.where(column >= _parse_datetime('from', args['from']))
+    if args.get('to'):
+        stmt = stmt.where(column < _parse_datetime('to', args['to']))
+    return stmt
+
+
+def orders_statement(args):
+    """Orders newest first, one flat row each, filtered like /api/admin/orders."""
+    item_counts = (
+        select(OrderItem.order_id, func.sum(OrderItem.quantity).label('item_count'))
+        .group_by(OrderItem.order_id)
+        .subquery()
+    )
+    stmt = (
+        select(
+            Order.order_id, Order.date, Order.status, Order.user_id,
+            User.name.label('user_name'), User.email.label('user_email'),
+            func.coalesce(item_counts.c.item_count, 0).label('item_count'),
+            Order.payment, Order.mode_of_payment.label('payment_method'),
+        )
+        .join(User, User.user_id == Order.user_id)
+        .outerjoin(item_counts, item_counts.c.order_id == Order.order_id)
+        .order_by(Order.date.desc(), Order.order_id.desc())
+    )
+    if args.get('status'):
+        stmt = stmt.where(Order.status == args['status'])
+    return _date_range(stmt, Order.date, args)
+
+
+def users_statement(args):
+    """Users by id, one flat row each (password hashes are never selected)."""
+    stmt = select(*(getattr(User, column) for column in USER_COLUMNS)).order_by(User.user_id)
+    return _date_range(stmt, User.last_login, args)
+
+
+def _batches(stmt, batch_size):
+    result = db.session.execute(stmt, execution_options={'yield_per': batch_size})
+    try:
+        yield from result.partitions()
+    finally:
+        result.close()
+
+
+def _plain(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _csv_cell(value):
+    value = _plain(value)
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def stream_csv(stmt, columns, batch_size):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in _batches(stmt, batch_size):
+        writer.writerows([_csv_cell(value) for value in row] for row in rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def stream_ndjson(stmt, columns, batch_size):
+    dumps = current_app.json.dumps
+    for rows in _batches(stmt, batch_size):
+        yield ''.join(
+            dumps(dict(zip(columns, (_plain(value) for value in row)))) + '\n'
+            for row in rows
+        )
+
+
+def stream_export(stmt, columns, fmt):
+    """Generator of text chunks for `stmt` in the requested format."""
+    batch_size = current_app.config.get('EXPORT_BATCH_SIZE', 1000)
+    if fmt == 'csv':
+        return stream_csv(stmt, columns, batch_size)
+    return stream_ndjson(stmt, columns, batch_size)
@@ -0,0 +1,142 @@
+"""
+Local verification of Google ID tokens.
+
+id_token.verify_oauth2_token with a fresh google_requests.Request() can
+refetch Google's signing certificates over a new TLS connection on every
+login. Instead the certificates are kept in process for as long as their
+Cache-Control max-age allows and refreshed in the background shortly before
+they expire, over one pooled requests.Session. Verifying a token is then
+local CPU work only.
+
+A token signed with a key id we have not seen (Google rotated its keys)
+forces one synchronous refetch, at most once per MIN_FORCED_REFRESH
+seconds. If a refresh fails the previous certificates are kept.
+
+google-auth and requests are imported on first use, so processes that never
+verify a Google login (workers before the first one, CLI commands) do not
+load them.
+
+GOOGLE_CERTS_URL can point at a local stand-in serving the same
+{kid: PEM certificate} JSON for tests.
+"""
+import logging
+import re
+import threading
+import time
+
+logger = logging.getLogger('sleepcraft.google_certs')
+
+DEFAULT_CERTS_URL = 'https://www.googleapis.com/oauth2/v1/certs'
+GOOGLE_ISSUERS = ('accounts.google.com', 'https://accounts.google.com')
+
+DEFAULT_MAX_AGE = 3600  # when the response carries no usable Cache-Control
+REFRESH_MARGIN = 300  # refresh in the background this long before expiry
+MIN_FORCED_REFRESH = 60  # throttle for refetches triggered by unknown key ids
+
+_MAX_AGE = re.compile(r'max-age=(\d+)')
+
+
+class GoogleCertCache:
+    def __init__(self):
+        self.certs_url = DEFAULT_CERTS_URL
+        self.timeout = 5
+        self.pool_size = 10
+        self.session = None
+        self._certs = {}
+        self._expires_at = 0.0
+        self._last_fetch = 0.0
+        self._refreshing = False
+        self._lock = threading.Lock()
+        self.fetches = 0
+        self.fetch_errors = 0
+
+    def init_app(self, app):
+        self.certs_url = app.config.get('GOOGLE_CERTS_URL', DEFAULT_CERTS_URL)
+        self.timeout = app.config.get('GOOGLE_HTTP_TIMEOUT', 5)
+        self.pool_size = app.config.get('GOOGLE_HTTP_POOL_SIZE', 10)
+        self.session = None
+        app.extensions['google_certs'] = self
+
+    def _session(self):
+        if self.session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            self.session = session
+        return self.session
+
+    # -- fetching --------------------------------------------------------
+
+    def refresh(self):
+        """Fetch the certificates now; keeps the old ones if the fetch fails."""
+        self._last_fetch = time.monotonic()
+        try:
+            response = self._session().get(self.certs_url, timeout=self.timeout)
+            response.raise_for_status()
+            certs = response.json()
+        except Exception as e:
+            self.fetch_errors += 1
+            logger.warning("Error fetching Google certificates: %s", e)
+            return False
+        match = _MAX_AGE.search(response.headers.get('Cache-Control', ''))
+        max_age = int(match.group(1)) if match else DEFAULT_MAX_AGE
+        with self._lock:
+            self._certs = certs
+            self._expires_at = time.monotonic() + max_age
+        self.fetches += 1
+        return True
+
+    def _refresh_in_background(self):
+        def run():
+            try:
+                self.refresh()
+            finally:
+                self._refreshing = False
+
+        self._refreshing = True
+        threading.Thread(target=run, name='google-certs-refresh', daemon=True).start()
+
+    def certs(self, key_id=None):
+        """The current certificates, fetching synchronously only when we have none
+        (or none for `key_id`)."""
+        now = time.monotonic()
+        missing = not self._certs or (key_id is not None and key_id not in self._certs)
+        if missing:
+            with self._lock:
+                missing = not self._certs or (key_id is not None and key_id not in self._certs)
+            if missing and (not self._certs or now - self._last_fetch >= MIN_FORCED_REFRESH):
+                self.refresh()
+        elif now >= self._expires_at - REFRESH_MARGIN and not self._refreshing:
+            self._refresh_in_background()
+        return self._certs
+
+    # -- verification ----------------------------------------------------
+
+    def verify(self, token, audience):
+        """Verify a Google ID token and return its claims; raises ValueError if invalid."""
+        from google.auth import jwt as google_jwt
+        key_id = google_jwt.decode_header(token).get('kid')
+        claims = google_jwt.decode(token, certs=self.certs(key_id), audience=audience)
+        if claims.get('iss') not in GOOGLE_ISSUERS:
+            raise ValueError(f"Wrong issuer: {claims.get('iss')}")
+        return claims
+
+    def stats(self):
+        return {
+            'certs_url': self.certs_url,
+            'keys': len(self._certs),
+            'expires_in': round(self._expires_at - time.monotonic(), 1) if self._certs else None,
+            'fetches': self.fetches,
+            'fetch_errors': self.fetch_errors,
+        }
+
+
+google_certs = GoogleCertCache()
+
+
+def verify_google_id_token(token, audience):
+    """Verify a Google ID token against the cached certificates"""
+    return google_certs.verify(token, audience)
@@ -0,0 +1,129 @@
+"""
+HTTP validators and content negotiation for cached catalog responses.
+
+A cached catalog entry carries everything needed to answer a request
+without re-running the view or re-encoding the body:
+
+  * a strong ETag - a digest of the body alone, so it is identical on
+    every worker that renders the same bytes, whatever its local catalog
+    version (without the shared Redis tier versions are per-process)
+  * Last-Modified - when the catalog last changed (see
+    CatalogCache.last_modified), rounded up to the whole second HTTP dates
+    carry, so a change never looks older than a copy fetched before it
+  * the body pre-compressed with gzip and, when the optional `brotli`
+    package is installed, br
+
+Each encoding is a separate representation, so the ETag sent with it gets
+an encoding suffix. If-None-Match compares ETags weakly (RFC 9110), so a
+client holding the gzip ETag still gets a 304 when it asks for br.
+
+negotiate() only needs a case-insensitive mapping of request headers, so
+the Flask views and the async handlers in aio/ answer identically.
+"""
+import gzip
+import hashlib
+import math
+from email.utils import formatdate, parsedate_to_datetime
+
+from werkzeug.http import parse_accept_header
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+COMPRESS_MIN_BYTES = 512
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def make_entry(body, last_modified):
+    """Build a cache entry for a 200 JSON body."""
+    entry = {
+        'etag': hashlib.blake2b(body, digest_size=16).hexdigest(),
+        'last_modified': math.ceil(last_modified),
+        'identity': body,
+    }
+    if len(body) >= COMPRESS_MIN_BYTES:
+        entry['gzip'] = gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+        if brotli is not None:
+            entry['br'] = brotli.compress(body, quality=BROTLI_QUALITY)
+    return entry
+
+
+def choose_encoding(headers, entry):
+    """The best encoding both the client accepts and the entry has."""
+    offered = [coding for coding in ('br', 'gzip') if entry.get(coding)]
+    if not offered:
+        return 'identity'
+    accepted = parse_accept_header(headers.get('Accept-Encoding'))
+    return accepted.best_match(offered + ['identity'], default='identity')
+
+
+def _etag_for(entry, encoding):
+    suffix = '' if encoding == 'identity' else f'-{encoding}'
+    return f'"{entry["etag"]}{suffix}"'
+
+
+def _opaque(tag):
+    """Strip W/, quotes and our encoding suffix from an If-None-Match item."""
+    tag = tag.strip()
+    if tag.startswith('W/'):
+        tag = tag[2:]
+    tag = tag.strip('"')
+    for suffix in ('-gzip', '-br'):
+        if tag.endswith(suffix):
+            return tag[:-len(suffix)]
+    return tag
+
+
+def not_modified(headers, entry):
+    """Whether the request's validators show the client already has this entry."""
+    if_none_match = headers.get('If-None-Match')
+    if if_none_match:
+        if if_none_match.strip() == '*':
+            return True
+        return any(_opaque(tag) == entry['etag'] for tag in if_none_match.split(','))
+
+    if_modified_since = headers.get('If-Modified-Since')
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return entry['last_modified'] <= since
+    return False
+
+
+def negotiate(headers, entry, cache_control):
+    """(status, body, response headers) answering a request for a cached entry.
+
+    A 200 carries the negotiated body; a 304 has an empty one.
+    """
+    encoding = choose_encoding(headers, entry)
+    response_headers = {
+        'ETag': _etag_for(entry, encoding),
+        'Last-Modified': formatdate(entry['last_modified'], usegmt=True),
+        'Cache-Control': cache_control,
+        'Vary': 'Accept-Encoding',
+    }
+    if not_modified(headers, entry):
+        return 304, b'', response_headers
+    if encoding != 'identity':
+        response_headers['Content-Encoding'] = encoding
+    return 200, entry[encoding], response_headers
+
+
+def build_response(response_class, request, entry, cache_control):
+    """negotiate() as a Flask response."""
+    status, body, headers = negotiate(request.headers, entry, cache_control)
+    if status == 304:
+        response = response_class(status=304)
+    else:
+        response = response_class(body, status=status, mimetype='application/json')
+    for name, value in headers.items():
+        if name == 'Vary':
+            response.vary.add(value)
+        else:
+            response.headers[name] = value
+    return response
@@ -0,0 +1,104 @@
+"""
+Keyset (cursor) pagination.
+
+Opt-in alternative to Flask-SQLAlchemy's paginate() for list endpoints:
+pass ?cursor= (empty for the first page) and follow `next_cursor`. Each page
+is a single indexed range scan on the sort keys - no OFFSET and no COUNT(*),
+so page N costs the same as page 1. Totals are only computed when asked for
+(?with_total=1) and are cached briefly.
+"""
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import tuple_
+
+from utils.cache import LRUCache
+
+COUNT_CACHE_TTL = 30  # seconds
+MAX_PER_PAGE = 100
+
+_count_cache = LRUCache(max_entries=512, ttl=COUNT_CACHE_TTL)
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict) and 'dt' in value:
+        return datetime.fromisoformat(value['dt'])
+    return value
+
+
+def encode_cursor(values):
+    payload = json.dumps([_encode_value(v) for v in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, size):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(f'Invalid cursor: {e}')
+    if not isinstance(values, list) or len(values) != size:
+        raise InvalidCursor('Invalid cursor')
+    try:
+        return [_decode_value(v) for v in values]
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(f'Invalid cursor: {e}')
+
+
+def clamp_per_page(per_page, default=10):
+    """?per_page limited to 1..MAX_PER_PAGE (default when missing or not a number)."""
+    if per_page is None:
+        return default
+    return max(1, min(per_page, MAX_PER_PAGE))
+
+
+class KeysetPage:
+    def __init__(self, items, next_cursor, per_page):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.has_next = next_cursor is not None
+        self.per_page = per_page
+
+
+def keyset_paginate(query, columns, cursor=None, per_page=10, descending=False):
+    """Return one KeysetPage of `query` ordered by `columns`.
+
+    `columns` must form a unique, stable sort key (end with the primary key),
+    be NOT NULL - a row-value comparison against NULL matches nothing, which
+    would silently end the listing - and all sort in the same direction.
+    """
+    per_page = clamp_per_page(per_page)
+    if cursor:
+        values = decode_cursor(cursor, len(columns))
+        key = tuple_(*columns)
+        query = query.filter(key < tuple_(*values) if descending else key > tuple_(*values))
+
+    query = query.order_by(*(c.desc() if descending else c.asc() for c in columns))
+    rows = query.limit(per_page + 1).all()
+
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        last = rows[-1]
+        next_cursor = encode_cursor([getattr(last, c.key) for c in columns])
+    return KeysetPage(rows, next_cursor, per_page)
+
+
+def cached_count(cache_key, query):
+    """COUNT(*) for query, cached for COUNT_CACHE_TTL seconds under cache_key."""
+    total = _count_cache.get(cache_key)
+    if total is None:
+        total = query.order_by(None).count()
+        _count_cache.set(cache_key, total)
+    return total
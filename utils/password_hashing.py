@@ -0,0 +1,172 @@
+"""
+Password hashing off the request thread.
+
+A password hash is deliberately expensive (tens to hundreds of ms of CPU),
+so a burst of logins or signups hashed on request threads pins whole
+workers and starves every other request. Hashes are instead computed in a
+small process pool (PASSWORD_HASH_WORKERS per app worker; 0 hashes inline).
+At most PASSWORD_HASH_QUEUE_DEPTH jobs may wait for it: beyond that
+HashingBusy is raised at once so the caller can answer 503 instead of
+queueing unbounded work. A job that outlives PASSWORD_HASH_TIMEOUT, or a
+pool broken by a dead worker process, also raises HashingBusy; a timed-out
+job keeps its queue slot until it actually finishes, and a broken pool is
+replaced on the next call.
+
+The algorithm and work factor come from PASSWORD_HASH_METHOD (werkzeug
+method string, e.g. scrypt:32768:8:1 or pbkdf2:sha256:600000). A stored
+hash made with other parameters still verifies, and verify_password
+returns a fresh hash in the same pool job so the caller can upgrade it.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+DEFAULT_METHOD = 'scrypt:32768:8:1'
+
+
+class HashingBusy(RuntimeError):
+    """Too many password hashes already queued; retry later."""
+
+
+def normalize_method(method):
+    """Spell out werkzeug's default parameters, as they appear in stored hashes."""
+    name, *args = method.split(':')
+    if name == 'scrypt' and not args:
+        return DEFAULT_METHOD
+    if name == 'pbkdf2' and len(args) < 2:
+        hash_name = args[0] if args else 'sha256'
+        return f'pbkdf2:{hash_name}:{DEFAULT_PBKDF2_ITERATIONS}'
+    return method
+
+
+def _hash(password, method):
+    return generate_password_hash(password, method=method)
+
+
+def _verify(stored_hash, password, method):
+    """(matches, new hash if the stored one used other parameters, else None)"""
+    if not check_password_hash(stored_hash, password):
+        return False, None
+    if stored_hash.split('$', 1)[0] != method:
+        return True, generate_password_hash(password, method=method)
+    return True, None
+
+
+class PasswordHasher:
+    def __init__(self):
+        self.method = DEFAULT_METHOD
+        self.workers = 2
+        self.queue_depth = 16
+        self.timeout = 10
+        self._executor = None
+        self._pid = None
+        self._slots = threading.BoundedSemaphore(self.workers + self.queue_depth)
+        self._lock = threading.Lock()
+        self.completed = 0
+        self.rejected = 0
+        self.rehashed = 0
+        self.timeouts = 0
+        self.pool_restarts = 0
+
+    def init_app(self, app):
+        self.method = normalize_method(app.config.get('PASSWORD_HASH_METHOD', DEFAULT_METHOD))
+        self.workers = app.config.get('PASSWORD_HASH_WORKERS', 2)
+        self.queue_depth = app.config.get('PASSWORD_HASH_QUEUE_DEPTH', 16)
+        self.timeout = app.config.get('PASSWORD_HASH_TIMEOUT', 10)
+        self._slots = threading.BoundedSemaphore(self.workers + self.queue_depth)
+        app.extensions['password_hasher'] = self
+
+    def _pool(self):
+        # Created lazily, and again after a fork, so each app worker owns its pool
+        if self._executor is None or self._pid != os.getpid():
+            with self._lock:
+                if self._executor is None or self._pid != os.getpid():
+                    # Not fork: by now the process runs background and request threads,
+                    # and a forked child can inherit their locks held
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers, mp_context=multiprocessing.get_context('forkserver')
+                    )
+                    self._pid = os.getpid()
+        return self._executor
+
+    def _discard(self, executor):
+        """Drop a broken pool so the next _pool() call starts a fresh one."""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+                self.pool_restarts += 1
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _submit(self, fn, *args):
+        """(executor, future), retrying once on a fresh pool if the current one is broken."""
+        executor = self._pool()
+        try:
+            return executor, executor.submit(fn, *args)
+        except BrokenProcessPool:
+            self._discard(executor)
+            executor = self._pool()
+            return executor, executor.submit(fn, *args)
+
+    def _run(self, fn, *args):
+        if not self.workers:
+            result = fn(*args)
+            self.completed += 1
+            return result
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise HashingBusy('Password hashing queue is full')
+        try:
+            executor, future = self._submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # The slot is held until the job ends, not until we stop waiting for it
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            result = future.result(timeout=self.timeout)
+        except FutureTimeout:
+            self.timeouts += 1
+            raise HashingBusy('Password hashing timed out')
+        except BrokenProcessPool:
+            self._discard(executor)
+            raise HashingBusy('Password hashing pool failed')
+        self.completed += 1
+        return result
+
+    def hash(self, password):
+        return self._run(_hash, password, self.method)
+
+    def verify(self, stored_hash, password):
+        matches, new_hash = self._run(_verify, stored_hash, password, self.method)
+        if new_hash:
+            self.rehashed += 1
+        return matches, new_hash
+
+    def stats(self):
+        return {
+            'method': self.method.split(':', 1)[0],
+            'workers': self.workers,
+            'queue_depth': self.queue_depth,
+            'completed': self.completed,
+            'rejected': self.rejected,
+            'rehashed': self.rehashed,
+            'timeouts': self.timeouts,
+            'pool_restarts': self.pool_restarts,
+        }
+
+
+password_hasher = PasswordHasher()
+
+
+def hash_password(password):
+    """Hash a password for storage (raises HashingBusy when saturated)"""
+    return password_hasher.hash(password)
+
+
+def verify_password(stored_hash, password):
+    """Check a password; returns (matches, upgraded hash or None)"""
+    return password_hasher.verify(stored_hash, password)
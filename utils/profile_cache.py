@@ -0,0 +1,144 @@
+"""
+Per-user profile cache for /api/auth/me and /api/auth/profile.
+
+The frontend header asks for the current user's profile on nearly every
+page, so the serialised profile is cached by user_id: first in a
+short-lived in-process LRU, then (when PROFILE_CACHE_REDIS_URL is set) in
+Redis so every worker shares one fill. A hit answers without touching
+Postgres.
+
+Any committed ORM change to a User row - login updating last_login, a
+Google account relink, admin_setup.make_admin - drops that user's entry
+from the local tier and Redis. Other workers' local copies age out within
+PROFILE_CACHE_LOCAL_TTL. Writes that bypass the ORM must call
+invalidate() themselves.
+"""
+import json
+import logging
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from models import db, User
+from utils.cache import LRUCache
+from utils.circuit_breaker import CircuitBreaker
+from utils.db_routing import PRIMARY
+from utils.serializers import USER_PROFILE
+
+logger = logging.getLogger('sleepcraft.profile_cache')
+
+_PENDING_KEY = 'profile_invalidations'
+_MISSING = object()
+
+
+class ProfileCache:
+    KEY_PREFIX = 'profile:'
+
+    def __init__(self):
+        self.ttl = 300
+        self.local = LRUCache(max_entries=10000, ttl=30)
+        self.redis = None
+        self.breaker = CircuitBreaker('profile_cache')
+        self.db_loads = 0
+        self.redis_hits = 0
+        self.redis_errors = 0
+
+    def init_app(self, app):
+        self.ttl = app.config.get('PROFILE_CACHE_TTL', 300)
+        self.local = LRUCache(
+            max_entries=app.config.get('PROFILE_CACHE_MAX_ENTRIES', 10000),
+            ttl=app.config.get('PROFILE_CACHE_LOCAL_TTL', 30)
+        )
+        redis_url = app.config.get('PROFILE_CACHE_REDIS_URL')
+        if redis_url:
+            import redis
+            self.redis = redis.Redis.from_url(
+                redis_url,
+                socket_timeout=app.config.get('REDIS_SOCKET_TIMEOUT', 0.1),
+                socket_connect_timeout=app.config.get('REDIS_CONNECT_TIMEOUT', 0.1),
+                max_connections=app.config.get('REDIS_MAX_CONNECTIONS', 50)
+            )
+        app.extensions['profile_cache'] = self
+
+    def _redis(self, action):
+        if self.redis is None or not self.breaker.allow():
+            return _MISSING
+        try:
+            result = action(self.redis)
+        except Exception as e:
+            self.redis_errors += 1
+            self.breaker.record_failure()
+            logger.warning("Error talking to profile cache Redis: %s", e)
+            return _MISSING
+        self.breaker.record_success()
+        return result
+
+    def get(self, user_id):
+        """The user's profile dict, or None if there is no such user."""
+        profile = self.local.get(user_id, _MISSING)
+        if profile is not _MISSING:
+            return profile
+
+        body = self._redis(lambda client: client.get(f'{self.KEY_PREFIX}{user_id}'))
+        if body not in (_MISSING, None):
+            self.redis_hits += 1
+            profile = json.loads(body)
+            self.local.set(user_id, profile)
+            return profile
+
+        self.db_loads += 1
+        # From the primary: a replica could cache the profile as it was before a change
+        user = db.session.get(User, user_id, bind_arguments=PRIMARY)
+        if user is None:
+            return None
+        profile = USER_PROFILE(user)
+        self.local.set(user_id, profile)
+        self._redis(lambda client: client.setex(f'{self.KEY_PREFIX}{user_id}', self.ttl, json.dumps(profile)))
+        return profile
+
+    def invalidate(self, *user_ids):
+        for user_id in user_ids:
+            self.local.delete(user_id)
+        if user_ids:
+            self._redis(lambda client: client.delete(*(f'{self.KEY_PREFIX}{u}' for u in user_ids)))
+
+    def stats(self):
+        stats = self.local.stats()
+        stats.update({
+            'db_loads': self.db_loads,
+            'redis': {
+                'enabled': self.redis is not None,
+                'hits': self.redis_hits,
+                'errors': self.redis_errors,
+                'breaker': self.breaker.stats(),
+            }
+        })
+        return stats
+
+
+profile_cache = ProfileCache()
+
+
+# -- invalidation on commit --------------------------------------------------
+
+@event.listens_for(Session, 'after_flush')
+def _collect_user_changes(session, flush_context):
+    pending = session.info.setdefault(_PENDING_KEY, set())
+    for obj in session.dirty:
+        if isinstance(obj, User) and session.is_modified(obj, include_collections=False):
+            pending.add(obj.user_id)
+    for obj in session.deleted:
+        if isinstance(obj, User):
+            pending.add(obj.user_id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_changed_users(session):
+    user_ids = session.info.pop(_PENDING_KEY, None)
+    if user_ids:
+        profile_cache.invalidate(*user_ids)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_user_changes(session):
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,52 @@
+"""
+Per-route SQL query budgets.
+
+Statements executed during a request are counted by utils.sql_instrumentation.
+Routes decorated with @query_budget(n) check the number of statements they
+issued against n when they return. An overrun is an N+1 regression: with
+QUERY_BUDGET_ENFORCE on (the default when app.testing is set) it raises
+QueryBudgetExceeded so the request - and any test driving it - fails;
+otherwise it is logged.
+
+On JWT-protected views @query_budget goes below @jwt_required(), so only the
+view's own statements are counted: the blocklist check that jwt_required
+runs may read the user's token epoch from the database whenever it is not
+cached, which would otherwise push the view over budget intermittently.
+
+QUERY_BUDGETS maps endpoint function names to their budget so a test suite
+can assert every budgeted route is exercised.
+"""
+import logging
+from functools import wraps
+
+from flask import current_app
+
+from utils.sql_instrumentation import query_count
+
+logger = logging.getLogger('sleepcraft.query_budget')
+
+QUERY_BUDGETS = {}
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def query_budget(max_queries):
+    """Fail (in tests) or warn when the view runs more than max_queries statements."""
+    def decorator(view):
+        QUERY_BUDGETS[f'{view.__module__}.{view.__name__}'] = max_queries
+
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            start = query_count()
+            rv = view(*args, **kwargs)
+            used = query_count() - start
+            if used > max_queries:
+                message = f"{view.__name__} ran {used} queries (budget {max_queries})"
+                if current_app.config.get('QUERY_BUDGET_ENFORCE', current_app.testing):
+                    raise QueryBudgetExceeded(message)
+                logger.warning("Query budget exceeded: %s", message)
+            return rv
+        return wrapper
+    return decorator
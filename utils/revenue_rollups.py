@@ -0,0 +1,261 @@
+"""
+Daily revenue rollups for /api/admin/analytics/revenue.
+
+Order headers are folded into revenue_daily (day, payment mode) and order
+lines into category_revenue_daily (day, category) as they are written, so
+analytics over any window reads O(days) rollup rows instead of O(orders)
+order rows.
+Cancelled orders do not count towards revenue: cancelling subtracts the
+order from its day, un-cancelling adds it back.
+
+Each (day, key) total is spread over SHARDS rows (the `shard` column) and
+summed by the queries, so concurrent checkouts on the same day and payment
+mode only contend when they pick the same shard. rebuild() writes shard 0
+only, which also compacts the shards.
+
+Like utils.store_stats, writes that bypass the ORM must call record_orders
+and record_order_items themselves, and rebuild() recomputes everything
+(python db_commands.py rebuild-rollups).
+"""
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, func, inspect, literal, select, text
+from sqlalchemy.dialects.postgresql import insert
+
+from models import db, CategoryRevenueDaily, Order, OrderItem, Product, RevenueDaily
+
+GRANULARITIES = ('day', 'week', 'month')
+SHARDS = 16  # incremental writes use shards 1..SHARDS, rebuild() shard 0
+
+_BUCKET_FORMATS = {
+    'day': '%Y-%m-%d',
+    'week': '%Y-%m-%d',  # Monday the week starts on
+    'month': '%Y-%m',
+}
+
+_daily = RevenueDaily.__table__
+_category_daily = CategoryRevenueDaily.__table__
+
+
+def _field(order, name):
+    return order[name] if isinstance(order, dict) else getattr(order, name)
+
+
+def _order_day(value):
+    """The UTC day an order dates are stored in; None for undated orders, which rebuild() skips too."""
+    if value is None:
+        return None
+    return value.date() if isinstance(value, datetime) else value
+
+
+def _upsert(connection, table, key_columns, count_column, rows):
+    if not rows:
+        return
+    shard = random.randint(1, SHARDS)
+    statement = insert(table).values([
+        {**dict(zip(key_columns, key)), 'shard': shard, 'revenue': revenue, count_column: count}
+        for key, (revenue, count) in rows.items()
+    ])
+    connection.execute(statement.on_conflict_do_update(
+        index_elements=[table.c[k] for k in key_columns] + [table.c.shard],
+        set_={
+            'revenue': table.c.revenue + statement.excluded.revenue,
+            count_column: table.c[count_column] + statement.excluded[count_column],
+        }
+    ))
+
+
+def _add(rows, key, revenue, count):
+    old_revenue, old_count = rows.get(key, (0.0, 0))
+    rows[key] = (old_revenue + revenue, old_count + count)
+
+
+def record_orders(connection, orders, sign=1):
+    """Add (sign=1) or remove (sign=-1) non-cancelled order headers from revenue_daily.
+
+    `orders` is an iterable of objects or dicts with date, status, payment
+    and mode_of_payment.
+    """
+    by_mode = {}
+    for order in orders:
+        day = _order_day(_field(order, 'date'))
+        if _field(order, 'status') == 'cancelled' or day is None:
+            continue
+        key = (day, _field(order, 'mode_of_payment') or '')
+        _add(by_mode, key, sign * (_field(order, 'payment') or 0), sign)
+    _upsert(connection, _daily, ('day', 'payment_mode'), 'order_count', by_mode)
+
+
+def record_order_items(connection, items, sign=1):
+    """Add (sign=1) or remove (sign=-1) order lines from category_revenue_daily.
+
+    `items` is an iterable of dicts with product_id, quantity, unit_price and
+    the date and status of their order.
+    """
+    items = [i for i in items if i['status'] != 'cancelled' and i['date'] is not None]
+    if not items:
+        return
+
+    product_ids = {i['product_id'] for i in items}
+    categories = dict(connection.execute(
+        select(Product.product_id, Product.category).where(Product.product_id.in_(product_ids))
+    ).all())
+
+    by_category = {}
+    for item in items:
+        key = (_order_day(item['date']), categories.get(item['product_id']) or 'Uncategorized')
+        quantity = item['quantity'] or 0
+        _add(by_category, key, sign * quantity * (item['unit_price'] or 0), sign * quantity)
+    _upsert(connection, _category_daily, ('day', 'category'), 'units', by_category)
+
+
+def _item_row(item, order, **overrides):
+    row = {
+        'product_id': item.product_id,
+        'quantity': item.quantity,
+        'unit_price': item.unit_price,
+        'date': order.date if order is not None else None,
+        'status': order.status if order is not None else None,
+    }
+    row.update(overrides)
+    return row
+
+
+def rebuild(connection=None):
+    """Recompute both rollup tables from the order tables.
+
+    Runs on `connection` when given (the caller owns the transaction),
+    otherwise on the session, and commits.
+    """
+    conn = connection if connection is not None else db.session.connection()
+    # Block new deltas until commit, so none lands between the delete and the re-aggregation
+    conn.execute(text(f'LOCK TABLE {_daily.name}, {_category_daily.name} IN EXCLUSIVE MODE'))
+    day = func.date(Order.date)
+    live = Order.status != 'cancelled'
+
+    conn.execute(_daily.delete())
+    conn.execute(_category_daily.delete())
+    conn.execute(insert(_daily).from_select(
+        ['day', 'payment_mode', 'shard', 'revenue', 'order_count'],
+        select(day, func.coalesce(Order.mode_of_payment, ''), literal(0), func.sum(Order.payment), func.count())
+        .where(live, Order.date.isnot(None))
+        .group_by(day, func.coalesce(Order.mode_of_payment, ''))
+    ))
+    conn.execute(insert(_category_daily).from_select(
+        ['day', 'category', 'shard', 'revenue', 'units'],
+        select(day, Product.category, literal(0),
+               func.sum(OrderItem.unit_price * OrderItem.quantity), func.sum(OrderItem.quantity))
+        .select_from(OrderItem)
+        .join(Order, Order.order_id == OrderItem.order_id)
+        .join(Product, Product.product_id == OrderItem.product_id)
+        .where(live, Order.date.isnot(None))
+        .group_by(day, Product.category)
+    ))
+    if connection is None:
+        db.session.commit()
+
+
+def revenue_summary(days=30, granularity='day'):
+    """Revenue, order counts and breakdowns for the last `days` days (UTC, like the rollup days)."""
+    start = datetime.utcnow().date() - timedelta(days=days)
+    bucket = func.date_trunc(granularity, RevenueDaily.day)
+
+    buckets = db.session.query(
+        bucket,
+        func.sum(RevenueDaily.revenue),
+        func.sum(RevenueDaily.order_count),
+        func.count(func.distinct(RevenueDaily.day)),
+    ).filter(RevenueDaily.day >= start).group_by(bucket).order_by(bucket).all()
+
+    by_mode = db.session.query(
+        RevenueDaily.payment_mode, func.sum(RevenueDaily.revenue)
+    ).filter(RevenueDaily.day >= start).group_by(RevenueDaily.payment_mode).all()
+
+    by_category = db.session.query(
+        CategoryRevenueDaily.category, func.sum(CategoryRevenueDaily.revenue), func.sum(CategoryRevenueDaily.units)
+    ).filter(CategoryRevenueDaily.day >= start).group_by(CategoryRevenueDaily.category).all()
+
+    fmt = _BUCKET_FORMATS[granularity]
+    revenue_by_date = {b.strftime(fmt): float(revenue or 0) for b, revenue, _, _ in buckets}
+    orders_by_date = {b.strftime(fmt): int(count or 0) for b, _, count, _ in buckets}
+    active_days = sum(d for _, _, _, d in buckets)
+    total_revenue = sum(revenue_by_date.values())
+
+    return {
+        'granularity': granularity,
+        'revenue_by_date': revenue_by_date,
+        'orders_by_date': orders_by_date,
+        'revenue_by_payment_mode': {mode or 'unknown': float(revenue or 0) for mode, revenue in by_mode},
+        'revenue_by_category': {category: float(revenue or 0) for category, revenue, _ in by_category},
+        'units_by_category': {category: int(units or 0) for category, _, units in by_category},
+        'total_revenue': total_revenue,
+        'total_orders': sum(orders_by_date.values()),
+        'average_daily_revenue': total_revenue / active_days if active_days else 0
+    }
+
+
+# -- ORM hooks -------------------------------------------------------------
+
+_TRACKED = ('status', 'payment', 'date', 'mode_of_payment')
+
+
+@event.listens_for(Order, 'after_insert')
+def _order_inserted(mapper, connection, target):
+    record_orders(connection, [target])
+
+
+@event.listens_for(Order, 'after_delete')
+def _order_deleted(mapper, connection, target):
+    record_orders(connection, [target], sign=-1)
+
+
+@event.listens_for(Order, 'after_update')
+def _order_updated(mapper, connection, target):
+    state = inspect(target)
+    if not any(state.attrs[name].history.has_changes() for name in _TRACKED):
+        return
+
+    # Back out the order as it was, then add it as it is now
+    previous = {}
+    for name in _TRACKED:
+        history = state.attrs[name].history
+        previous[name] = history.deleted[0] if history.deleted else getattr(target, name)
+    record_orders(connection, [previous], sign=-1)
+    record_orders(connection, [target])
+
+    # Lines follow their order's day and cancellation state
+    if previous['status'] != target.status or previous['date'] != target.date:
+        lines = connection.execute(
+            select(OrderItem.product_id, OrderItem.quantity, OrderItem.unit_price)
+            .where(OrderItem.order_id == target.order_id)
+        ).all()
+        lines = [dict(line._mapping) for line in lines]
+        record_order_items(connection, [{**line, 'date': previous['date'], 'status': previous['status']}
+                                        for line in lines], sign=-1)
+        record_order_items(connection, [{**line, 'date': target.date, 'status': target.status}
+                                        for line in lines])
+
+
+@event.listens_for(OrderItem, 'after_insert')
+def _item_inserted(mapper, connection, target):
+    record_order_items(connection, [_item_row(target, target.order)])
+
+
+@event.listens_for(OrderItem, 'after_delete')
+def _item_deleted(mapper, connection, target):
+    record_order_items(connection, [_item_row(target, target.order)], sign=-1)
+
+
+@event.listens_for(OrderItem, 'after_update')
+def _item_updated(mapper, connection, target):
+    state = inspect(target)
+    tracked = ('product_id', 'quantity', 'unit_price')
+    if not any(state.attrs[name].history.has_changes() for name in tracked):
+        return
+    previous = {}
+    for name in tracked:
+        history = state.attrs[name].history
+        previous[name] = history.deleted[0] if history.deleted else getattr(target, name)
+    record_order_items(connection, [_item_row(target, target.order, **previous)], sign=-1)
+    record_order_items(connection, [_item_row(target, target.order)])
@@ -0,0 +1,55 @@
+"""
+Ranked product search.
+
+Primary path is Postgres full-text search over Product.search_vector (a
+generated, GIN-indexed tsvector weighted name > category > description).
+When that finds nothing - usually a typo - we fall back to pg_trgm
+similarity on the product name, which uses the trigram GIN index.
+"""
+from sqlalchemy import asc, desc, func, literal_column
+
+from models import Product
+
+# ts_rank_cd weights for the {D, C, B, A} labels set in PRODUCT_SEARCH_DOCUMENT
+RANK_WEIGHTS = literal_column("'{0.05, 0.2, 0.5, 1.0}'::float4[]")
+
+SEARCH_CONFIG = 'english'
+
+
+def _apply_sort(query, sort, relevance):
+    if sort == 'price_asc':
+        return query.order_by(asc(Product.mrp), Product.product_id)
+    if sort == 'price_desc':
+        return query.order_by(desc(Product.mrp), Product.product_id)
+    if sort == 'name_asc':
+        return query.order_by(asc(Product.name), Product.product_id)
+    if sort == 'name_desc':
+        return query.order_by(desc(Product.name), Product.product_id)
+    # default: most relevant first
+    return query.order_by(desc(relevance), Product.product_id)
+
+
+def fulltext_query(term, sort=''):
+    ts_query = func.websearch_to_tsquery(SEARCH_CONFIG, term)
+    relevance = func.ts_rank_cd(RANK_WEIGHTS, Product.search_vector, ts_query)
+    query = Product.query.filter(Product.search_vector.op('@@')(ts_query))
+    return _apply_sort(query, sort, relevance)
+
+
+def fuzzy_query(term, sort=''):
+    relevance = func.similarity(Product.name, term)
+    query = Product.query.filter(Product.name.op('%')(term))
+    return _apply_sort(query, sort, relevance)
+
+
+def search_products(term, sort='', page=1, per_page=12):
+    """Search the catalog.
+
+    Returns (pagination, match) where match is 'fulltext' or 'fuzzy'.
+    """
+    pagination = fulltext_query(term, sort).paginate(page=page, per_page=per_page, error_out=False)
+    if pagination.total:
+        return pagination, 'fulltext'
+
+    pagination = fuzzy_query(term, sort).paginate(page=page, per_page=per_page, error_out=False)
+    return pagination, 'fuzzy'
@@ -0,0 +1,278 @@
+"""
+Declared response shapes for models, compiled once into plain functions.
+
+Each schema maps output keys to a source on the object:
+
+    'name'                          attribute
+    'product.name'                  dotted path (None anywhere gives None)
+    Field('mrp', float, default=0)  convert non-None values, default for None
+    Field(callable)                 callable(obj), for computed values
+    Const(True)                     a fixed value
+    Many('items', ORDER_ITEM)       a list serialised with another schema
+
+compile_schema generates the source of a function that builds the whole
+dict in one expression (`{'id': obj.product_id, ...}`), so serialising a
+row costs no per-field dispatch or getattr-by-name at request time. Use
+many(schema, rows) for lists.
+"""
+from collections import namedtuple
+
+
+class Field:
+    __slots__ = ('source', 'convert', 'default')
+
+    def __init__(self, source, convert=None, default=None):
+        self.source = source
+        self.convert = convert
+        self.default = default
+
+
+Const = namedtuple('Const', 'value')
+Many = namedtuple('Many', 'source schema')
+
+
+def iso(value):
+    return value.isoformat()
+
+
+def _path(path, i):
+    """Expression reading a dotted path off `obj`, None-safe past the first hop."""
+    expression = 'obj'
+    parts = path.split('.')
+    for depth, part in enumerate(parts):
+        if depth == 0:
+            expression = f'obj.{part}'
+        else:
+            name = f'_v{i}_{depth}'
+            expression = f'({name}.{part} if ({name} := {expression}) is not None else None)'
+    return expression
+
+
+def _expression(spec, i, namespace):
+    if isinstance(spec, Const):
+        namespace[f'_k{i}'] = spec.value
+        return f'_k{i}'
+    if isinstance(spec, Many):
+        namespace[f'_s{i}'] = spec.schema
+        return f'list(map(_s{i}, {_path(spec.source, i)}))'
+    if isinstance(spec, str):
+        spec = Field(spec)
+
+    if callable(spec.source):
+        namespace[f'_f{i}'] = spec.source
+        value = f'_f{i}(obj)'
+    else:
+        value = _path(spec.source, i)
+
+    namespace[f'_d{i}'] = spec.default
+    if spec.convert is not None:
+        namespace[f'_c{i}'] = spec.convert
+        return f'(_c{i}(_r{i}) if (_r{i} := {value}) is not None else _d{i})'
+    if spec.default is not None:
+        return f'(_r{i} if (_r{i} := {value}) is not None else _d{i})'
+    return value
+
+
+def compile_schema(fields, name='serialize'):
+    """Compile {output key: source} into a function obj -> dict."""
+    namespace = {}
+    items = ', '.join(
+        f'{key!r}: {_expression(spec, i, namespace)}' for i, (key, spec) in enumerate(fields.items())
+    )
+    source = f'def {name}(obj):\n    return {{{items}}}\n'
+    exec(compile(source, f'<schema {name}>', 'exec'), namespace)
+    serialize = namespace[name]
+    serialize.fields = dict(fields)
+    serialize.source = source
+    return serialize
+
+
+def many(schema, objects):
+    return list(map(schema, objects))
+
+
+# -- products ---------------------------------------------------------------
+
+_PRODUCT_FIELDS = {
+    'id': 'product_id',
+    'name': 'name',
+    'category': 'category',
+    'mrp': 'mrp',
+    'discount': 'discount',
+    'image_url': 'image_url',
+}
+
+# Related products on the detail page
+PRODUCT_SUMMARY = compile_schema(_PRODUCT_FIELDS, 'product_summary')
+
+# Product listing and detail
+PRODUCT = compile_schema({**_PRODUCT_FIELDS, 'description': 'description'}, 'product')
+
+# Storefront cards (featured products, search results)
+PRODUCT_CARD = compile_schema({
+    'id': 'product_id',
+    'name': 'name',
+    'description': 'description',
+    'price': Field('mrp', float),
+    'category': 'category',
+    'image': 'image_url',
+    # model doesn't have in_stock; provide conservative default
+    'in_stock': Const(True),
+}, 'product_card')
+
+ADMIN_PRODUCT = compile_schema({
+    'product_id': 'product_id',
+    'name': 'name',
+    'price': Field('mrp', float, default=0),
+    'category': Field('category', default='N/A'),
+    'stock': Const('N/A'),
+}, 'admin_product')
+
+
+# -- cart and wishlist ------------------------------------------------------
+
+CART_ITEM = compile_schema({
+    'id': 'cart_id',
+    'product_id': 'product.product_id',
+    'product_name': 'product.name',
+    'product_price': Field('product.mrp', float),
+    'quantity': 'quantity',
+    'subtotal': Field(lambda item: float(item.product.mrp * item.quantity)),
+    'image': 'product.image_url',
+}, 'cart_item')
+
+WISHLIST_ITEM = compile_schema({
+    'id': 'wishlist_id',
+    'product_id': 'product.product_id',
+    'product_name': 'product.name',
+    'product_price': Field('product.mrp', float),
+    'product_category': 'product.category',
+    'image': 'product.image_url',
+}, 'wishlist_item')
+
+# Wishlist entries on the admin user page
+WISHLIST_ENTRY = compile_schema({
+    'product_id': 'product_id',
+    'product_name': Field('product.name', default='Unknown'),
+}, 'wishlist_entry')
+
+
+# -- orders -----------------------------------------------------------------
+
+ORDER_ITEM = compile_schema({
+    'product_id': 'product_id',
+    'product_name': Field('product.name', default='Unknown'),
+    'quantity': 'quantity',
+    'unit_price': Field('unit_price', float),
+    'subtotal': Field('line_total', float),
+}, 'order_item')
+
+
+def _first_product_id(order):
+    return order.items[0].product_id if order.items else None
+
+
+def _first_product_name(order):
+    first = order.items[0] if order.items else None
+    return first.product.name if first and first.product else 'Unknown'
+
+
+def _item_count(order):
+    return sum(item.quantity for item in order.items)
+
+
+# product_id/product_name of the first line, kept for older clients
+_ORDER_SUMMARY_FIELDS = {
+    'product_id': Field(_first_product_id),
+    'product_name': Field(_first_product_name),
+    'item_count': Field(_item_count),
+}
+
+_ORDER_USER_FIELDS = {
+    'user_id': 'user_id',
+    'user_name': Field('user.name', default='Unknown'),
+}
+
+# A customer's own orders
+ORDER = compile_schema({
+    'order_id': 'order_id',
+    'status': 'status',
+    **_ORDER_SUMMARY_FIELDS,
+    'items': Many('items', ORDER_ITEM),
+    'payment': 'payment',
+    'payment_method': 'mode_of_payment',
+    'date': Field('date', iso),
+}, 'order')
+
+# Admin dashboard "recent orders"
+RECENT_ORDER = compile_schema({
+    'order_id': 'order_id',
+    **_ORDER_USER_FIELDS,
+    **_ORDER_SUMMARY_FIELDS,
+    'items': Many('items', ORDER_ITEM),
+    'amount': Field('payment', float),
+    'status': 'status',
+    'date': Field('date', iso),
+}, 'recent_order')
+
+_ADMIN_ORDER_FIELDS = {
+    'order_id': 'order_id',
+    **_ORDER_USER_FIELDS,
+    'user_email': Field('user.email', default='Unknown'),
+    **_ORDER_SUMMARY_FIELDS,
+    'items': Many('items', ORDER_ITEM),
+    'amount': Field('payment', float),
+    'status': 'status',
+    'payment_method': 'mode_of_payment',
+    'date': Field('date', iso),
+}
+
+ADMIN_ORDER = compile_schema(_ADMIN_ORDER_FIELDS, 'admin_order')
+
+ADMIN_ORDER_DETAIL = compile_schema({
+    **_ADMIN_ORDER_FIELDS,
+    'user_phone': Field('user.mobile_number', default='Unknown'),
+}, 'admin_order_detail')
+
+# Orders on the admin user page
+USER_ORDER = compile_schema({
+    'order_id': 'order_id',
+    **_ORDER_SUMMARY_FIELDS,
+    'amount': Field('payment', float),
+    'status': 'status',
+    'date': Field('date', iso),
+}, 'user_order')
+
+
+# -- users ------------------------------------------------------------------
+
+# /api/auth/me and /api/auth/profile
+USER_PROFILE = compile_schema({
+    'id': 'user_id',
+    'email': 'email',
+    'name': 'name',
+    'mobile_number': 'mobile_number',
+    'profile_picture': 'profile_picture',
+    'oauth_provider': 'oauth_provider',
+    'last_login': Field('last_login', iso),
+}, 'user_profile')
+
+_ADMIN_USER_FIELDS = {
+    'user_id': 'user_id',
+    'name': 'name',
+    'email': 'email',
+    'mobile_number': 'mobile_number',
+    'oauth_provider': 'oauth_provider',
+    'is_verified': 'is_verified',
+    'last_login': Field('last_login', iso),
+}
+
+ADMIN_USER = compile_schema({
+    **_ADMIN_USER_FIELDS,
+    'created_at': 'name',  # Assuming name field, you might need to add created_at
+}, 'admin_user')
+
+ADMIN_USER_DETAIL = compile_schema({
+    **_ADMIN_USER_FIELDS,
+    'profile_picture': 'profile_picture',
+}, 'admin_user_detail')
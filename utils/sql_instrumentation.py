@@ -0,0 +1,124 @@
+"""
+Per-request SQL instrumentation.
+
+SQLAlchemy cursor events record, for every request, how many statements ran,
+total time spent in the database and the slowest few statements. With
+SERVER_TIMING_ENABLED (default: only under app.debug) the numbers are
+returned as a Server-Timing header, visible in the browser devtools network
+tab; it is opt-in because it tells any client how the database behaves. Statements slower than
+SLOW_QUERY_THRESHOLD_MS are written to the slow-query log together with
+the blueprint and endpoint that issued them.
+"""
+import heapq
+import logging
+import time
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+SLOWEST_KEPT = 3
+
+slow_query_log = logging.getLogger('sleepcraft.slow_query')
+
+_settings = {
+    'threshold_ms': 200.0,
+}
+
+
+class RequestSQLStats:
+    __slots__ = ('count', 'total_ms', 'slowest')
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.slowest = []  # min-heap of (duration_ms, statement)
+
+    def record(self, duration_ms, statement):
+        self.count += 1
+        self.total_ms += duration_ms
+        entry = (duration_ms, statement)
+        if len(self.slowest) < SLOWEST_KEPT:
+            heapq.heappush(self.slowest, entry)
+        elif duration_ms > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, entry)
+
+
+def request_stats():
+    """SQL stats for the current request (created on first use)."""
+    stats = g.get('sql_stats')
+    if stats is None:
+        stats = g.sql_stats = RequestSQLStats()
+    return stats
+
+
+def query_count():
+    """Statements executed so far in the current request."""
+    stats = g.get('sql_stats')
+    return stats.count if stats else 0
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _start_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _stop_timer(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info['query_start_time'].pop()
+    duration_ms = (time.perf_counter() - started) * 1000
+    if not has_request_context():
+        return
+
+    request_stats().record(duration_ms, statement)
+
+    if duration_ms >= _settings['threshold_ms']:
+        slow_query_log.warning(
+            "%.1fms blueprint=%s endpoint=%s %s",
+            duration_ms, request.blueprint, request.endpoint, ' '.join(statement.split())
+        )
+
+
+@event.listens_for(Engine, 'handle_error')
+def _discard_timer(context):
+    starts = context.connection.info.get('query_start_time') if context.connection is not None else None
+    if starts:
+        starts.pop()
+
+
+def _server_timing(response):
+    stats = g.get('sql_stats')
+    total_ms = (time.perf_counter() - g.request_started_at) * 1000 if 'request_started_at' in g else None
+
+    metrics = []
+    if stats:
+        metrics.append(f'db;desc="{stats.count} queries";dur={stats.total_ms:.2f}')
+        for i, (duration_ms, _) in enumerate(sorted(stats.slowest, reverse=True), 1):
+            metrics.append(f'db-slow-{i};dur={duration_ms:.2f}')
+    if total_ms is not None:
+        metrics.append(f'app;dur={total_ms:.2f}')
+    if metrics:
+        response.headers['Server-Timing'] = ', '.join(metrics)
+    return response
+
+
+def init_app(app):
+    _settings['threshold_ms'] = float(app.config.get('SLOW_QUERY_THRESHOLD_MS', 200))
+
+    log_file = app.config.get('SLOW_QUERY_LOG_FILE')
+    if not slow_query_log.handlers:
+        handler = logging.FileHandler(log_file) if log_file else logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(asctime)s SLOW QUERY %(message)s'))
+        slow_query_log.addHandler(handler)
+        slow_query_log.setLevel(logging.WARNING)
+        slow_query_log.propagate = False
+
+    @app.before_request
+    def _start_request_timer():
+        g.request_started_at = time.perf_counter()
+
+    server_timing = app.config.get('SERVER_TIMING_ENABLED')
+    if server_timing is None:
+        server_timing = app.debug
+    if server_timing:
+        app.after_request(_server_timing)
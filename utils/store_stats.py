@@ -0,0 +1,191 @@
+"""
+Incrementally maintained store statistics.
+
+The admin dashboard reads totals, revenue and per-status order counts from
+the store_stats table instead of scanning the order table. Mapper events
+below apply +/- deltas inside the same transaction as the write that caused
+them, so the summary commits or rolls back together with it.
+
+The totals are spread over SHARDS counter rows and summed at read time.
+Each delta is upserted into a randomly chosen shard, so concurrent
+checkouts and signups only wait on each other's row lock when they pick the
+same shard, instead of all serialising on one row until commit. rebuild()
+folds everything back into the base row (stats_id = STATS_ID), whose
+rebuilt_at marks the table as built.
+
+Revenue counts non-cancelled orders only, as in utils.revenue_rollups.
+
+Writes that bypass the ORM unit of work (bulk inserts, query.update) must
+call record_orders / record_status_change themselves. rebuild() recomputes
+everything from scratch (python db_commands.py rebuild-stats; migration 0005
+builds the table initially), never on a request. It locks
+store_stats against writes first, so no delta can commit between its
+snapshot of the source tables and its replacement of the shards.
+"""
+import random
+from datetime import datetime
+
+from sqlalchemy import delete, event, func, inspect, select, text
+from sqlalchemy.dialects.postgresql import insert
+
+from models import db, Order, Product, StoreStats, User
+
+STATS_ID = 1
+SHARDS = 16  # delta rows are stats_id STATS_ID + 1 .. STATS_ID + SHARDS
+
+STATUS_COLUMNS = {
+    'pending': 'pending_orders',
+    'confirmed': 'confirmed_orders',
+    'shipped': 'shipped_orders',
+    'delivered': 'delivered_orders',
+    'cancelled': 'cancelled_orders',
+}
+
+COUNTER_COLUMNS = ['total_users', 'total_products', 'total_orders', 'total_revenue'] + list(STATUS_COLUMNS.values())
+
+_table = StoreStats.__table__
+
+
+def _apply(connection, deltas):
+    """Add deltas ({column: amount}) to a random shard row."""
+    deltas = {k: v for k, v in deltas.items() if v}
+    if not deltas:
+        return
+    shard = STATS_ID + random.randint(1, SHARDS)
+    statement = insert(_table).values({'stats_id': shard, 'rebuilt_at': None, **deltas})
+    connection.execute(statement.on_conflict_do_update(
+        index_elements=[_table.c.stats_id],
+        set_={column: _table.c[column] + statement.excluded[column] for column in deltas}
+    ))
+
+
+def _merge(deltas, column, amount):
+    if column:
+        deltas[column] = deltas.get(column, 0) + amount
+
+
+def _revenue(status, payment):
+    return 0 if status == 'cancelled' else (payment or 0)
+
+
+def record_orders(connection, orders, sign=1):
+    """Account for created (sign=1) or deleted (sign=-1) orders.
+
+    `orders` is an iterable of objects or dicts with status and payment.
+    """
+    deltas = {}
+    for order in orders:
+        status = order['status'] if isinstance(order, dict) else order.status
+        payment = order['payment'] if isinstance(order, dict) else order.payment
+        _merge(deltas, 'total_orders', sign)
+        _merge(deltas, 'total_revenue', sign * _revenue(status, payment))
+        _merge(deltas, STATUS_COLUMNS.get(status), sign)
+    _apply(connection, deltas)
+
+
+def record_status_change(connection, old_status, new_status, count=1, payment=0):
+    """Account for `count` orders moving between statuses; `payment` is their combined total."""
+    if old_status == new_status:
+        return
+    deltas = {}
+    _merge(deltas, STATUS_COLUMNS.get(old_status), -count)
+    _merge(deltas, STATUS_COLUMNS.get(new_status), count)
+    _merge(deltas, 'total_revenue', _revenue(new_status, payment) - _revenue(old_status, payment))
+    _apply(connection, deltas)
+
+
+def _totals():
+    return db.session.query(
+        *(func.coalesce(func.sum(_table.c[column]), 0).label(column) for column in COUNTER_COLUMNS),
+        func.max(_table.c.rebuilt_at).label('rebuilt_at'),
+    ).one()
+
+
+def get_stats():
+    """The summed stats (a row with one attribute per column).
+
+    rebuilt_at is None if the table was never built (see rebuild()).
+    """
+    return _totals()
+
+
+def rebuild(connection=None):
+    """Recompute the stats from the source tables into the base row, dropping the shards.
+
+    Runs on `connection` when given (the caller owns the transaction),
+    otherwise on the session, and commits.
+    """
+    conn = connection if connection is not None else db.session.connection()
+    # Waits for transactions holding uncommitted deltas and blocks new ones until
+    # commit; reads of the table carry on
+    conn.execute(text(f'LOCK TABLE {_table.name} IN EXCLUSIVE MODE'))
+    aggregates = [
+        func.count(Order.order_id).label('total_orders'),
+        func.coalesce(func.sum(Order.payment).filter(Order.status != 'cancelled'), 0.0).label('total_revenue'),
+    ] + [
+        func.count(Order.order_id).filter(Order.status == status).label(column)
+        for status, column in STATUS_COLUMNS.items()
+    ]
+    row = conn.execute(select(*aggregates)).one()
+
+    values = dict(row._mapping)
+    values.update({
+        'stats_id': STATS_ID,
+        'total_users': conn.execute(select(func.count(User.user_id))).scalar(),
+        'total_products': conn.execute(select(func.count(Product.product_id))).scalar(),
+        'rebuilt_at': datetime.utcnow(),
+    })
+
+    conn.execute(delete(_table))
+    conn.execute(insert(_table).values(values))
+    if connection is None:
+        db.session.commit()
+
+
+# -- ORM hooks -------------------------------------------------------------
+
+@event.listens_for(Order, 'after_insert')
+def _order_inserted(mapper, connection, target):
+    record_orders(connection, [target])
+
+
+@event.listens_for(Order, 'after_delete')
+def _order_deleted(mapper, connection, target):
+    record_orders(connection, [target], sign=-1)
+
+
+@event.listens_for(Order, 'after_update')
+def _order_updated(mapper, connection, target):
+    state = inspect(target)
+    status = state.attrs.status.history
+    payment = state.attrs.payment.history
+    if not (status.has_changes() or payment.has_changes()):
+        return
+    old_status = status.deleted[0] if status.deleted else target.status
+    old_payment = payment.deleted[0] if payment.deleted else target.payment
+    deltas = {}
+    if old_status != target.status:
+        _merge(deltas, STATUS_COLUMNS.get(old_status), -1)
+        _merge(deltas, STATUS_COLUMNS.get(target.status), 1)
+    _merge(deltas, 'total_revenue', _revenue(target.status, target.payment) - _revenue(old_status, old_payment))
+    _apply(connection, deltas)
+
+
+@event.listens_for(User, 'after_insert')
+def _user_inserted(mapper, connection, target):
+    _apply(connection, {'total_users': 1})
+
+
+@event.listens_for(User, 'after_delete')
+def _user_deleted(mapper, connection, target):
+    _apply(connection, {'total_users': -1})
+
+
+@event.listens_for(Product, 'after_insert')
+def _product_inserted(mapper, connection, target):
+    _apply(connection, {'total_products': 1})
+
+
+@event.listens_for(Product, 'after_delete')
+def _product_deleted(mapper, connection, target):
+    _apply(connection, {'total_products': -1})
@@ -0,0 +1,325 @@
+"""
+Autocomplete suggestions for product names and categories.
+
+Product names are held in one packed, sorted store: their UTF-8 bytes
+concatenated in a single bytes buffer, in casefolded order, with parallel
+flat arrays for the buffer offsets, product ids and popularity weights. There
+is no Python object per name, so an entry costs its UTF-8 length plus 12
+bytes: about 42MB per worker for a million 30-byte names. A build briefly
+needs more, about 250MB per million names while the names are held as
+Python strings for the sort, before the packed store replaces the old one. A prefix lookup is two binary searches (each
+probe decodes and casefolds one name) plus a top-k over the matching
+slice. Short prefixes match large slices, so their top-k results are
+memoised until the index next changes.
+
+Categories are few and change weight with every product write, so they
+live in small sorted Python lists beside the packed store.
+
+The index is built in a background thread when the app starts (init_app)
+and again in any forked worker on its first lookup; until the build
+finishes, suggest() returns no suggestions rather than blocking a request
+on a full table scan.
+
+Local product writes are applied incrementally via utils.catalog_events.
+The packed store is never modified in place: removed entries are marked
+dead, and new or renamed names go into a small sorted overlay that lookups
+merge in. Once the overlay and dead entries together exceed OVERLAY_LIMIT,
+the index is rebuilt in the background.
+
+Staleness is tracked with an explicit marker, the catalog version the index
+reflects. A local write moves it forward only when the catalog version bump
+for that write directly follows it (CatalogCache.last_bump). Any other
+version, whether from another worker's write or a bump this index did not
+see, leaves the index behind, which triggers a throttled background rebuild.
+"""
+import heapq
+import logging
+import os
+import threading
+import time
+from array import array
+from bisect import bisect_left
+
+from flask import current_app
+from sqlalchemy import func
+
+from models import db, OrderItem, Product
+from utils import catalog_events
+from utils.cache import LRUCache, catalog_cache
+
+logger = logging.getLogger('sleepcraft.suggest')
+
+# Prefix slices larger than this have their top-k memoised
+SCAN_LIMIT = 256
+MAX_LIMIT = 20
+REBUILD_INTERVAL = 30  # seconds between rebuilds triggered by other workers
+OVERLAY_LIMIT = 1000  # overlay + dead entries beyond this trigger a rebuild
+
+_CATEGORY_ID = -1
+_KEY_END = '\U0010ffff'
+
+
+def _pack(names):
+    """(buffer, offsets) for names: their UTF-8 bytes back to back, and n + 1 offsets."""
+    buffer = bytearray()
+    offsets = array('I', [0])  # the buffer stays well under 4GiB
+    for name in names:
+        buffer += name.encode()
+        offsets.append(len(buffer))
+    return bytes(buffer), offsets
+
+
+class SuggestIndex:
+    def __init__(self):
+        self._names, self._offsets = b'', array('I', [0])
+        self._ids = array('i')
+        self._weights = array('f')
+        self._dead = set()
+        self._extra_keys, self._extra_labels, self._extra_ids, self._extra_weights = [], [], [], []
+        self._category_keys, self._category_labels, self._category_list_weights = [], [], []
+        self._category_weights = {}
+        self._popularity = {}
+        self._topk = LRUCache(max_entries=4096, ttl=None)
+        self._lock = threading.RLock()
+        self._built = False
+        self._building = False
+        self._build_pid = None
+        self._app = None
+        self._version = 0
+        self._last_build = 0.0
+
+    def init_app(self, app):
+        """Start building the index in the background for this process."""
+        self._app = app
+        app.extensions['suggest_index'] = self
+        self._rebuild_in_background(app)
+
+    # -- the packed store ------------------------------------------------
+
+    def _label(self, i):
+        return self._names[self._offsets[i]:self._offsets[i + 1]].decode()
+
+    def _key(self, i):
+        return self._label(i).casefold()
+
+    def _base_range(self, key):
+        n = len(self._ids)
+        lo = bisect_left(range(n), key, key=self._key)
+        hi = bisect_left(range(n), key + _KEY_END, lo, key=self._key)
+        return lo, hi
+
+    # -- building --------------------------------------------------------
+
+    def build(self):
+        """Rebuild the whole index from the database (needs an app context)."""
+        version = catalog_cache.version()
+        popularity = dict(
+            db.session.query(OrderItem.product_id, func.sum(OrderItem.quantity))
+            .group_by(OrderItem.product_id)
+            .all()
+        )
+
+        keys, names, ids = [], [], array('i')
+        category_weights = {}
+        rows = db.session.query(Product.product_id, Product.name, Product.category).yield_per(10000)
+        for product_id, name, category in rows:
+            if name:
+                keys.append(name.casefold())
+                names.append(name)
+                ids.append(product_id)
+            if category:
+                weight = float(popularity.get(product_id, 0))
+                category_weights[category] = category_weights.get(category, 0.0) + weight + 1
+
+        order = sorted(range(len(keys)), key=keys.__getitem__)  # stable: ties keep table order
+        del keys
+        packed, offsets = _pack(names[i] for i in order)
+        del names
+        ids = array('i', (ids[i] for i in order))
+        weights = array('f', (float(popularity.get(product_id, 0)) for product_id in ids))
+
+        with self._lock:
+            self._names, self._offsets, self._ids, self._weights = packed, offsets, ids, weights
+            self._dead = set()
+            self._extra_keys, self._extra_labels, self._extra_ids, self._extra_weights = [], [], [], []
+            self._category_weights = category_weights
+            self._sort_categories()
+            self._popularity = popularity
+            self._topk.clear()
+            self._built = True
+            self._version = version
+            self._last_build = time.monotonic()
+
+    def _rebuild_in_background(self, app):
+        def run():
+            try:
+                with app.app_context():
+                    self.build()
+            except Exception:
+                logger.exception("Error rebuilding suggest index")
+            finally:
+                self._building = False
+
+        self._building = True
+        self._build_pid = os.getpid()
+        threading.Thread(target=run, name='suggest-rebuild', daemon=True).start()
+
+    def _ensure_fresh(self):
+        """Kick off a background (re)build when needed; True once the index is usable."""
+        if not self._built:
+            # A build started before a fork never finishes in the child
+            if not self._building or self._build_pid != os.getpid():
+                with self._lock:
+                    if not self._built and (not self._building or self._build_pid != os.getpid()):
+                        self._rebuild_in_background(current_app._get_current_object())
+            return False
+        stale = catalog_cache.version() != self._version
+        if stale and not self._building and time.monotonic() - self._last_build > REBUILD_INTERVAL:
+            self._rebuild_in_background(current_app._get_current_object())
+        return True
+
+    # -- incremental updates ---------------------------------------------
+
+    def _add(self, name, product_id, weight):
+        key = name.casefold()
+        i = bisect_left(self._extra_keys, key)
+        self._extra_keys.insert(i, key)
+        self._extra_labels.insert(i, name)
+        self._extra_ids.insert(i, product_id)
+        self._extra_weights.insert(i, weight)
+
+    def _discard(self, name, product_id):
+        key = name.casefold()
+        i = bisect_left(self._extra_keys, key)
+        while i < len(self._extra_keys) and self._extra_keys[i] == key:
+            if self._extra_ids[i] == product_id:
+                for column in (self._extra_keys, self._extra_labels, self._extra_ids, self._extra_weights):
+                    del column[i]
+                return
+            i += 1
+        lo, hi = self._base_range(key)
+        for i in range(lo, hi):
+            if self._ids[i] == product_id and i not in self._dead and self._key(i) == key:
+                self._dead.add(i)
+                return
+
+    def _sort_categories(self):
+        entries = sorted((category.casefold(), category, weight)
+                         for category, weight in self._category_weights.items())
+        self._category_keys = [e[0] for e in entries]
+        self._category_labels = [e[1] for e in entries]
+        self._category_list_weights = [e[2] for e in entries]
+
+    def _adjust_category(self, category, delta):
+        if not category:
+            return
+        weight = self._category_weights.get(category, 0.0) + delta
+        if weight > 0:
+            self._category_weights[category] = weight
+        else:
+            self._category_weights.pop(category, None)
+
+    def apply(self, changes):
+        """Apply product changes from utils.catalog_events."""
+        with self._lock:
+            if not self._built:
+                return
+            for change in changes:
+                product_id = change['product_id']
+                weight = float(self._popularity.get(product_id, 0))
+                if change['action'] in ('update', 'delete'):
+                    old_name = change.get('previous_name') or change['name']
+                    old_category = change.get('previous_category') or change['category']
+                    if old_name:
+                        self._discard(old_name, product_id)
+                    self._adjust_category(old_category, -(weight + 1))
+                if change['action'] in ('insert', 'update'):
+                    if change['name']:
+                        self._add(change['name'], product_id, weight)
+                    self._adjust_category(change['category'], weight + 1)
+            self._sort_categories()
+            self._topk.clear()
+
+            # The catalog cache bumped the version for this commit before us
+            before, after = catalog_cache.last_bump
+            if before == self._version and after == before + 1:
+                self._version = after
+            if len(self._extra_keys) + len(self._dead) > OVERLAY_LIMIT \
+                    and not self._building and self._app is not None:
+                self._rebuild_in_background(self._app)
+
+    # -- lookups ---------------------------------------------------------
+
+    def _candidates(self, key, k):
+        """(weight, label, entry_id) for at least the k heaviest live entries under key."""
+        lo, hi = self._base_range(key)
+        if hi - lo <= SCAN_LIMIT:
+            indexes = range(lo, hi)
+        else:
+            indexes = heapq.nlargest(k * 2 + len(self._dead), range(lo, hi), key=self._weights.__getitem__)
+        found = [(self._weights[i], self._label(i), self._ids[i]) for i in indexes if i not in self._dead]
+
+        for keys, labels, ids, weights in (
+            (self._extra_keys, self._extra_labels, self._extra_ids, self._extra_weights),
+            (self._category_keys, self._category_labels, None, self._category_list_weights),
+        ):
+            start = bisect_left(keys, key)
+            end = bisect_left(keys, key + _KEY_END, start)
+            for i in range(start, end):
+                found.append((weights[i], labels[i], ids[i] if ids is not None else _CATEGORY_ID))
+        return found, hi - lo
+
+    def _top(self, candidates, k):
+        results = []
+        seen = set()
+        for weight, label, entry_id in sorted(candidates, key=lambda c: c[0], reverse=True):
+            if (label, entry_id < 0) in seen:
+                continue
+            seen.add((label, entry_id < 0))
+            results.append({
+                'text': label,
+                'type': 'category' if entry_id == _CATEGORY_ID else 'product',
+                'product_id': entry_id if entry_id != _CATEGORY_ID else None,
+            })
+            if len(results) == k:
+                break
+        return results
+
+    def suggest(self, prefix, limit=8):
+        key = prefix.strip().casefold()
+        limit = max(1, min(limit, MAX_LIMIT))
+        if not key or not self._ensure_fresh():
+            return []
+        with self._lock:
+            cached = self._topk.get(key)
+            if cached is not None:
+                return cached[:limit]
+            candidates, span = self._candidates(key, MAX_LIMIT)
+            if span <= SCAN_LIMIT:
+                return self._top(candidates, limit)
+            cached = self._top(candidates, MAX_LIMIT)
+            self._topk.set(key, cached)
+            return cached[:limit]
+
+    def stats(self):
+        return {
+            'built': self._built,
+            'building': self._building,
+            'entries': len(self._ids) - len(self._dead) + len(self._extra_keys),
+            'overlay': len(self._extra_keys),
+            'dead': len(self._dead),
+            'categories': len(self._category_weights),
+            'packed_bytes': len(self._names) + sum(
+                a.itemsize * len(a) for a in (self._offsets, self._ids, self._weights)
+            ),
+            'version': self._version,
+            'memoised_prefixes': self._topk.stats(),
+        }
+
+
+suggest_index = SuggestIndex()
+
+
+@catalog_events.subscribe
+def _apply_catalog_changes(changes):
+    suggest_index.apply(changes)
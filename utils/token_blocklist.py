@@ -1,34 +1,278 @@
-import redis
+"""
+Revoked-token blocklist backed by Redis.
+
+is_token_blocked runs on every JWT-protected request (via the
+token_in_blocklist_loader in app.py), so it must not cost a Redis round
+trip each time nor stall when Redis does:
+
+  * verdicts are cached in-process per jti - a blocked token stays blocked
+    until it expires, so that verdict is kept for the token's remaining
+    lifetime (at most the access token lifetime); an allowed verdict is
+    only kept for TOKEN_BLOCKLIST_CACHE_TTL seconds so revocations made by
+    other workers are seen quickly
+  * the Redis client has a bounded connection pool and short socket
+    timeouts (REDIS_MAX_CONNECTIONS, REDIS_SOCKET_TIMEOUT)
+  * a circuit breaker stops calling Redis for a cool-down after repeated
+    failures; while it is open tokens are allowed, as before, unless a
+    cached verdict says otherwise
+
+Per-jti entries revoke one token (logout). To revoke every session of a
+user at once, tokens carry the user's token epoch as the `tep` claim
+(token_claims) and revoke_user_tokens bumps users.token_epoch: one write,
+after which any token issued under an older epoch is rejected. The current
+epoch per user is cached for TOKEN_EPOCH_CACHE_TTL seconds and read from
+Redis, falling back to the users table when Redis has no copy or is down,
+so the per-request check is usually an in-memory integer comparison.
+
+The users table is authoritative: the Redis copy of an epoch expires after
+TOKEN_EPOCH_CACHE_TTL + EPOCH_TTL_MARGIN seconds, and when revoke_user
+cannot write the new epoch it deletes the key instead, so a failed write
+never leaves other workers trusting the old epoch for longer than that.
+"""
+import logging
+import time
 from datetime import datetime, timezone
-from config import Config
 
-# Initialize Redis client
-redis_client = redis.Redis(
-    host=Config.REDIS_HOST if hasattr(Config, 'REDIS_HOST') else 'localhost',
-    port=Config.REDIS_PORT if hasattr(Config, 'REDIS_PORT') else 6379,
-    db=0,
-    decode_responses=True
-)
+from sqlalchemy import select, update
 
-def add_to_blocklist(jti, exp_timestamp):
-    """Add a token to the blocklist with expiration"""
+from models import db, User
+from utils.cache import LRUCache
+from utils.circuit_breaker import CircuitBreaker
+from utils.db_routing import PRIMARY
+
+logger = logging.getLogger('sleepcraft.token_blocklist')
+
+KEY_PREFIX = 'token_blocklist:'
+EPOCH_KEY_PREFIX = 'token_epoch:'
+EPOCH_CLAIM = 'tep'
+EPOCH_TTL_MARGIN = 5  # seconds the Redis copy of an epoch outlives the local one
+
+_DEFAULT_REDIS = {
+    'host': 'localhost',
+    'port': 6379,
+    'db': 0,
+    'max_connections': 50,
+    'socket_timeout': 0.1,
+    'socket_connect_timeout': 0.1,
+}
+
+_MISSING = object()
+
+
+def _subject(jwt_payload):
     try:
-        # Calculate TTL (time until token expiration)
+        return int(jwt_payload['sub'])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class TokenBlocklist:
+    def __init__(self):
+        self.redis = None
+        self.allowed_ttl = 5
+        self.max_blocked_ttl = 3600
+        self.verdicts = LRUCache(max_entries=10000, ttl=self.allowed_ttl)
+        self.epochs = LRUCache(max_entries=10000, ttl=5)
+        self.epoch_ttl = 5 + EPOCH_TTL_MARGIN
+        self.epoch_db_reads = 0
+        self.breaker = CircuitBreaker('token_blocklist')
+        self.redis_calls = 0
+        self.redis_errors = 0
+        self._config = dict(_DEFAULT_REDIS)
+
+    def init_app(self, app):
+        config = app.config
+        self._config = {
+            'host': config.get('REDIS_HOST', _DEFAULT_REDIS['host']),
+            'port': config.get('REDIS_PORT', _DEFAULT_REDIS['port']),
+            'db': config.get('REDIS_DB', _DEFAULT_REDIS['db']),
+            'max_connections': config.get('REDIS_MAX_CONNECTIONS', _DEFAULT_REDIS['max_connections']),
+            'socket_timeout': config.get('REDIS_SOCKET_TIMEOUT', _DEFAULT_REDIS['socket_timeout']),
+            'socket_connect_timeout': config.get('REDIS_CONNECT_TIMEOUT', _DEFAULT_REDIS['socket_connect_timeout']),
+        }
+        self.redis = None
+        self.allowed_ttl = config.get('TOKEN_BLOCKLIST_CACHE_TTL', 5)
+        access_expires = config.get('JWT_ACCESS_TOKEN_EXPIRES')
+        if access_expires:
+            self.max_blocked_ttl = int(access_expires.total_seconds())
+        self.verdicts = LRUCache(
+            max_entries=config.get('TOKEN_BLOCKLIST_CACHE_MAX_ENTRIES', 10000),
+            ttl=self.allowed_ttl
+        )
+        self.epochs = LRUCache(
+            max_entries=config.get('TOKEN_BLOCKLIST_CACHE_MAX_ENTRIES', 10000),
+            ttl=config.get('TOKEN_EPOCH_CACHE_TTL', 5)
+        )
+        self.epoch_ttl = int(config.get('TOKEN_EPOCH_CACHE_TTL', 5)) + EPOCH_TTL_MARGIN
+        self.breaker.configure(
+            failure_threshold=config.get('TOKEN_BLOCKLIST_BREAKER_THRESHOLD', 5),
+            reset_timeout=config.get('TOKEN_BLOCKLIST_BREAKER_RESET', 30)
+        )
+        app.extensions['token_blocklist'] = self
+
+    def _client(self):
+        if self.redis is None:
+            import redis
+            # Blocking pool: when all connections are busy, wait at most one
+            # socket timeout for a free one rather than opening more
+            pool = redis.BlockingConnectionPool(
+                timeout=self._config['socket_timeout'], decode_responses=True, **self._config
+            )
+            self.redis = redis.Redis(connection_pool=pool)
+        return self.redis
+
+    def _blocked_ttl(self, exp_timestamp):
+        if exp_timestamp is None:
+            return self.max_blocked_ttl
+        remaining = int(exp_timestamp - time.time())
+        return max(1, min(remaining, self.max_blocked_ttl))
+
+    def _call(self, action):
+        """Run action(client) through the breaker; returns _MISSING if skipped or failed."""
+        if not self.breaker.allow():
+            return _MISSING
+        self.redis_calls += 1
+        try:
+            result = action(self._client())
+        except Exception as e:
+            self.redis_errors += 1
+            self.breaker.record_failure()
+            logger.warning("Error talking to token blocklist Redis: %s", e)
+            return _MISSING
+        self.breaker.record_success()
+        return result
+
+    def add(self, jti, exp_timestamp):
+        """Add a token to the blocklist until it expires."""
         exp_datetime = datetime.fromtimestamp(exp_timestamp, timezone.utc)
-        now = datetime.now(timezone.utc)
-        ttl = int((exp_datetime - now).total_seconds())
-        
-        if ttl > 0:
-            redis_client.setex(f'token_blocklist:{jti}', ttl, 'true')
+        ttl = int((exp_datetime - datetime.now(timezone.utc)).total_seconds())
+        if ttl <= 0:
+            return False
+        # This worker sees the revocation immediately, even if Redis is down
+        self.verdicts.set(jti, True, ttl=self._blocked_ttl(exp_timestamp))
+        stored = self._call(lambda client: client.setex(f'{KEY_PREFIX}{jti}', ttl, 'true'))
+        return stored is not _MISSING
+
+    def is_blocked(self, jti, exp_timestamp=None):
+        verdict = self.verdicts.get(jti, _MISSING)
+        if verdict is not _MISSING:
+            return verdict
+        exists = self._call(lambda client: client.exists(f'{KEY_PREFIX}{jti}'))
+        if exists is _MISSING:
+            return False  # If Redis unavailable, allow tokens (development mode)
+        blocked = bool(exists)
+        ttl = self._blocked_ttl(exp_timestamp) if blocked else self.allowed_ttl
+        self.verdicts.set(jti, blocked, ttl=ttl)
+        return blocked
+
+    # -- per-user epochs -------------------------------------------------
+
+    def current_epoch(self, user_id):
+        """The user's token epoch: local cache, then Redis, then the users table."""
+        epoch = self.epochs.get(user_id, _MISSING)
+        if epoch is not _MISSING:
+            return epoch
+        cached = self._call(lambda client: client.get(f'{EPOCH_KEY_PREFIX}{user_id}'))
+        if cached not in (_MISSING, None):
+            epoch = int(cached)
+        else:
+            self.epoch_db_reads += 1
+            # From the primary: a replica could still have the pre-revocation epoch
+            epoch = db.session.execute(
+                select(User.token_epoch).where(User.user_id == user_id),
+                bind_arguments=PRIMARY
+            ).scalar() or 0
+            if cached is None:
+                # NX: never overwrite a newer epoch written by revoke_user meanwhile
+                self._call(lambda client: client.set(f'{EPOCH_KEY_PREFIX}{user_id}', epoch,
+                                                     nx=True, ex=self.epoch_ttl))
+        self.epochs.set(user_id, epoch)
+        return epoch
+
+    def revoke_user(self, user_id):
+        """Invalidate every token issued to user_id so far; returns the new epoch.
+
+        Commits the session. Other workers notice within TOKEN_EPOCH_CACHE_TTL
+        once Redis has the new epoch. If it cannot be written, the old copy is
+        deleted so they fall back to the users table; if Redis cannot be
+        reached at all, the old copy expires within epoch_ttl.
+        """
+        epoch = db.session.execute(
+            update(User)
+            .where(User.user_id == user_id)
+            .values(token_epoch=User.token_epoch + 1)
+            .returning(User.token_epoch)
+        ).scalar()
+        db.session.commit()
+        if epoch is None:
+            return None
+        self.epochs.set(user_id, epoch)
+        key = f'{EPOCH_KEY_PREFIX}{user_id}'
+        if self._call(lambda client: client.set(key, epoch, ex=self.epoch_ttl)) is _MISSING:
+            # Bypass the breaker: this one call decides how long the old epoch is trusted
+            try:
+                self._client().delete(key)
+            except Exception as e:
+                self.redis_errors += 1
+                logger.error("Could not clear token epoch for user %s; other workers may accept "
+                             "their old tokens for up to %ss: %s", user_id, self.epoch_ttl, e)
+        return epoch
+
+    def is_revoked(self, jwt_payload):
+        """Whether a decoded token is revoked, by user epoch or by jti."""
+        user_id = _subject(jwt_payload)
+        if user_id is not None and jwt_payload.get(EPOCH_CLAIM, 0) < self.current_epoch(user_id):
             return True
-    except Exception as e:
-        print(f"Error adding token to blocklist: {e}")
-    return False
+        return self.is_blocked(jwt_payload['jti'], jwt_payload.get('exp'))
+
+    def cached_verdict(self, jwt_payload):
+        """is_revoked() from the in-process caches alone, or None if that needs Redis/the DB."""
+        user_id = _subject(jwt_payload)
+        if user_id is not None:
+            epoch = self.epochs.get(user_id, _MISSING)
+            if epoch is _MISSING:
+                return None
+            if jwt_payload.get(EPOCH_CLAIM, 0) < epoch:
+                return True
+        verdict = self.verdicts.get(jwt_payload['jti'], _MISSING)
+        return None if verdict is _MISSING else verdict
+
+    def stats(self):
+        return {
+            'verdict_cache': self.verdicts.stats(),
+            'epoch_cache': self.epochs.stats(),
+            'epoch_db_reads': self.epoch_db_reads,
+            'epoch_ttl': self.epoch_ttl,
+            'allowed_ttl': self.allowed_ttl,
+            'redis_calls': self.redis_calls,
+            'redis_errors': self.redis_errors,
+            'breaker': self.breaker.stats(),
+        }
+
+
+token_blocklist = TokenBlocklist()
+
+
+def add_to_blocklist(jti, exp_timestamp):
+    """Add a token to the blocklist with expiration"""
+    return token_blocklist.add(jti, exp_timestamp)
+
 
-def is_token_blocked(jti):
+def is_token_blocked(jti, exp_timestamp=None):
     """Check if a token is in the blocklist"""
-    try:
-        return redis_client.exists(f'token_blocklist:{jti}')
-    except Exception as e:
-        print(f"Error checking token blocklist: {e}")
-        return False  # If Redis unavailable, allow tokens (development mode)
\ No newline at end of file
+    return token_blocklist.is_blocked(jti, exp_timestamp)
+
+
+def is_token_revoked(jwt_payload):
+    """Check a decoded token against its user's epoch and the jti blocklist"""
+    return token_blocklist.is_revoked(jwt_payload)
+
+
+def revoke_user_tokens(user_id):
+    """Log a user out everywhere"""
+    return token_blocklist.revoke_user(user_id)
+
+
+def token_claims(user):
+    """Claims to embed in every token issued to user"""
+    return {EPOCH_CLAIM: user.token_epoch or 0}